@@ -0,0 +1,61 @@
+"""
+Benchmark per-row `build_context` against batched `build_contexts`.
+
+Generates a synthetic table and times building a template context for every
+row with and without a `variable_map`:
+
+    python benchmarks/bench_context.py --rows 1000000 --columns 12 --mapped 4
+
+The per-row path is what a mail merge did before: `build_context(record,
+variable_map)` for each `RowView`. The batched path resolves the map once and
+projects whole column blocks.
+"""
+import argparse
+import time
+from typing import Callable, Dict, List
+
+from email_me_anything.emailutils import build_context, build_contexts, iter_contexts
+from email_me_anything.table import CsvTable
+
+def make_table(rows: int, columns: int) -> CsvTable:
+    header = [f"field{c}" for c in range(columns)]
+    return CsvTable.from_rows([header] + [[f"r{r}c{c}" for c in range(columns)] for r in range(rows)])
+
+def per_row(table: CsvTable, variable_map: Dict[str, str] | None) -> int:
+    return sum(1 for record in table.records() for _ in [build_context(dict(record) if variable_map is None else record, variable_map)])
+
+def batched(table: CsvTable, variable_map: Dict[str, str] | None) -> int:
+    return len(build_contexts(table, variable_map))
+
+def streamed(table: CsvTable, variable_map: Dict[str, str] | None) -> int:
+    return sum(1 for _ in iter_contexts(table, variable_map))
+
+def best_of(repeat: int, func: Callable[[], int]) -> float:
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--columns", type=int, default=12)
+    parser.add_argument("--mapped", type=int, default=4, help="Columns named in the variable_map")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    table = make_table(args.rows, args.columns)
+    variable_map = {f"var{c}": f"field{c}" for c in range(args.mapped)}
+    print(f"{args.rows} rows x {args.columns} columns, best of {args.repeat}")
+    for label, mapping in (("variable_map", variable_map), ("all columns", None)):
+        base = best_of(args.repeat, lambda: per_row(table, mapping))
+        print(f"  {label}:")
+        print(f"    per-row build_context   {base:8.3f}s  {args.rows / base:12,.0f} rows/s")
+        for name, func in (("build_contexts", batched), ("iter_contexts", streamed)):
+            elapsed = best_of(args.repeat, lambda: func(table, mapping))
+            print(f"    {name:<23} {elapsed:8.3f}s  {args.rows / elapsed:12,.0f} rows/s  x{base / elapsed:.1f}")
+
+if __name__ == "__main__":
+    main()
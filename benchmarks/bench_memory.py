@@ -0,0 +1,160 @@
+"""
+Memory regression suite for CSV loading and the lucky-email pipeline.
+
+Measures peak memory of `read_csv`, `select_random_row` and `send_lucky_email`
+on generated CSVs of several sizes and compares it with the budgets recorded
+in `memory_budgets.json`:
+
+    python benchmarks/bench_memory.py                  # check against the budgets
+    python benchmarks/bench_memory.py --update         # re-record the budgets
+    python benchmarks/bench_memory.py --rows 10000 --only read_csv
+
+Every measurement runs in a fresh interpreter, so earlier cases cannot inflate
+the next one's high-water mark, with the settings in `CHILD_ENV` pinned so
+the caller's environment (or `.env`) cannot change what is measured. Two numbers are taken, in separate runs:
+
+- rss: growth of the peak resident set size (`ru_maxrss`) over the size after
+  imports, i.e. what the OOM killer sees.
+- traced: the `tracemalloc` peak of Python allocations during the call, which
+  is far less noisy and pinpoints the allocation sites of a regression.
+
+A case fails when either number exceeds its budget by more than `--tolerance`
+(default 15%) plus a small absolute slack for allocator noise. The process
+exits with status 1 if any case fails.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+BUDGETS = Path(__file__).with_name("memory_budgets.json")
+FUNCTIONS = ("read_csv", "select_random_row", "send_lucky_email")
+SIZES = (10_000, 100_000, 400_000)
+SLACK_MIB = {"rss": 4.0, "traced": 0.5}
+CHILD_ENV = {
+    "PROD_MODE": "false",
+    "MAILER_CLIENT": "mailersend",
+    "EMAIL_DEBUG_TRANSPORT": "debug",
+    "EMAIL_TRANSPORTS": "",
+    "CSV_CACHE": "false",
+    "CSV_INCREMENTAL": "false",
+    "EMAIL_PRERENDER_AHEAD": "0",
+    "EMAIL_PROFILE": "",
+}
+
+WORDS = "imagination knowledge creativity intelligence wisdom patience courage kindness future simple".split()
+
+def make_csv(path: Path, rows: int) -> Path:
+    rng = random.Random(rows)
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        file.write("name,quote,category,year\n")
+        for row in range(rows):
+            quote = " ".join(rng.choice(WORDS) for _ in range(12))
+            file.write(f"Author {row},\"{quote}\",{rng.choice(WORDS)},{1900 + row % 120}\n")
+    return path
+
+def _peak_rss_mib() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+def child(function: str, csv_path: Path, template_path: Path, metric: str) -> Dict[str, float]:
+    """Run one call in this (fresh) process and return its memory use in MiB."""
+    import tracemalloc
+    from email_me_anything.config import Config
+    from email_me_anything.csvutils import read_csv, select_random_row
+    from email_me_anything.luckyemail import send_lucky_email
+
+    Config.PROD_MODE = False
+    calls = {
+        "read_csv": lambda: read_csv(csv_path, use_cache=False, incremental=False),
+        "select_random_row": lambda: select_random_row(csv_path, use_cache=False, incremental=False),
+        "send_lucky_email": lambda: send_lucky_email(csv_path, template_path, recipients=[{"email": "a@example.com", "name": "A"}]),
+    }
+    call = calls[function]
+    if metric == "traced":
+        tracemalloc.start()
+        result = call()
+        peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    else:
+        baseline = _peak_rss_mib()
+        result = call()
+        peak = _peak_rss_mib() - baseline
+    assert result, f"{function} returned {result!r}"
+    return {metric: round(peak, 2)}
+
+def measure(function: str, rows: int, workdir: Path) -> Dict[str, float]:
+    csv_path = workdir / f"data-{rows}.csv"
+    if not csv_path.exists():
+        make_csv(csv_path, rows)
+    template_path = workdir / "template.html"
+    template_path.write_text("<p>{quote}</p><span>{name}</span>", encoding="utf-8")
+    result: Dict[str, float] = {}
+    for metric in ("rss", "traced"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", function, str(csv_path), str(template_path), metric],
+            cwd=workdir, env=dict(os.environ, **CHILD_ENV), capture_output=True, text=True, check=True,
+        ).stdout
+        result.update(json.loads(out.strip().splitlines()[-1]))
+    return result
+
+def check(measured: Dict[str, float], budget: Dict[str, float], tolerance: float) -> List[str]:
+    """Return a description of every metric over budget."""
+    failures = []
+    for metric, value in measured.items():
+        limit = budget.get(metric)
+        if limit is not None and value > limit * (1 + tolerance) + SLACK_MIB[metric]:
+            failures.append(f"{metric} {value:.2f} MiB > budget {limit:.2f} MiB")
+    return failures
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, action="append", help=f"CSV sizes to test (default: {SIZES})")
+    parser.add_argument("--only", choices=FUNCTIONS, action="append", help="Functions to test (default: all)")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed growth over budget (default: 0.15)")
+    parser.add_argument("--update", action="store_true", help=f"Record the measurements as the new budgets in {BUDGETS.name}")
+    parser.add_argument("--child", nargs=4, metavar=("FUNCTION", "CSV", "TEMPLATE", "METRIC"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        function, csv_path, template_path, metric = args.child
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                result = child(function, Path(csv_path), Path(template_path), metric)
+            finally:
+                sys.stdout = stdout
+        print(json.dumps(result))
+        return 0
+
+    budgets = json.loads(BUDGETS.read_text(encoding="utf-8")) if BUDGETS.exists() else {}
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows or SIZES:
+            for function in args.only or FUNCTIONS:
+                key = f"{function}/{rows}"
+                measured = measure(function, rows, Path(tmp))
+                budget = budgets.get(key)
+                problems = check(measured, budget, args.tolerance) if budget and not args.update else []
+                status = "new" if budget is None else ("FAIL" if problems else "ok")
+                print(f"{key:<28} rss {measured['rss']:8.2f} MiB  traced {measured['traced']:8.2f} MiB  {status}"
+                      + ("  " + "; ".join(problems) if problems else ""))
+                failures += bool(problems)
+                if args.update:
+                    budgets[key] = measured
+    if args.update:
+        BUDGETS.write_text(json.dumps(budgets, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Budgets written to {BUDGETS}")
+    elif failures:
+        print(f"{failures} case(s) over their memory budget")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
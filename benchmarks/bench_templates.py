@@ -0,0 +1,58 @@
+"""
+Benchmark compiled templates against `format_map` and hand-built HTML.
+
+    python benchmarks/bench_templates.py --items 50 --repeat 20000
+
+"simple" renders a placeholder-only template with `str.format_map` and with
+the compiled renderer. "list" renders a digest of `--items` entries with a
+`{% for %}` block, compared with the usual alternative of concatenating
+pre-formatted fragments in Python.
+"""
+import argparse
+import html
+import timeit
+from typing import List
+
+from email_me_anything.templating import compile_template
+
+SIMPLE = "<html><body><h1>{title}</h1><p>{quote}</p><span>{name}</span><small>{date}</small></body></html>"
+LIST = (
+    "<h1>{title|escape}</h1><ul>"
+    "{% for item in items %}<li class=\"{% if loop.first %}first{% endif %}\">"
+    "<a href=\"{item.url}\">{item.name|escape}</a> {item.price:.2f}</li>{% endfor %}</ul>"
+)
+
+def concatenated(context) -> str:
+    parts = [f"<h1>{html.escape(context['title'])}</h1><ul>"]
+    for index, item in enumerate(context["items"]):
+        css = "first" if index == 0 else ""
+        parts.append('<li class="' + css + '"><a href="' + item["url"] + '">' + html.escape(item["name"])
+                     + "</a> " + format(item["price"], ".2f") + "</li>")
+    parts.append("</ul>")
+    return "".join(parts)
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    simple = {"title": "Daily", "quote": "Imagination is more important", "name": "Ada", "date": "today"}
+    compiled_simple = compile_template(SIMPLE)
+    assert compiled_simple(simple) == SIMPLE.format_map(simple)
+    base = min(timeit.repeat(lambda: SIMPLE.format_map(simple), number=args.repeat, repeat=3))
+    fast = min(timeit.repeat(lambda: compiled_simple(simple), number=args.repeat, repeat=3))
+    print(f"simple x{args.repeat}: format_map {base:.3f}s  compiled {fast:.3f}s  x{base / fast:.2f}")
+
+    digest = {"title": "Weekly <digest>", "items": [
+        {"name": f"Item {i} & co", "url": f"https://example.com/{i}", "price": i * 1.5} for i in range(args.items)
+    ]}
+    compiled_list = compile_template(LIST)
+    assert compiled_list(digest) == concatenated(digest)
+    number = max(1, args.repeat // 10)
+    base = min(timeit.repeat(lambda: concatenated(digest), number=number, repeat=3))
+    fast = min(timeit.repeat(lambda: compiled_list(digest), number=number, repeat=3))
+    print(f"list of {args.items} x{number}: concatenation {base:.3f}s  compiled {fast:.3f}s  x{base / fast:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,32 @@ primary helpers for convenience:
 - `config`: environment-based settings
 - `csvutils`: CSV reading and selection helpers
 - `emailutils`: functions to build HTML content and send emails
+- `templating`: compiled templates with loops, conditionals and filters
 - `luckyemail`: orchestration function to send a random CSV row as an email
+- `personalization`: MailerSend stored templates with per-recipient variables, sent in bulk batches
+- `transports`: registry of delivery backends, including null and in-memory transports
+- `transportgroup`: load balancing, circuit breakers and failover across SMTP relays and MailerSend accounts
+- `journal`: idempotency-keyed send journal for resumable batch runs
+- `profiling`: cProfile, tracemalloc and sampling profiles of the send pipeline
+- `compressed`: gzip/zstd CSV reading with indexed random access
+- `shards`: uniform random rows across datasets split over many CSV files
+- `tailcsv`: incremental re-reading of append-only CSVs
+- `colindex`: persisted column indexes for filtered random selection
+- `sqlitesource`: SQLite data source with constant-time random rows
+- `table`: compact columnar storage for parsed CSV data
+- `rendercache`: bounded memoisation of rendered templates
+- `mimeskeleton`: prebuilt MIME messages with per-recipient headers
+- `attachments`: memory-mapped, chunk-encoded file attachments with an encode cache
+- `inline`: local images rewritten to deduplicated `cid:` inline parts
+- `watch`: inotify/polling file watcher that keeps templates and tables in memory
+- `htmlopt`: post-render HTML minification and plain-text generation
 """
 
 # Expose main modules for easy import
 from .config import Config
-from .csvutils import read_csv, select_random_row
-from .emailutils import build_html_content, send_email, build_context
+from .csvutils import read_csv, read_table, select_random_row
+from .emailutils import build_html_content, send_email, send_bulk, build_context
 from .luckyemail import send_lucky_email
+from .htmlopt import HtmlOptimizer
+from .rendercache import RenderCache
+from .table import CsvTable, RowView
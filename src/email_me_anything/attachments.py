@@ -0,0 +1,156 @@
+"""
+File attachments that are encoded once and streamed.
+
+Reading a file into memory and base64-encoding it whole costs twice its size
+(three times with the encoded copy), and a report sent to many recipients
+did that once per message. An `Attachment` instead memory-maps the file and
+encodes it in chunks of whole base64 lines, so the SMTP sender can write the
+lines straight into the DATA stream as they are produced.
+
+Encoded files are kept in a process-wide LRU cache, keyed by path, size and
+modification time and bounded by `CACHE_BYTES`. A file attached to many
+messages is read and encoded once; later messages stream the cached lines.
+Files whose encoded form is larger than the whole budget are re-encoded from
+the mapping on every send, which keeps memory flat.
+"""
+import base64
+import mimetypes
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+LINE_BYTES = 57
+CHUNK_BYTES = LINE_BYTES * 1024
+CACHE_BYTES = 64 * 1024 * 1024
+
+_cache: "OrderedDict[Tuple[str, int, int], List[bytes]]" = OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+
+class Attachment:
+    """A file to attach to an email.
+
+    Attributes:
+        path (Path): The file on disk.
+        filename (str): Name shown to the recipient. Defaults to the file's name.
+        content_type (str): MIME type, guessed from the filename when not given.
+        disposition (str): "attachment" or "inline".
+        content_id (str | None): Content-ID (without angle brackets) of an inline image
+            referenced from the HTML as `cid:<content_id>`.
+        digest (str | None): Hex digest of the file contents, when known. Files with the
+            same digest share one cached encoding.
+        size (int): File size in bytes when the attachment was created.
+        mtime_ns (int): File modification time when the attachment was created.
+    """
+
+    def __init__(self, path: Path | str, filename: str = None, content_type: str = None, disposition: str = "attachment",
+                 content_id: str = None, digest: str = None):
+        self.path = Path(path)
+        stat = os.stat(self.path)
+        self.filename = filename or self.path.name
+        self.content_type = content_type or mimetypes.guess_type(self.filename)[0] or "application/octet-stream"
+        self.disposition = disposition
+        self.content_id = content_id
+        self.digest = digest
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+
+    @property
+    def key(self) -> Tuple[str, int, int]:
+        """
+        Identifies the file contents in the encode cache: (absolute path, size, mtime in ns),
+        or (digest, size, 0) when the content digest is known.
+        """
+        if self.digest:
+            return (self.digest, self.size, 0)
+        return (os.path.abspath(self.path), self.size, self.mtime_ns)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Attachment) and self._identity() == other._identity()
+
+    def __hash__(self) -> int:
+        return hash(self._identity())
+
+    def _identity(self) -> tuple:
+        return (self.key, self.filename, self.content_type, self.disposition, self.content_id)
+
+    def __repr__(self) -> str:
+        return f"Attachment({str(self.path)!r}, filename={self.filename!r}, content_type={self.content_type!r})"
+
+    def chunks(self) -> Iterator[bytes]:
+        """
+        Yield the base64 encoding as CRLF-separated 76-character lines, a chunk at a time.
+        The last line has no trailing CRLF. Served from the encode cache when possible.
+        """
+
+        global _cache_bytes
+        key = self.key
+        with _lock:
+            cached = _cache.get(key)
+            if cached is not None:
+                _cache.move_to_end(key)
+        if cached is not None:
+            yield from cached
+            return
+        keep = _encoded_size(self.size) <= CACHE_BYTES
+        produced: List[bytes] = []
+        for chunk in _encode(self.path, self.size):
+            if keep:
+                produced.append(chunk)
+            yield chunk
+        if keep:
+            size = sum(len(chunk) for chunk in produced)
+            with _lock:
+                if key not in _cache:
+                    _cache[key] = produced
+                    _cache_bytes += size
+                    while _cache_bytes > CACHE_BYTES and _cache:
+                        _, evicted = _cache.popitem(last=False)
+                        _cache_bytes -= sum(len(chunk) for chunk in evicted)
+
+    def encoded(self) -> bytes:
+        """Return the whole line-wrapped base64 encoding (as used in a MIME part)."""
+        return b"".join(self.chunks())
+
+    def base64(self) -> str:
+        """Return the base64 encoding without line breaks, as HTTP APIs expect it."""
+        return self.encoded().replace(b"\r\n", b"").decode("ascii")
+
+def _encoded_size(size: int) -> int:
+    lines = -(-size // LINE_BYTES)
+    return -(-size // 3) * 4 + max(0, lines - 1) * 2
+
+def _encode(path: Path, size: int) -> Iterator[bytes]:
+    if size == 0:
+        return
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with memoryview(mapped) as view:
+            end = min(size, len(mapped))
+            for start in range(0, end, CHUNK_BYTES):
+                chunk = base64.encodebytes(view[start:start + CHUNK_BYTES]).replace(b"\n", b"\r\n")
+                # Chunks are whole lines; only the final line loses its line break.
+                yield chunk if start + CHUNK_BYTES < end else chunk[:-2]
+
+def as_attachments(items: Iterable[Attachment | Path | str] | None) -> Tuple[Attachment, ...]:
+    """
+    Normalise paths and `Attachment`s to a tuple of `Attachment`s.
+    Raises:
+        FileNotFoundError: If a path does not exist.
+    """
+
+    return tuple(item if isinstance(item, Attachment) else Attachment(item) for item in items or ())
+
+def cache_info() -> dict:
+    """Return the number of cached encodings and their total size in bytes."""
+    with _lock:
+        return {"entries": len(_cache), "bytes": _cache_bytes}
+
+def clear_cache() -> None:
+    """Drop every cached encoding."""
+    global _cache_bytes
+    with _lock:
+        _cache.clear()
+        _cache_bytes = 0
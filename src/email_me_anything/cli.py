@@ -0,0 +1,358 @@
+"""
+Command-line entry point for batch sends.
+
+Installed as the `email-me-anything` console script:
+
+    email-me-anything lucky quotes.csv quote.html --count 100 --workers 4 --rate 10
+    email-me-anything campaign announcement.html --recipients people.csv --batch-size 50
+    email-me-anything merge people.csv welcome.html --subject "Welcome {name}" --dry-run
+    email-me-anything daemon jobs.json
+    email-me-anything import quotes.csv quotes.db
+
+`lucky` sends random CSV rows, `campaign` sends one rendered body to every
+address in a recipients CSV, and `merge` renders one personalised email per
+CSV row. `import` converts a CSV into a SQLite data source. With `--dry-run`, emails are rendered but nothing is sent or written.
+With `--journal FILE`, delivered messages are recorded and a rerun skips them.
+`--profile MODES` writes cProfile, memory and sampling profiles (see `profiling`).
+`--transport null` runs the whole pipeline without delivering anything (see `transports`).
+Every run ends with a throughput and latency summary.
+"""
+import argparse
+import csv
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Sequence
+
+from .attachments import as_attachments
+from .config import Config
+from .csvutils import pick_random_row, read_table
+from .emailutils import build_contexts, build_html_content, send_email
+from .journal import SendJournal, idempotency_key
+from . import profiling, transports
+from .rendercache import RenderCache
+
+class RateLimiter:
+    """Thread-safe pacer that spaces calls to at most `rate` per second (no limit when `rate` is falsy)."""
+
+    def __init__(self, rate: float = None):
+        self._interval = 1.0 / rate if rate else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class RunStats:
+    """Collects per-send latencies and message counts for the end-of-run summary."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.messages = 0
+        self.failures = 0
+        self.started = time.perf_counter()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, messages: int, ok: bool) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            if ok:
+                self.messages += messages
+            else:
+                self.failures += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Return sends, messages, failures, elapsed seconds, throughput and latency percentiles."""
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        ordered = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+        return {
+            "sends": len(ordered),
+            "messages": self.messages,
+            "failures": self.failures,
+            "elapsed": elapsed,
+            "throughput": self.messages / elapsed if elapsed > 0 else 0.0,
+            "p50": percentile(50),
+            "p95": percentile(95),
+            "p99": percentile(99),
+            "max": ordered[-1] if ordered else 0.0,
+        }
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """Render a run summary as a short human-readable report."""
+    return (
+        f"{summary['messages']} message(s) in {summary['sends']} send(s), "
+        f"{summary['failures']} failed, {summary['elapsed']:.2f}s elapsed, "
+        f"{summary['throughput']:.1f} msg/s\n"
+        f"latency p50={summary['p50'] * 1000:.1f}ms p95={summary['p95'] * 1000:.1f}ms "
+        f"p99={summary['p99'] * 1000:.1f}ms max={summary['max'] * 1000:.1f}ms"
+    )
+
+def run_sends(tasks: Iterator[Callable[[], int]], workers: int = 1, rate: float = None) -> Dict[str, Any]:
+    """
+    Run send tasks on a thread pool, optionally rate limited, and time each one.
+    Args:
+        tasks (Iterator[Callable[[], int]]): Zero-argument callables that perform one send
+            and return the number of messages it delivered.
+        workers (int, optional): Number of concurrent sends. Defaults to 1.
+        rate (float, optional): Maximum sends started per second. Defaults to no limit.
+    Returns:
+        Dict[str, Any]: The run summary from `RunStats.summary`.
+    """
+
+    stats = RunStats()
+    limiter = RateLimiter(rate)
+
+    def timed(task: Callable[[], int]) -> None:
+        limiter.wait()
+        start = time.perf_counter()
+        try:
+            messages, ok = task(), True
+        except Exception as e:
+            print(f"Send failed: {e}", file=sys.stderr)
+            messages, ok = 0, False
+        stats.record(time.perf_counter() - start, messages, ok)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # Bound the number of queued tasks so huge runs are not materialised up front.
+        pending = []
+        for task in tasks:
+            pending.append(pool.submit(timed, task))
+            if len(pending) >= workers * 4:
+                pending.pop(0).result()
+        for future in pending:
+            future.result()
+    stats.finished = time.perf_counter()
+    return stats.summary()
+
+def _transport(args: argparse.Namespace) -> str:
+    # The transport `send_email` will use for this run.
+    return args.transport or (Config.MAILER if Config.PROD_MODE else Config.DEBUG_TRANSPORT)
+
+def _deliver(args: argparse.Namespace) -> Callable[..., Any]:
+    if args.dry_run:
+        return lambda *args: {"status": "dry-run"}
+    options: Dict[str, Any] = {}
+    if args.transport:
+        options["transport"] = args.transport
+    if args.attach:
+        try:
+            # Resolved once, so every send reuses the same cached encodings.
+            options["attachments"] = as_attachments(args.attach)
+        except FileNotFoundError as e:
+            raise SystemExit(f"Attachment not found: {e.filename}")
+    send = partial(send_email, **options) if options else send_email
+
+    def deliver(*params: Any) -> Any:
+        response = send(*params)
+        if response is None:
+            # Transports report errors by returning None; the run counts those as failed sends.
+            raise RuntimeError("no response from the transport")
+        return response
+
+    return deliver
+
+def _chunks(items: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    size = max(1, size or len(items) or 1)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _parse_map(pairs: List[str]) -> Dict[str, str] | None:
+    if not pairs:
+        return None
+    return dict(pair.split("=", 1) for pair in pairs)
+
+def _read_recipients(path: Path, email_column: str, name_column: str) -> List[Dict[str, str]]:
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        return [
+            {"email": row[email_column], "name": row.get(name_column) or ""}
+            for row in csv.DictReader(file)
+            if row.get(email_column)
+        ]
+
+def _run_key(args: argparse.Namespace, *parts: Any) -> str:
+    # Keys are scoped by --run-id, or by the command and its input files.
+    run = args.run_id or f"{args.command}:{getattr(args, 'csv', None) or args.recipients}:{args.template}"
+    return idempotency_key(run, *parts)
+
+def _lucky_tasks(args: argparse.Namespace, sender: Dict[str, str], journal: SendJournal = None) -> Iterator[Callable[[], int]]:
+    table = read_table(args.csv)
+    if not table:
+        raise SystemExit(f"No data found in {args.csv}")
+    recipients = [{"email": email, "name": email} for email in args.to] or [
+        {"email": Config.EMAIL_RECIPIENT_0_ADDRESS, "name": Config.EMAIL_RECIPIENT_0_NAME}
+    ]
+    cache, deliver, variable_map = RenderCache(), _deliver(args), _parse_map(args.map)
+
+    def task(key: str = None) -> int:
+        row = pick_random_row(table)
+        if row is None:
+            raise ValueError("CSV has no data rows")
+        html = build_html_content(args.template, row, variable_map, cache=cache)
+        deliver(sender, recipients, args.subject or "New Data Row!", html)
+        if key is not None:
+            journal.record(key)
+        return len(recipients)
+
+    for number in range(args.count or 1):
+        key = _run_key(args, number) if journal is not None else None
+        if key is None or not journal.delivered(key):
+            yield partial(task, key)
+
+def _campaign_tasks(args: argparse.Namespace, sender: Dict[str, str], journal: SendJournal = None) -> Iterator[Callable[[], int]]:
+    recipients = _read_recipients(args.recipients, args.email_column, args.name_column)[:args.count or None]
+    if journal is not None:
+        # Batches are formed from the recipients still to do, so a resumed run sends full batches.
+        recipients = [r for r in recipients if not journal.delivered(_run_key(args, r["email"]))]
+    data: Dict[str, Any] = {}
+    if args.data:
+        table = read_table(args.data)
+        data = (pick_random_row(table) if table else None) or {}
+    html = build_html_content(args.template, data, _parse_map(args.map))
+    deliver = _deliver(args)
+    # A whole batch per message only where no recipient sees the others: transports that keep
+    # recipients out of the headers, and ones that deliver nothing.
+    name = _transport(args)
+    shared = args.dry_run or transports.bcc(name) or not transports.delivers(name)
+
+    def send_batch(batch: List[Dict[str, str]]) -> int:
+        for recipients in [batch] if shared else ([recipient] for recipient in batch):
+            deliver(sender, recipients, args.subject or "New Data Row!", html)
+        if journal is not None:
+            for recipient in batch:
+                journal.record(_run_key(args, recipient["email"]))
+        return len(batch)
+
+    for batch in _chunks(recipients, args.batch_size):
+        yield partial(send_batch, batch)
+
+def _merge_tasks(args: argparse.Namespace, sender: Dict[str, str], journal: SendJournal = None) -> Iterator[Callable[[], int]]:
+    table = read_table(args.csv)
+    if not table:
+        raise SystemExit(f"No data found in {args.csv}")
+    cache, deliver, variable_map = RenderCache(), _deliver(args), _parse_map(args.map)
+    stop = len(table) if not args.count else min(len(table), args.count + 1)
+
+    def send_rows(batch: Sequence[int]) -> int:
+        contexts = build_contexts(table, variable_map, batch[0], batch[-1] + 1)
+        sent = 0
+        for index, context in zip(batch, contexts):
+            record = table.record(index)
+            key = _run_key(args, index, record[args.email_column]) if journal is not None else None
+            if key is not None and journal.delivered(key):
+                continue
+            recipient = {"email": record[args.email_column], "name": record.get(args.name_column, "")}
+            html = build_html_content(args.template, context, cache=cache)
+            deliver(sender, [recipient], (args.subject or "New Data Row!").format_map(record), html)
+            if key is not None:
+                journal.record(key)
+            sent += 1
+        return sent
+
+    for batch in _chunks(range(1, stop), args.batch_size):
+        yield partial(send_rows, batch)
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser for the `email-me-anything` command."""
+    parser = argparse.ArgumentParser(prog="email-me-anything", description="Batch-send templated emails from CSV data.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--subject", help="Email subject (merge subjects may use {column} placeholders)")
+    common.add_argument("--sender-address", default=Config.EMAIL_SENDER_ADDRESS)
+    common.add_argument("--sender-name", default=Config.EMAIL_SENDER)
+    common.add_argument("--map", action="append", metavar="VAR=COLUMN", help="Template variable to CSV column mapping (repeatable)")
+    common.add_argument("--count", type=int, help="Number of emails (lucky) or maximum recipients/rows (campaign, merge)")
+    common.add_argument("--workers", type=int, default=1, help="Concurrent sends (default: 1)")
+    common.add_argument("--rate", type=float, help="Maximum sends per second (default: unlimited)")
+    common.add_argument("--batch-size", type=int, default=1, help="Recipients (campaign) or rows (merge) per send task")
+    common.add_argument("--dry-run", action="store_true", help="Render emails without sending or writing them")
+    common.add_argument("--attach", action="append", type=Path, metavar="FILE", help="File to attach to every email (repeatable)")
+    common.add_argument("--journal", type=Path, metavar="FILE", help="Record delivered messages; a rerun skips them")
+    common.add_argument("--run-id", help="Names the run in the journal (default: command and input files)")
+    common.add_argument("--transport", metavar="NAME", help="Deliver through this transport, e.g. null or memory for load tests (default: MAILER_CLIENT)")
+    common.add_argument("--profile", metavar="MODES", help="Profile the run: cprofile,memory,sample or all (default: EMAIL_PROFILE)")
+
+    lucky = commands.add_parser("lucky", parents=[common], help="Send random CSV rows")
+    lucky.add_argument("csv", type=Path)
+    lucky.add_argument("template", type=Path)
+    lucky.add_argument("--to", action="append", default=[], metavar="EMAIL", help="Recipient address (repeatable)")
+
+    campaign = commands.add_parser("campaign", parents=[common], help="Send one email to every recipient in a CSV")
+    campaign.add_argument("template", type=Path)
+    campaign.add_argument("--recipients", type=Path, required=True, help="CSV with recipient addresses")
+    campaign.add_argument("--data", type=Path, help="CSV to pick a random row from for the template")
+
+    merge = commands.add_parser("merge", parents=[common], help="Send one personalised email per CSV row")
+    merge.add_argument("csv", type=Path)
+    merge.add_argument("template", type=Path)
+
+    for sub in (campaign, merge):
+        sub.add_argument("--email-column", default="email")
+        sub.add_argument("--name-column", default="name")
+
+    daemon = commands.add_parser("daemon", help="Run recurring jobs from a jobs file")
+    daemon.add_argument("jobs", type=Path)
+
+    importer = commands.add_parser("import", help="Convert a CSV into a SQLite data source")
+    importer.add_argument("csv", type=Path)
+    importer.add_argument("db", type=Path, nargs="?", help="Target database (default: <csv name>.db)")
+    importer.add_argument("--force", action="store_true", help="Re-import even if the database is up to date")
+    return parser
+
+def main(argv: List[str] = None) -> int:
+    """Parse arguments, run the requested sends and print the summary."""
+    args = build_parser().parse_args(argv)
+    if args.command == "daemon":
+        from .scheduler import main as daemon_main
+        return daemon_main([str(args.jobs)])
+    if args.command == "import":
+        from .sqlitesource import import_csv
+        print(import_csv(args.csv, args.db, force=args.force))
+        return 0
+
+    sender = {"email": args.sender_address, "name": args.sender_name}
+    transport = _transport(args)
+    if not args.dry_run:
+        # Fail before reading any input when --transport or MAILER_CLIENT names no transport.
+        try:
+            transports.get(transport)
+        except KeyError as e:
+            raise SystemExit(e.args[0])
+    # Dry runs, debug mode and discarding transports deliver nothing, so they neither consult nor extend the journal.
+    delivering = transports.delivers(transport)
+    journal = SendJournal(args.journal) if args.journal and not args.dry_run and delivering else None
+    try:
+        tasks = {"lucky": _lucky_tasks, "campaign": _campaign_tasks, "merge": _merge_tasks}[args.command](args, sender, journal)
+        modes = profiling.configured_modes(args.profile) if args.profile else profiling.configured_modes()
+        if modes:
+            with profiling.session(args.command, modes):
+                summary = run_sends(tasks, workers=args.workers, rate=args.rate)
+        else:
+            summary = run_sends(tasks, workers=args.workers, rate=args.rate)
+    finally:
+        if journal is not None:
+            journal.close()
+    print(("[dry run] " if args.dry_run else "") + format_summary(summary))
+    if journal is not None:
+        print(f"journal {args.journal}: {journal.skipped} already delivered, {journal.recorded} recorded")
+    return 1 if summary["failures"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
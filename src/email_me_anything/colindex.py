@@ -0,0 +1,282 @@
+"""
+Persisted per-column inverted indexes for filtered random selection.
+
+`select_random_row(path, where={"category": "poetry"})` needs a random row
+among those matching a predicate. Scanning and filtering the whole file on
+every call is wasteful, so the first filtered call on a column builds an
+inverted index (value -> sorted row numbers) and stores it next to the CSV
+as `<name>.csv.colidx`. Later picks look the value up and draw one element
+of its posting list. The index also stores the byte offset of every row of
+an uncompressed file, so only the chosen row is read and parsed: a
+single-column filter costs O(1) whatever the size of the file. With several
+columns the smallest posting list is intersected with the others (checking
+each row by binary search) once, and the intersection is kept with the
+loaded index for later picks. Compressed files have no row offsets; their
+picks read the table through `read_table`.
+
+File layout (like the parsed-table cache in `csvcache`):
+
+    b"EMACIX02" | uint64 metadata length | metadata JSON | row-number array | row-offset array
+
+The metadata records the source's size and mtime, its first row and, for
+each indexed column, `{value: [start, count]}` slices into the native-endian
+uint32 array. The row offsets are native-endian uint64. An index whose source
+changed is discarded and rebuilt.
+"""
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .compressed import _lines, _RowScanner, compression_of
+from .table import CsvTable
+
+MAGIC = b"EMACIX02"
+MATCHES_KEPT = 64  # multi-column intersections remembered per loaded index
+_READ_SIZE = 64 * 1024
+_HEADER = struct.Struct("<8sQ")
+
+def index_path(filepath: Path) -> Path:
+    """Return the column index location for a CSV file (`data.csv` -> `data.csv.colidx`)."""
+    filepath = Path(filepath)
+    return filepath.with_name(filepath.name + ".colidx")
+
+def column_key(table: CsvTable, column: str, skip_header: bool = True) -> int:
+    """
+    Resolve a column name to its position, the way `RowView` resolves keys.
+    Raises:
+        KeyError: If the table has no such column.
+    """
+
+    col = table.column_index(column, skip_header)
+    if col is None:
+        raise KeyError(column)
+    return col
+
+def build_postings(table: CsvTable, col: int, start: int) -> Dict[str, array]:
+    """Map each value of column `col` to the sorted rows (from `start`) holding it."""
+    postings: Dict[str, array] = {}
+    for row, value in enumerate(table.column(col, start), start=start):
+        posting = postings.get(value)
+        if posting is None:
+            posting = postings[value] = array("I")
+        posting.append(row)
+    return postings
+
+class ColumnIndex:
+    """Inverted indexes for some columns of one CSV file.
+
+    Attributes:
+        source (Dict[str, Any]): Absolute path, size and mtime of the indexed file.
+        columns (Dict[str, Dict[str, Any]]): Index key -> {value: posting list}; posting
+            lists are uint32 arrays, or memoryviews when loaded from disk.
+        first_row (List[str] | None): The file's first row (the header, if it has one).
+        offsets (Any): Byte offset of every row of the file (uint64 array or memoryview),
+            or None when rows cannot be read individually (compressed files).
+        matches (Dict[Any, Any]): Intersections of multi-column filters already computed.
+    """
+
+    def __init__(self, source: Dict[str, Any], columns: Dict[str, Dict[str, Any]] = None,
+                 first_row: List[str] = None, offsets: Any = None):
+        self.source = source
+        self.columns = columns or {}
+        self.first_row = first_row
+        self.offsets = offsets
+        self.matches: Dict[Any, Any] = {}
+
+    @staticmethod
+    def key(column: str, skip_header: bool) -> str:
+        """Indexes built with and without a header row differ, so both are part of the key."""
+        return f"{int(skip_header)}:{column}"
+
+    def postings(self, column: str, value: str, skip_header: bool = True) -> Any:
+        """Return the rows whose `column` equals `value` (empty when none do)."""
+        return self.columns[self.key(column, skip_header)].get(value, ())
+
+    def save(self, filepath: Path) -> bool:
+        """Write the index next to `filepath`; errors are printed and False returned."""
+        target = index_path(filepath)
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        try:
+            rows = array("I")
+            meta_columns: Dict[str, Dict[str, List[int]]] = {}
+            for name, values in self.columns.items():
+                meta_columns[name] = {}
+                for value, posting in values.items():
+                    meta_columns[name][value] = [len(rows), len(posting)]
+                    rows.extend(posting)
+            offsets = array("Q", self.offsets) if self.offsets is not None else array("Q")
+            meta = json.dumps({"source": self.source, "byteorder": sys.byteorder, "columns": meta_columns,
+                               "first_row": self.first_row, "rows": len(rows),
+                               "offsets": len(offsets) if self.offsets is not None else None}).encode("utf-8")
+            with open(tmp, "wb") as file:
+                file.write(_HEADER.pack(MAGIC, len(meta)))
+                file.write(meta)
+                file.write(b"\0" * (-file.tell() % 8))
+                file.write(rows.tobytes())
+                file.write(b"\0" * (-file.tell() % 8))
+                file.write(offsets.tobytes())
+            os.replace(tmp, target)
+            return True
+        except Exception as e:
+            print(f"Error writing column index: {e}")
+            tmp.unlink(missing_ok=True)
+            return False
+
+    @classmethod
+    def load(cls, filepath: Path, source: Dict[str, Any]) -> "ColumnIndex | None":
+        """Load the stored index for `filepath` if it was built from `source`, else None."""
+        try:
+            with open(index_path(filepath), "rb") as file:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, meta_len = _HEADER.unpack_from(mapped, 0)
+            if magic != MAGIC:
+                return None
+            meta = json.loads(bytes(mapped[_HEADER.size:_HEADER.size + meta_len]))
+            if meta["source"] != source or meta["byteorder"] != sys.byteorder:
+                return None
+            base = _HEADER.size + meta_len
+            base += -base % 8
+            end = base + 4 * meta["rows"]
+            rows = memoryview(mapped)[base:end].cast("I")
+            columns = {
+                name: {value: rows[start:start + count] for value, (start, count) in values.items()}
+                for name, values in meta["columns"].items()
+            }
+            offsets = None
+            if meta["offsets"] is not None:
+                end += -end % 8
+                offsets = memoryview(mapped)[end:end + 8 * meta["offsets"]].cast("Q")
+            return cls(source, columns, meta["first_row"], offsets)
+        except Exception as e:
+            print(f"Ignoring unreadable column index {index_path(filepath)}: {e}")
+            return None
+
+def row_offsets(filepath: Path) -> array:
+    """Byte offset at which each CSV row of an uncompressed file starts."""
+    with open(filepath, "rb") as file:
+        return array("Q", (start for start, _ in _RowScanner(_lines(iter(lambda: file.read(_READ_SIZE), b"")))))
+
+def read_row(filepath: Path, offset: int) -> List[str]:
+    """Parse the single CSV row starting at byte `offset` of an uncompressed file."""
+    with open(filepath, "rb") as file:
+        file.seek(offset)
+        chunks: Iterator[bytes] = iter(lambda: file.read(_READ_SIZE), b"")
+        for _, row in _RowScanner(_lines(chunks)):
+            return row
+    raise IndexError(f"No row at byte {offset} of {filepath}")
+
+def _source(filepath: Path) -> Dict[str, Any]:
+    stat = os.stat(filepath)
+    return {"source": os.path.abspath(filepath), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+_loaded: Dict[str, ColumnIndex] = {}
+_lock = threading.Lock()
+
+def ensure_index(filepath: Path, columns: List[str], skip_header: bool = True, use_cache: bool = None) -> Tuple[ColumnIndex, CsvTable | None]:
+    """
+    Return an up-to-date index covering `columns`, building and persisting missing ones.
+    Args:
+        filepath (Path): The CSV file.
+        columns (List[str]): Column names (headers, or `col0`... without a header).
+        skip_header (bool, optional): Whether the first row is a header. Defaults to True.
+        use_cache (bool, optional): Passed on to `read_table` when the table must be read.
+    Returns:
+        Tuple[ColumnIndex, CsvTable | None]: The index, and the table if it had to be read.
+    Raises:
+        OSError: If the CSV cannot be read.
+        KeyError: If a column does not exist.
+    """
+
+    from .csvutils import read_table
+
+    source = _source(filepath)
+    with _lock:
+        index = _loaded.get(source["source"])
+        if index is None or index.source != source:
+            index = ColumnIndex.load(filepath, source) or ColumnIndex(source)
+        missing = [c for c in columns if ColumnIndex.key(c, skip_header) not in index.columns]
+        table = None
+        if missing:
+            table = read_table(filepath, use_cache=use_cache)
+            if table is None:
+                raise OSError(f"Could not read {filepath}")
+            start = 1 if skip_header else 0
+            for column in missing:
+                col = column_key(table, column, skip_header)
+                index.columns[ColumnIndex.key(column, skip_header)] = build_postings(table, col, start)
+            index.first_row = table.row_values(0) if len(table) else None
+            if index.offsets is None and not compression_of(filepath):
+                offsets = row_offsets(filepath)
+                # Rows split differently than `read_table` split them (e.g. bare "\r" line
+                # endings) cannot be fetched by offset; such files fall back to the table.
+                index.offsets = offsets if len(offsets) == len(table) else None
+            index.save(filepath)
+        _loaded[source["source"]] = index
+    return index, table
+
+def _contains(posting: Any, row: int) -> bool:
+    at = bisect_left(posting, row)
+    return at < len(posting) and posting[at] == row
+
+def matching_rows(index: ColumnIndex, where: Dict[str, str], skip_header: bool = True) -> Any:
+    """Return the rows matching every `column == value` condition in `where`."""
+    postings = sorted((index.postings(c, str(v), skip_header) for c, v in where.items()), key=len)
+    if len(postings) == 1 or not postings[0]:
+        return postings[0]
+    key = (skip_header, tuple(sorted((c, str(v)) for c, v in where.items())))
+    rows = index.matches.get(key)
+    if rows is None:
+        # Posting lists are sorted, so each row of the smallest is looked up by bisection.
+        rows = array("I", (row for row in postings[0] if all(_contains(other, row) for other in postings[1:])))
+        with _lock:
+            if len(index.matches) >= MATCHES_KEPT:
+                index.matches.pop(next(iter(index.matches)))
+            index.matches[key] = rows
+    return rows
+
+def random_matching_row(filepath: Path, where: Dict[str, str], skip_header: bool = True, use_cache: bool = None) -> Dict[str, Any] | None | bool:
+    """
+    Pick a random row satisfying `where` using the persisted column index.
+    Args:
+        filepath (Path): The CSV file.
+        where (Dict[str, str]): Column -> required value; all conditions must hold.
+        skip_header (bool, optional): Whether the first row is a header. Defaults to True.
+        use_cache (bool, optional): Passed on to `read_table` when the index is built, or
+            when a compressed file's row is fetched. Defaults to the CSV_CACHE setting.
+    Returns:
+        Dict[str, Any] | None | bool: The matching row as a dict, None when no row matches,
+            or False when the file cannot be read or a column does not exist.
+    """
+
+    from .csvutils import read_table
+
+    try:
+        index, table = ensure_index(filepath, list(where), skip_header, use_cache)
+        rows = matching_rows(index, where, skip_header)
+        if not len(rows):
+            return None
+        row = rows[random.randrange(len(rows))]
+        if table is None and index.offsets is not None:
+            # Only the chosen row is read; the header comes from the index.
+            values = read_row(filepath, index.offsets[row])
+            if not skip_header:
+                return dict(CsvTable.from_rows([values]).record(0, False))
+            return dict(CsvTable.from_rows([index.first_row or [], values]).record(1))
+        table = table or read_table(filepath, use_cache=use_cache)
+        if table is None:
+            return False
+        return dict(table.record(row, skip_header))
+    except Exception as e:
+        print(f"Error selecting filtered row: {e!r}")
+        return False
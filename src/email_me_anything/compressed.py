@@ -0,0 +1,411 @@
+"""
+Reading and random access for compressed CSV files (`.csv.gz`, `.csv.zst`).
+
+Whole-file reads simply stream through the decompressor. Random row picks
+use a checkpoint index instead, so a pick only decompresses one small window
+rather than the whole archive:
+
+- A gzip file may consist of several independent members, and a zstd file of
+  several independent frames (as written by `pigz --independent`, `bgzip`,
+  `zstd --seekable` or `write_seekable`). Each member or frame is a point
+  where decompression can restart with no history.
+- `build_index` scans the archive once and records, for every member or frame,
+  its compressed offset, the first CSV row that starts in it and that row's
+  byte offset within the member's decompressed data. The index is stored next
+  to the archive as `<name>.idx` and is rebuilt when the archive's size or
+  mtime changes.
+- Inside a gzip member, the decompressor state is also copied about every
+  `CHECKPOINT_SPAN` decompressed bytes (as zlib's `zran` example does). These
+  inflate checkpoints hold a 32 KiB window each and zlib cannot serialise
+  them, so they are kept in memory only, at most `MAX_INFLATE_CHECKPOINTS`
+  per archive. Building the index records them, and every pick adds the ones
+  it passes, so a single-member `.csv.gz` only has to be decompressed from
+  the start until the region of a pick has been visited once.
+- `random_row` picks a row number, seeks to the nearest checkpoint and parses
+  forward from there.
+
+zstd decompressor state cannot be copied, so a zstd archive written as a
+single frame has only one checkpoint and a pick decompresses from the start.
+Use `write_seekable` to re-pack such archives (or gzip ones, to make picks
+cheap in every new process).
+
+zstd support needs the optional `zstandard` package
+(`pip install email_me_anything[zstd]`).
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+GZIP_SUFFIX = ".gz"
+ZSTD_SUFFIX = ".zst"
+_CHUNK = 256 * 1024
+_FEED = 32 * 1024
+_ZSTD_SKIPPABLE = range(0x184D2A50, 0x184D2A60)
+CHECKPOINT_SPAN = 1024 * 1024  # decompressed bytes between inflate checkpoints
+MAX_INFLATE_CHECKPOINTS = 512  # ~40 KiB each
+
+def compression_of(filepath: Path) -> str | None:
+    """Return "gzip", "zstd" or None depending on the file suffix."""
+    suffix = Path(filepath).suffix.lower()
+    if suffix == GZIP_SUFFIX:
+        return "gzip"
+    if suffix == ZSTD_SUFFIX:
+        return "zstd"
+    return None
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("Reading .zst files requires the 'zstandard' package (pip install email_me_anything[zstd])") from e
+    return zstandard
+
+def open_text(filepath: Path, raw: io.BufferedIOBase = None) -> io.TextIOBase:
+    """
+    Open a plain, gzip or zstd CSV file as UTF-8 text.
+    Args:
+        filepath (Path): The file to open; compression is chosen by suffix.
+        raw (io.BufferedIOBase, optional): An already opened binary stream of the file
+            to read from instead, e.g. a `csvcache.HashingReader`.
+    Returns:
+        io.TextIOBase: A text stream over the decompressed content.
+    Raises:
+        OSError: If the file cannot be opened.
+        ImportError: If a .zst file is opened without `zstandard` installed.
+    """
+
+    kind = compression_of(filepath)
+    if kind == "gzip":
+        if raw is not None:
+            return io.TextIOWrapper(gzip.GzipFile(fileobj=raw, mode="rb"), encoding="utf-8")
+        return gzip.open(filepath, mode="rt", encoding="utf-8")
+    if kind == "zstd":
+        zstandard = _zstandard()
+        raw = raw or open(filepath, "rb")
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(reader, encoding="utf-8")
+    if raw is not None:
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    return open(filepath, mode="r", encoding="utf-8")
+
+def _new_decompressor(kind: str) -> Any:
+    if kind == "gzip":
+        return zlib.decompressobj(wbits=31)
+    return _zstandard().ZstdDecompressor().decompressobj()
+
+def _skippable_frame_length(data: bytes) -> int:
+    """Length of a zstd skippable frame (e.g. a seek table) at the start of `data`, else 0."""
+    if len(data) >= 8 and int.from_bytes(data[:4], "little") in _ZSTD_SKIPPABLE:
+        return 8 + int.from_bytes(data[4:8], "little")
+    return 0
+
+def _members(file: io.BufferedReader, kind: str, start: int = 0, resume: Tuple[int, Any] = None) -> Iterator[Tuple[int, bytes, Any]]:
+    """
+    Yield (member compressed offset, decompressed chunk, state) triples from `start` onward.
+    Each gzip member / zstd frame is decompressed with a fresh decompressor, so
+    iteration may begin at any member boundary. `state` is None or a (compressed
+    offset, decompressor) pair from which decompression can continue after the
+    chunk; pass `start` and `resume=(member offset, copy of the decompressor)` to
+    do so. The decompressor is live: copy it before the next chunk is read.
+    """
+
+    file.seek(start)
+    offset = start
+    pending = b""
+    while True:
+        if resume is not None:
+            member_start, decompressor = resume
+            fed, resume = start - member_start, None
+            pending = file.read(_CHUNK)
+            if not pending:
+                return
+        else:
+            if len(pending) < 8:
+                chunk = file.read(_CHUNK)
+                if not chunk and not pending:
+                    return
+                pending += chunk
+            skip = _skippable_frame_length(pending) if kind == "zstd" else 0
+            if skip:
+                while len(pending) < skip:
+                    more = file.read(_CHUNK)
+                    if not more:
+                        return
+                    pending += more
+                offset += skip
+                pending = pending[skip:]
+                continue
+            if kind == "gzip" and pending.startswith(b"\0"):
+                # Zero padding between or after members.
+                padding = len(pending) - len(pending.lstrip(b"\0"))
+                offset += padding
+                pending = pending[padding:]
+                continue
+            member_start, decompressor, fed = offset, _new_decompressor(kind), 0
+        while True:
+            # Fed in small pieces, so a state to resume from is offered every few KiB of input.
+            at = 0
+            while at < len(pending) and not decompressor.eof:
+                piece = pending[at:at + _FEED]
+                at += len(piece)
+                data = decompressor.decompress(piece)
+                fed += len(piece)
+                if data:
+                    resumable = not decompressor.eof and hasattr(decompressor, "copy")
+                    yield member_start, data, (member_start + fed, decompressor) if resumable else None
+            if decompressor.eof:
+                offset = member_start + fed - len(decompressor.unused_data)
+                pending = decompressor.unused_data + pending[at:]
+                break
+            pending = file.read(_CHUNK)
+            if not pending:
+                return
+
+def index_path(filepath: Path) -> Path:
+    """Return the checkpoint index location for an archive (`data.csv.gz` -> `data.csv.gz.idx`)."""
+    filepath = Path(filepath)
+    return filepath.with_name(filepath.name + ".idx")
+
+def _lines(chunks: Iterator[bytes], skip: int = 0) -> Iterator[Tuple[int, bytes]]:
+    """Yield (decompressed offset, line) pairs, dropping the first `skip` bytes."""
+    position = 0
+    tail = b""
+    for chunk in chunks:
+        if skip:
+            dropped = min(skip, len(chunk))
+            chunk, skip, position = chunk[dropped:], skip - dropped, position + dropped
+        tail += chunk
+        lines = tail.split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            yield position, line + b"\n"
+            position += len(line) + 1
+    if tail:
+        yield position, tail
+
+class _RowScanner:
+    """Feeds lines to `csv.reader` and remembers where each parsed row started."""
+
+    def __init__(self, lines: Iterator[Tuple[int, bytes]]):
+        self._lines = lines
+        self.next_offset = 0
+        self.reader = csv.reader(self._text())
+
+    def _text(self) -> Iterator[str]:
+        for offset, line in self._lines:
+            self.next_offset = offset + len(line)
+            yield line.decode("utf-8").replace("\r\n", "\n")
+
+    def __iter__(self) -> Iterator[Tuple[int, List[str]]]:
+        while True:
+            start = self.next_offset
+            try:
+                row = next(self.reader)
+            except StopIteration:
+                return
+            yield start, row
+
+_inflate_points: Dict[str, Tuple[Tuple[int, int], List[List[Any]]]] = {}
+_points_lock = threading.Lock()
+
+def _scan(file: io.BufferedReader, kind: str, checkpoint: List[Any], found: List[List[Any]]) -> Iterator[Tuple[int, List[str]]]:
+    """
+    Parse rows forward from `checkpoint`, yielding (row number, row) pairs.
+    Every member start passed becomes a [compressed offset, decompressed offset,
+    first row, skip] checkpoint in `found`; about every `CHECKPOINT_SPAN` bytes
+    inside a gzip member, an inflate checkpoint with a fifth element, the
+    (compressed offset, decompressor) state to resume from, is added as well.
+    """
+
+    member, ustart, number, skip = checkpoint[:4]
+    state = checkpoint[4] if len(checkpoint) > 4 else None
+    boundaries: List[Tuple[int, int, Any]] = []
+
+    def chunks() -> Iterator[bytes]:
+        position = mark = ustart
+        last = member if state else None
+        start, resume = (state[0], (member, state[1].copy())) if state else (member, None)
+        for current, data, after in _members(file, kind, start, resume):
+            if current != last:
+                boundaries.append((current, position, None))
+                last, mark = current, position
+            position += len(data)
+            yield data
+            if after is not None and position - mark >= CHECKPOINT_SPAN:
+                # Copied before the generator resumes and feeds the decompressor more input.
+                boundaries.append((current, position, (after[0], after[1].copy())))
+                mark = position
+
+    done = 0
+    for start, row in _RowScanner(_lines(chunks(), skip)):
+        start += ustart
+        # Every boundary at or before this row that has no row yet starts here.
+        while done < len(boundaries) and boundaries[done][1] <= start:
+            current, position, after = boundaries[done]
+            found.append([current, position, number, start - position] + ([after] if after else []))
+            done += 1
+        yield number, row
+        number += 1
+
+def _remember(index: Dict[str, Any], filepath: Path, found: List[List[Any]]) -> None:
+    """Keep the inflate checkpoints in `found` for later picks from the same archive."""
+    source, key = os.path.abspath(filepath), (index["size"], index["mtime_ns"])
+    with _points_lock:
+        known, points = _inflate_points.get(source, (None, []))
+        if known != key:
+            points = []
+        positions = {cp[1] for cp in points}
+        for checkpoint in found:
+            if len(checkpoint) > 4 and checkpoint[1] not in positions and len(points) < MAX_INFLATE_CHECKPOINTS:
+                points.append(checkpoint)
+        points.sort(key=lambda cp: cp[1])
+        _inflate_points[source] = (key, points)
+
+def _points_for(index: Dict[str, Any], filepath: Path) -> List[List[Any]]:
+    with _points_lock:
+        known, points = _inflate_points.get(os.path.abspath(filepath), (None, []))
+        return list(points) if known == (index["size"], index["mtime_ns"]) else []
+
+def build_index(filepath: Path) -> Dict[str, Any]:
+    """
+    Scan an archive once and write its checkpoint index next to it.
+    Args:
+        filepath (Path): A `.csv.gz` or `.csv.zst` file.
+    Returns:
+        Dict[str, Any]: The index: source size and mtime, total row count (header
+            included), the header row and one [compressed offset, decompressed offset,
+            first row, skip] checkpoint per member or frame.
+    """
+
+    kind = compression_of(filepath)
+    stat = os.stat(filepath)
+    found: List[List[Any]] = []
+    header: List[str] | None = None
+    rows = 0
+    with open(filepath, "rb") as file:
+        for number, row in _scan(file, kind, [0, 0, 0, 0], found):
+            if header is None:
+                header = row
+            rows = number + 1
+    index = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "format": kind,
+        "rows": rows,
+        "header": header or [],
+        "checkpoints": [checkpoint for checkpoint in found if len(checkpoint) == 4],
+    }
+    _remember(index, filepath, found)
+    try:
+        with open(index_path(filepath), "w", encoding="utf-8") as file:
+            json.dump(index, file)
+    except OSError as e:
+        print(f"Could not write index for {filepath}: {e}")
+    return index
+
+def load_index(filepath: Path) -> Dict[str, Any]:
+    """Return the archive's checkpoint index, rebuilding it when missing or stale."""
+    stat = os.stat(filepath)
+    try:
+        with open(index_path(filepath), "r", encoding="utf-8") as file:
+            index = json.load(file)
+        if index["size"] == stat.st_size and index["mtime_ns"] == stat.st_mtime_ns:
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+    return build_index(filepath)
+
+def read_row(filepath: Path, row: int, index: Dict[str, Any] = None) -> List[str]:
+    """
+    Read raw row `row` of an archive by decompressing from its nearest checkpoint.
+    Inflate checkpoints passed on the way are remembered for later reads.
+    Args:
+        filepath (Path): A `.csv.gz` or `.csv.zst` file.
+        row (int): Raw row number (0 is the header row).
+        index (Dict[str, Any], optional): A previously loaded index.
+    Returns:
+        List[str]: The row's fields.
+    Raises:
+        IndexError: If the archive has no such row.
+    """
+
+    index = index or load_index(filepath)
+    if not 0 <= row < index["rows"]:
+        raise IndexError(row)
+    checkpoint = max((cp for cp in index["checkpoints"] + _points_for(index, filepath) if cp[2] <= row),
+                     key=lambda cp: (cp[2], cp[1]))
+    found: List[List[Any]] = []
+    try:
+        with open(filepath, "rb") as file:
+            for number, values in _scan(file, index["format"], checkpoint, found):
+                if number == row:
+                    return values
+    finally:
+        _remember(index, filepath, found)
+    raise IndexError(row)
+
+def random_row(filepath: Path, skip_header: bool = True) -> Dict[str, Any] | None | bool:
+    """
+    Pick a random row from a compressed CSV, decompressing only near that row.
+    Args:
+        filepath (Path): A `.csv.gz` or `.csv.zst` file.
+        skip_header (bool, optional): Whether the first row is a header. Defaults to True.
+    Returns:
+        Dict[str, Any] | None | bool: The row keyed like `convert_row_to_dict`, None when
+            there are no data rows, or False when the archive cannot be read or is empty.
+    """
+
+    from .csvutils import convert_row_to_dict
+
+    try:
+        index = load_index(filepath)
+        if not index["rows"]:
+            print("No data found in CSV.")
+            return False
+        start = 1 if skip_header else 0
+        if index["rows"] <= start:
+            return None
+        values = read_row(filepath, random.randint(start, index["rows"] - 1), index)
+    except Exception as e:
+        print(f"Error reading CSV file: {e}")
+        return False
+    return convert_row_to_dict(values, headers=index["header"] if skip_header else None)
+
+def write_seekable(source: Path, target: Path, frame_size: int = 1024 * 1024) -> Path:
+    """
+    Re-pack a CSV (plain or compressed) into independently decompressible chunks.
+    Args:
+        source (Path): The CSV to read.
+        target (Path): Output path; `.gz` writes multi-member gzip, `.zst` multi-frame zstd.
+        frame_size (int, optional): Uncompressed bytes per member/frame, rounded up to a
+            line end. Defaults to 1 MiB.
+    Returns:
+        Path: `target`.
+    """
+
+    kind = compression_of(target)
+    if kind is None:
+        raise ValueError(f"Unsupported target suffix: {target}")
+    compressor = _zstandard().ZstdCompressor() if kind == "zstd" else None
+    with open_text(source) as text, open(target, "wb") as out:
+        buffer: List[bytes] = []
+        size = 0
+        for line in text:
+            # Frames are sized in encoded bytes, which is what `frame_size` promises.
+            buffer.append(line.encode("utf-8"))
+            size += len(buffer[-1])
+            if size >= frame_size:
+                data = b"".join(buffer)
+                out.write(compressor.compress(data) if compressor else gzip.compress(data))
+                buffer, size = [], 0
+        if buffer:
+            data = b"".join(buffer)
+            out.write(compressor.compress(data) if compressor else gzip.compress(data))
+    return target
@@ -18,7 +18,23 @@ class Config:
         EMAIL_RECIPIENT_0_NAME (str | None): Default recipient display name.
         EMAIL_RECIPIENT_0_ADDRESS (str | None): Default recipient email address.
         PROD_MODE (bool): If True, emails are sent; otherwise written to debug file.
-        MAILER (str): The mailer client to use ('mailersend' or 'smtp').
+        MAILER (str): The transport to use in production mode ('mailersend', 'smtp', 'group',
+            'null', 'memory' or a name registered with `transports.register`).
+        DEBUG_TRANSPORT (str): The transport used when PROD_MODE is False ('debug' writes
+            debug-email.html; 'null' and 'memory' skip the file write).
+        TRANSPORTS (str): Backends of the 'group' mailer as `smtp://` and `mailersend://` URLs
+            (see `transportgroup`).
+        TRANSPORT_STRATEGY (str): How the group picks a backend: 'round_robin' or 'least_outstanding'.
+        BREAKER_FAILURES (int): Consecutive failures after which a group backend is skipped.
+        BREAKER_RESET (float): Seconds before a skipped group backend is probed again.
+        CSV_CACHE (bool): If True, parsed CSVs are cached on disk next to their source.
+        CSV_INCREMENTAL (bool): If True, `read_csv` only parses bytes appended since its last call.
+        PRERENDER_AHEAD (float): Seconds before each scheduled run that the scheduler renders
+            the email of jobs without their own "prerender" setting. 0 renders at send time.
+        PROFILE (str): Comma-separated profiling modes ("cprofile", "memory", "sample" or "all")
+            for `send_lucky_email` and command-line runs. Empty disables profiling.
+        PROFILE_DIR (str): Directory profiling output is written to.
+        PROFILE_INTERVAL (float): Seconds between stack samples of the "sample" profiler.
     """
     EMAIL_SENDER = getenv("EMAIL_SENDER")
     EMAIL_SENDER_ADDRESS = getenv("EMAIL_SENDER_ADDRESS")
@@ -26,6 +42,17 @@ class Config:
     EMAIL_RECIPIENT_0_ADDRESS = getenv("EMAIL_RECIPIENT_0_ADDRESS")
     PROD_MODE = getenv("PROD_MODE", "false").lower() == "true"
     MAILER = getenv("MAILER_CLIENT", "mailersend")
+    DEBUG_TRANSPORT = getenv("EMAIL_DEBUG_TRANSPORT", "debug")
+    TRANSPORTS = getenv("EMAIL_TRANSPORTS", "")
+    TRANSPORT_STRATEGY = getenv("EMAIL_TRANSPORT_STRATEGY", "round_robin")
+    BREAKER_FAILURES = int(getenv("EMAIL_BREAKER_FAILURES") or 5)
+    BREAKER_RESET = float(getenv("EMAIL_BREAKER_RESET") or 30)
+    CSV_CACHE = getenv("CSV_CACHE", "false").lower() == "true"
+    CSV_INCREMENTAL = getenv("CSV_INCREMENTAL", "false").lower() == "true"
+    PRERENDER_AHEAD = float(getenv("EMAIL_PRERENDER_AHEAD") or 0)
+    PROFILE = getenv("EMAIL_PROFILE", "")
+    PROFILE_DIR = getenv("EMAIL_PROFILE_DIR", "profiles")
+    PROFILE_INTERVAL = float(getenv("EMAIL_PROFILE_INTERVAL") or 0.005)
 
 class SMTPSettings:
     """SMTP configuration for sending emails via an SMTP server.
@@ -38,8 +65,11 @@ class SMTPSettings:
         PORT (str | None): SMTP server port (e.g., '465' for SSL).
         USER (str | None): SMTP authentication username.
         PASS (str | None): SMTP authentication password.
+        MAX_RECIPIENTS (int): Most RCPT TO commands sent in one SMTP transaction. A lower
+            limit advertised by the server (LIMITS RCPTMAX) takes precedence.
     """
     HOST = getenv("SMTP_HOST")
     PORT = getenv("SMTP_PORT")
     USER = getenv("SMTP_USER")
-    PASS = getenv("SMTP_PASS")
\ No newline at end of file
+    PASS = getenv("SMTP_PASS")
+    MAX_RECIPIENTS = int(getenv("SMTP_MAX_RECIPIENTS") or 100)
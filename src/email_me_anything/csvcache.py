@@ -0,0 +1,204 @@
+"""
+Persistent on-disk cache of parsed CSV tables.
+
+Every process that calls `read_csv` or `select_random_row` would otherwise
+reparse an unchanged CSV from scratch. This module stores a `CsvTable` next
+to its source as `<name>.csv.cache`, in a flat binary layout that is loaded
+with `mmap` and wrapped in memoryviews, so opening it costs a few syscalls
+rather than a parse.
+
+File layout (sections 8-byte aligned):
+
+    b"EMATBL01" | uint64 metadata length | metadata JSON | sections...
+
+The JSON metadata records the source path, size, mtime and SHA-256 plus the
+offset (relative to the first section), length and typecode of every column
+buffer, offset array and the row width array. Arrays are stored in native
+byte order, which is recorded and checked on load.
+"""
+import hashlib
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .table import CsvTable
+
+MAGIC = b"EMATBL01"
+_HEADER = struct.Struct("<8sQ")
+
+def cache_path(filepath: Path) -> Path:
+    """Return the cache file location for a CSV file (`data.csv` -> `data.csv.cache`)."""
+    filepath = Path(filepath)
+    return filepath.with_name(filepath.name + ".cache")
+
+def file_digest(filepath: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Return the hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class HashingReader(io.RawIOBase):
+    """Binary reader that hashes every byte read through it, so one read of a file
+    serves both parsing and `store_table`'s content hash."""
+
+    def __init__(self, filepath: Path):
+        self._file = open(filepath, "rb")
+        self._digest = hashlib.sha256()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        count = self._file.readinto(buffer)
+        if count:
+            self._digest.update(memoryview(buffer)[:count])
+        return count
+
+    def hexdigest(self) -> str:
+        """Hash whatever the parser left unread, then return the hex SHA-256 of the file."""
+        for chunk in iter(lambda: self._file.read(1024 * 1024), b""):
+            self._digest.update(chunk)
+        return self._digest.hexdigest()
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+def _source_key(filepath: Path, stat: os.stat_result) -> Dict[str, Any]:
+    return {"source": os.path.abspath(filepath), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+def _typecode(values: Any) -> str:
+    return values.format if isinstance(values, memoryview) else values.typecode
+
+def store_table(filepath: Path, table: CsvTable, stat: os.stat_result = None, sha256: str = None) -> bool:
+    """
+    Write `table` as the cache for the CSV at `filepath`.
+    Args:
+        filepath (Path): The CSV file the table was parsed from.
+        table (CsvTable): The parsed table.
+        stat (os.stat_result, optional): Stat of the source taken *before* parsing, so a
+                                         file modified mid-parse is never cached as current.
+        sha256 (str, optional): Hex SHA-256 of the bytes the table was parsed from (see
+                                `HashingReader`). Without it the file is hashed again, and
+                                nothing is stored if it changed since `stat`.
+    Returns:
+        bool: True when the cache was written, False otherwise.
+    Raises:
+        No exceptions are raised; errors are caught and printed to stdout.
+    """
+
+    target = cache_path(filepath)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    try:
+        stat = stat or os.stat(filepath)
+        if sha256 is None:
+            sha256 = file_digest(filepath)
+            if _source_key(filepath, os.stat(filepath)) != _source_key(filepath, stat):
+                print(f"Not caching {filepath}: it changed while being read")
+                return False
+        data, offsets, widths = table.buffers()
+        sections: List[Any] = []
+
+        def add(blob: Any, typecode: str = "B") -> List[Any]:
+            # Section offsets are relative to the start of the (aligned) data region.
+            start = _align(sum(_align(len(memoryview(b).cast("B"))) for b in sections))
+            sections.append(blob)
+            return [start, len(memoryview(blob).cast("B")), typecode]
+
+        meta = dict(_source_key(filepath, stat), sha256=sha256, byteorder=sys.byteorder)
+        meta["columns"] = [
+            {"data": add(buffer), "offsets": add(column_offsets, _typecode(column_offsets))}
+            for buffer, column_offsets in zip(data, offsets)
+        ]
+        meta["widths"] = add(widths, _typecode(widths))
+        meta_bytes = json.dumps(meta).encode("utf-8")
+
+        with open(tmp, "wb") as file:
+            file.write(_HEADER.pack(MAGIC, len(meta_bytes)))
+            file.write(meta_bytes)
+            for blob in sections:
+                file.write(b"\0" * (_align(file.tell()) - file.tell()))
+                file.write(memoryview(blob).cast("B"))
+        os.replace(tmp, target)
+        return True
+    except Exception as e:
+        print(f"Error writing CSV cache: {e}")
+        tmp.unlink(missing_ok=True)
+        return False
+
+def _restamp(target: Path, mapped: mmap.mmap, meta_len: int, meta: Dict[str, Any]) -> None:
+    """Rewrite the cache at `target` with new metadata, copying its data region unchanged."""
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    try:
+        meta_bytes = json.dumps(meta).encode("utf-8")
+        with open(tmp, "wb") as file:
+            file.write(_HEADER.pack(MAGIC, len(meta_bytes)))
+            file.write(meta_bytes)
+            file.write(b"\0" * (_align(file.tell()) - file.tell()))
+            file.write(memoryview(mapped)[_align(_HEADER.size + meta_len):])
+        # The caller's mapping keeps the old file alive until the table is released.
+        os.replace(tmp, target)
+    except OSError as e:
+        print(f"Error updating CSV cache: {e}")
+        tmp.unlink(missing_ok=True)
+
+def load_table(filepath: Path) -> CsvTable | None:
+    """
+    Load the cached table for `filepath` if it is still valid.
+    The cache is valid when it was built from the same absolute path and the
+    source still has the same size and mtime. When only the mtime differs the
+    content hash decides, so a `touch` does not force a reparse; the cache is
+    then stamped with the new mtime so later loads skip the hash again.
+    Args:
+        filepath (Path): The CSV file whose cache should be loaded.
+    Returns:
+        CsvTable | None: A table backed by a read-only memory map, or None when there is
+                         no usable cache.
+    """
+
+    target = cache_path(filepath)
+    try:
+        stat = os.stat(filepath)
+        with open(target, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, meta_len = _HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            return None
+        meta = json.loads(bytes(mapped[_HEADER.size:_HEADER.size + meta_len]))
+        key = _source_key(filepath, stat)
+        if meta["source"] != key["source"] or meta["size"] != key["size"]:
+            return None
+        if meta["byteorder"] != sys.byteorder:
+            return None
+        if meta["mtime_ns"] != key["mtime_ns"]:
+            if meta["sha256"] != file_digest(filepath):
+                return None
+            _restamp(target, mapped, meta_len, dict(meta, mtime_ns=key["mtime_ns"]))
+
+        view = memoryview(mapped)
+        base = _align(_HEADER.size + meta_len)
+
+        def section(entry: List[Any]) -> memoryview:
+            start, length, typecode = entry
+            part = view[base + start:base + start + length]
+            return part if typecode == "B" else part.cast(typecode)
+
+        data = [section(c["data"]) for c in meta["columns"]]
+        offsets = [section(c["offsets"]) for c in meta["columns"]]
+        return CsvTable(data, offsets, section(meta["widths"]))
+    except Exception as e:
+        print(f"Ignoring unreadable CSV cache {target}: {e}")
+        return None
@@ -2,15 +2,35 @@
 CSV utilities for reading and processing CSV files.
 """
 import csv
+import io
+import os
 import random
 from pathlib import Path 
 from typing import Any, Dict, List
 
-def read_csv(filepath: Path) -> List[List[str]] | None:
+from .colindex import random_matching_row
+from .compressed import compression_of, open_text, random_row
+from . import watch
+from .config import Config
+from .csvcache import HashingReader, load_table, store_table
+from .shards import is_sharded, random_row as random_shard_row
+from .sqlitesource import is_sqlite, read_rows, random_row as random_sqlite_row
+from .table import CsvTable
+from .tailcsv import read_incremental
+
+def read_csv(filepath: Path, use_cache: bool = None, incremental: bool = None) -> List[List[str]] | None:
     """
     Read a CSV file and return its contents as a list of rows.
+    `.csv.gz` and `.csv.zst` files are decompressed transparently, and a SQLite
+    database written by `sqlitesource.import_csv` is read back row by row.
     Args:
         filepath (Path): The file path to the CSV file to read.
+        use_cache (bool, optional): Load from / refresh the on-disk parsed-table cache.
+                                    Defaults to Config.CSV_CACHE.
+        incremental (bool, optional): Remember what was parsed and, on later calls, parse
+                                      only rows appended since (see `tailcsv`). Takes
+                                      precedence over the cache for plain CSV files.
+                                      Defaults to Config.CSV_INCREMENTAL.
     Returns:
         List[List[str]] | None: A list of rows, where each row is a list of strings
                                 representing the CSV columns. Returns None if an error
@@ -23,13 +43,72 @@ def read_csv(filepath: Path) -> List[List[str]] | None:
         ...     print(f"Read {len(rows)} rows from CSV")
     """
     
+    use_cache = use_cache if use_cache is not None else Config.CSV_CACHE
+    incremental = incremental if incremental is not None else Config.CSV_INCREMENTAL
+    if incremental and not is_sqlite(filepath) and not compression_of(filepath):
+        try:
+            return read_incremental(filepath)
+        except Exception as e:
+            print(f"Error reading CSV file: {e}")
+            return None
+    if use_cache and not is_sqlite(filepath):
+        table = read_table(filepath, use_cache=True)
+        return table.rows() if table is not None else None
     try:
-        with open(filepath, mode='r', encoding='utf-8') as file:
+        if is_sqlite(filepath):
+            return read_rows(filepath)
+        with open_text(filepath) as file:
             return [row for row in csv.reader(file)]
     except Exception as e:
         print(f"Error reading CSV file: {e}")
         return None
 
+def read_table(filepath: Path, use_cache: bool = None) -> CsvTable | None:
+    """
+    Read a CSV file into a compact columnar `CsvTable`.
+    Rows are streamed from the parser straight into per-column buffers, so the
+    list-of-lists returned by `read_csv` is never built. With caching enabled, an
+    up-to-date `<name>.csv.cache` is memory-mapped instead of parsing, and a stale
+    or missing one is rebuilt after parsing.
+    Args:
+        filepath (Path): The file path to the CSV file to read.
+        use_cache (bool, optional): Load from / refresh the on-disk parsed-table cache.
+                                    Defaults to Config.CSV_CACHE.
+    Returns:
+        CsvTable | None: The parsed table (header row included), or None if an error
+                         occurs during file reading.
+    Example:
+        >>> table = read_table(Path('data.csv'))
+        >>> for record in table.records():
+        ...     print(record["name"])
+    """
+    
+    use_cache = use_cache if use_cache is not None else Config.CSV_CACHE
+    if is_sqlite(filepath):
+        rows = read_csv(filepath)
+        return CsvTable.from_rows(rows) if rows is not None else None
+    if use_cache:
+        table = load_table(filepath)
+        if table is not None:
+            return table
+    try:
+        stat = os.stat(filepath)
+        if use_cache:
+            # The cache records the hash of exactly the bytes parsed, so the file is read once.
+            with HashingReader(filepath) as raw:
+                with open_text(filepath, io.BufferedReader(raw)) as file:
+                    table = CsvTable.from_rows(csv.reader(file))
+                    sha256 = raw.hexdigest()
+        else:
+            with open_text(filepath) as file:
+                table = CsvTable.from_rows(csv.reader(file))
+    except Exception as e:
+        print(f"Error reading CSV file: {e}")
+        return None
+    if use_cache:
+        store_table(filepath, table, stat, sha256)
+    return table
+
 def convert_row_to_dict(row : List[str], headers: List[str]=None) -> Dict[str, Any]:
     """
     Convert a row of data into a dictionary.
@@ -59,17 +138,33 @@ def convert_row_to_dict(row : List[str], headers: List[str]=None) -> Dict[str, A
     else:
         return {f"col{idx}": val for idx, val in enumerate(row)}
 
-def select_random_row(csv_path: Path, skip_header: bool=True) -> Dict[str, Any] | None:
+def select_random_row(csv_path: Path, skip_header: bool=True, use_cache: bool = None, incremental: bool = None,
+                      where: Dict[str, str] = None) -> Dict[str, Any] | None:
     """
     Select a random row from a CSV file and return it as a dictionary.
+    For `.csv.gz` and `.csv.zst` files (without the parsed-table cache) only the
+    region around the chosen row is decompressed, using a checkpoint index kept
+    next to the archive; see `email_me_anything.compressed`.
+    `csv_path` may also be a directory or glob of CSV shards, in which case the
+    pick is uniform over the rows of all shards; see `email_me_anything.shards`.
+    A `.db`/`.sqlite` path written by `sqlitesource.import_csv` is sampled with a
+    single rowid lookup.
     Args:
-        csv_path (Path): The file path to the CSV file to read.
+        csv_path (Path): The CSV file, or a directory / glob pattern of CSV shards.
         skip_header (bool, optional): Whether to skip the first row as a header. 
                                       Defaults to True.
+        use_cache (bool, optional): Load from / refresh the on-disk parsed-table cache.
+                                    Defaults to Config.CSV_CACHE.
+        incremental (bool, optional): Pick from rows kept by `read_csv(..., incremental=True)`,
+                                      parsing only appended rows. Defaults to Config.CSV_INCREMENTAL.
+        where (Dict[str, str], optional): Only pick among rows whose columns equal these
+                                          values, using a persisted inverted index per
+                                          column (see `colindex`). Single CSV files only.
     Returns:
         Dict[str, Any] | None | bool: A dictionary representing the randomly selected row on success.
             Returns False if the CSV could not be read (for example, file access error).
-            Returns None if the CSV exists but contains no data rows (only a header or empty).
+            Returns None if the CSV exists but contains no data rows (only a header or empty),
+            or no row matches `where`.
 
     Raises:
         None explicitly, but may raise exceptions from `read_csv()` or `convert_row_to_dict()`.
@@ -79,11 +174,49 @@ def select_random_row(csv_path: Path, skip_header: bool=True) -> Dict[str, Any]
         {'name': 'John', 'age': '30', 'email': 'john@example.com'}
     """
     
-    table = read_csv(csv_path)
+    if where:
+        return random_matching_row(csv_path, where, skip_header, use_cache)
+    use_cache = use_cache if use_cache is not None else Config.CSV_CACHE
+    if is_sqlite(csv_path):
+        return random_sqlite_row(csv_path, skip_header)
+    if is_sharded(csv_path):
+        return random_shard_row(csv_path, skip_header, use_cache)
+    if compression_of(csv_path) and not use_cache:
+        return random_row(csv_path, skip_header)
+    incremental = incremental if incremental is not None else Config.CSV_INCREMENTAL
+    if incremental:
+        rows = read_csv(csv_path, incremental=True)
+        if not rows:
+            print("No data found in CSV.")
+            return False
+        start = 1 if skip_header else 0
+        if len(rows) <= start:
+            return None
+        return convert_row_to_dict(rows[random.randint(start, len(rows) - 1)], headers=rows[0] if skip_header else None)
+    watcher = watch.active()
+    if watcher is not None:
+        # Keep the parsed table in memory until the file changes.
+        table = watcher.cached(csv_path, lambda path: read_table(path, use_cache=use_cache), f"table:{use_cache}")
+    else:
+        table = read_table(csv_path, use_cache=use_cache)
     if not table:
         print("No data found in CSV.")
         return False
+    return pick_random_row(table, skip_header)
+
+def pick_random_row(table: CsvTable, skip_header: bool=True) -> Dict[str, Any] | None:
+    """
+    Pick a random data row from an already loaded table.
+    Args:
+        table (CsvTable): The table to pick from, e.g. from `read_table()`.
+        skip_header (bool, optional): Whether to skip the first row as a header.
+                                      Defaults to True.
+    Returns:
+        Dict[str, Any] | None: The selected row as a dictionary, or None when the table
+                               has no data rows.
+    """
+    
     start = 1 if skip_header else 0
     if len(table) <= start:
         return None
-    return convert_row_to_dict(table[random.randint(start, len(table) - 1)], headers=table[0] if skip_header else None)
+    return dict(table.record(random.randint(start, len(table) - 1), skip_header))
@@ -4,24 +4,36 @@ Supports both MailerSend API and SMTP for sending emails based on configuration.
 
 Functions:
 - build_context: Creates a context dictionary for template rendering.
-- build_html_content: Renders an HTML template with provided data.
-- send_email: Sends an email via the configured mailer (MailerSend or SMTP).
+- build_contexts / iter_contexts: Build contexts for many table rows at once by column projection.
+- build_html_content: Renders an HTML template with provided data, optionally memoised.
+- read_template: Reads a template file, cached in memory while a file watcher is active.
+- send_email: Sends an email via the configured transport (MailerSend, SMTP, a transport group, ...).
+- send_bulk: Sends many (recipient, content) pairs, batching recipients that share content.
+
+Both senders take `attachments`: file paths or `attachments.Attachment`s.
 """
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple
 
 from mailersend import MailerSendClient, EmailBuilder
 
-from email.message import EmailMessage
-from email.utils import formataddr
+from email_me_anything import transports, watch
+from email_me_anything.attachments import Attachment, as_attachments
 from email_me_anything.config import Config, SMTPSettings
-import smtplib, ssl
+from email_me_anything.inline import embed_images, images_in
+from email_me_anything.mimeskeleton import skeleton_for
+from email_me_anything.rendercache import RenderCache
+from email_me_anything.table import CsvTable
+from email_me_anything.templating import compile_template, uses_blocks
+from email_me_anything.transportgroup import PartialDeliveryError
+import re, smtplib, ssl
 
-def build_context(data: Dict[str, Any], variable_map: Dict[str, str] = None) -> Dict[str, Any]:
+def build_context(data: Mapping[str, Any], variable_map: Dict[str, str] = None) -> Mapping[str, Any]:
     """
     Build a context dictionary by mapping data keys to template variables.
     Args:
-        data: A dictionary containing the source data to be mapped.
+        data: A dictionary (or any mapping, such as a `RowView` from `read_table`)
+              containing the source data to be mapped.
         variable_map: Optional dictionary mapping template variable names to data keys.
                      If None, returns the data dictionary as-is.
     Returns:
@@ -43,16 +55,82 @@ def build_context(data: Dict[str, Any], variable_map: Dict[str, str] = None) ->
         for template_var, data_key in variable_map.items():
             context[template_var] = data.get(data_key, "")
     return context
-        
-def build_html_content(template_path: Path, data: Dict[str, Any], variable_map: Dict[str, Any] = None) -> str:
+
+def build_contexts(table: CsvTable | Sequence[Sequence[str]], variable_map: Dict[str, str] = None,
+                   start: int = None, stop: int = None, skip_header: bool = True) -> List[Dict[str, str]]:
+    """
+    Build template contexts for a block of rows in one pass.
+    `variable_map` is resolved to column positions once; each mapped column is
+    then decoded for the whole block with `CsvTable.column` and the contexts
+    are assembled by zipping the columns, so there is no per-row key lookup.
+    The result equals `[build_context(dict(table.record(r, skip_header)), variable_map)
+    for r in range(start, stop)]`.
+    Args:
+        table (CsvTable | Sequence[Sequence[str]]): Rows from `read_table`, or raw rows as
+            returned by `read_csv` (converted to a `CsvTable` first).
+        variable_map (Dict[str, str], optional): Template variable -> column name. When
+            None, every column is included under its own name.
+        start (int, optional): First raw row. Defaults to 1 with a header, else 0.
+        stop (int, optional): Row to stop before. Defaults to the end of the table.
+        skip_header (bool, optional): Whether row 0 is a header naming the columns.
+            Defaults to True.
+    Returns:
+        List[Dict[str, str]]: One context per row.
+    Example:
+        >>> table = CsvTable.from_rows([["user_name", "email"], ["John", "john@example.com"]])
+        >>> build_contexts(table, {"name": "user_name"})
+        [{'name': 'John'}]
+    """
+
+    if not isinstance(table, CsvTable):
+        table = CsvTable.from_rows(table)
+    named = skip_header and bool(table.headers)
+    start = (1 if skip_header else 0) if start is None else start
+    stop = len(table) if stop is None else min(stop, len(table))
+    count = max(0, stop - start)
+    if variable_map is None:
+        if named:
+            variable_map = {key: key for key in table.headers}
+        else:
+            # Without a header each row only has keys for the fields it really has.
+            return [dict(table.record(row, False)) for row in range(start, stop)]
+    names = list(variable_map)
+    columns = []
+    for key in variable_map.values():
+        col = table.column_index(key, named)
+        columns.append(table.column(col, start, stop) if col is not None else [""] * count)
+    return [dict(zip(names, values)) for values in zip(*columns)] if names else [{} for _ in range(count)]
+
+def iter_contexts(table: CsvTable | Sequence[Sequence[str]], variable_map: Dict[str, str] = None,
+                  skip_header: bool = True, block_size: int = 4096) -> Iterator[Dict[str, str]]:
+    """
+    Yield a context for every data row, built `block_size` rows at a time by `build_contexts`.
+    Memory stays bounded by the block size however many rows the table has.
+    """
+
+    if not isinstance(table, CsvTable):
+        table = CsvTable.from_rows(table)
+    for block in range(1 if skip_header else 0, len(table), block_size):
+        yield from build_contexts(table, variable_map, block, block + block_size, skip_header)
+
+def build_html_content(template_path: Path, data: Dict[str, Any], variable_map: Dict[str, Any] = None, cache: RenderCache = None,
+                       inline_images: bool = False) -> str:
     """
     Build HTML content by rendering a template with provided data.
+    Templates with only `{name}` placeholders are rendered with `str.format_map`;
+    templates using `{% for %}` / `{% if %}` blocks or `|filters` are compiled once
+    by `templating.compile_template` and the compiled function is reused.
 
     Args:
         template_path (Path): Path to the HTML template file.
         data (Dict[str, Any]): Dictionary containing data to be used in the template.
         variable_map (Dict[str, Any], optional): Optional mapping to transform or alias variables
             from the data dictionary. Defaults to None.
+        cache (RenderCache, optional): Render cache to consult before rendering. Repeated
+            (template, data, variable_map) combinations are served from it. Defaults to None.
+        inline_images (bool, optional): Rewrite local `<img src>` paths (relative to the
+            template's directory) to `cid:` URLs; `send_email` then embeds the images
+            (see `inline`). Defaults to False.
 
     Returns:
         str: Rendered HTML content with variables substituted from the context.
@@ -60,20 +138,56 @@ def build_html_content(template_path: Path, data: Dict[str, Any], variable_map:
     Raises:
         FileNotFoundError: If the template file does not exist at template_path.
         KeyError: If a required variable in the template is missing from the context.
+        TemplateSyntaxError: If a template using `{% ... %}` blocks or `|filters` is invalid.
         UnicodeDecodeError: If the template file cannot be decoded as UTF-8.
     """
     
+    if cache is not None:
+        key = cache.key(template_path, data, variable_map)
+        if inline_images:
+            key = (key, "inline")
+        return cache.get_or_render(key, lambda: build_html_content(template_path, data, variable_map, inline_images=inline_images))
     context = build_context(data, variable_map)
+    source = read_template(template_path)
+    if uses_blocks(source):
+        html_content = compile_template(source)(context)
+    else:
+        html_content = source.format_map(context)
+    if inline_images:
+        return embed_images(html_content, Path(template_path).parent)
+    return html_content
+
+def read_template(template_path: Path) -> str:
+    """
+    Return a template's text, kept in memory until the file changes while a watcher is active.
+    Raises:
+        FileNotFoundError: If the template file does not exist.
+    """
+
+    watcher = watch.active()
+    if watcher is not None:
+        return watcher.cached(template_path, _load_template, "template")
+    return _load_template(template_path)
+
+def _load_template(template_path: Path) -> str:
     with open(template_path, "r", encoding="utf-8") as file:
-        html_template = file.read()
-    return html_template.format_map(context)
+        return file.read()
 
-def send_email(sender: Dict[str, str], recipients: List[Dict[str, str]], subject: str, html_content: str) -> Dict[str, Any]:
-    """Send an email using the configured mailer service (MailerSend or SMTP).
+def send_email(sender: Dict[str, str], recipients: List[Dict[str, str]], subject: str, html_content: str, text_content: str = None,
+               attachments: Sequence[Attachment | Path | str] = None, transport: str = None) -> Dict[str, Any] | None:
+    """Send an email through a registered transport (MailerSend, SMTP, ...).
 
-    The mailer is selected based on Config.MAILER ('mailersend' or 'smtp').
-    When PROD_MODE is False, no email is sent and the HTML content is written
-    to 'debug-email.html' for inspection.
+    The transport is looked up in the `transports` registry by Config.MAILER
+    ('mailersend', 'smtp', 'group', 'null', 'memory' or a registered
+    third-party name); 'group' balances sends over the relays and accounts
+    listed in EMAIL_TRANSPORTS (see `transportgroup`).
+    Over SMTP a single recipient is addressed directly; several recipients are
+    sent one message with a hidden ("undisclosed-recipients") To header and
+    the addresses only in the envelope, split into transactions of at most
+    SMTPSettings.MAX_RECIPIENTS RCPT TO commands each.
+    When PROD_MODE is False, Config.DEBUG_TRANSPORT is used instead; by default
+    ('debug') no email is sent and the HTML content is written to
+    'debug-email.html' for inspection.
 
     Args:
         sender (Dict[str, str]): A dictionary containing the sender's email address and name.
@@ -82,12 +196,22 @@ def send_email(sender: Dict[str, str], recipients: List[Dict[str, str]], subject
             Each dictionary should contain "email" and "name" keys.
         subject (str): The subject line of the email.
         html_content (str): The HTML-formatted body content of the email.
+        text_content (str, optional): Plain-text alternative, e.g. from `HtmlOptimizer`.
+            Defaults to a static "does not support HTML" notice.
+        attachments (Sequence[Attachment | Path | str], optional): Files to attach. Over SMTP
+            they are memory-mapped and streamed into DATA as base64; their encoded form is
+            cached for later sends (see `attachments`). Defaults to None. Images referenced
+            by `cid:` URLs from `build_html_content(..., inline_images=True)` are embedded
+            automatically.
+        transport (str, optional): Name of the transport to use instead of the configured one.
 
     Returns:
-        Dict[str, Any]: A dictionary containing the response from the mailer service.
+        Dict[str, Any] | None: A dictionary containing the response from the mailer service.
             In debug mode, returns {"status": "debug", "message": "..."}.
 
     Raises:
+        KeyError: If the transport name is not registered (see `transports`).
+        FileNotFoundError: If an attachment path does not exist.
         Exception: May raise exceptions from the mailer client if the email
             fails to send (e.g., invalid email addresses, authentication errors).
 
@@ -97,42 +221,187 @@ def send_email(sender: Dict[str, str], recipients: List[Dict[str, str]], subject
         >>> response = send_email(sender, recipients, "Hello", "<p>Hello World</p>")
     """
     
-    if Config.PROD_MODE:
-        if Config.MAILER=="mailersend":
-            ms = MailerSendClient()
-            email = (
-                EmailBuilder()
-                .from_email(sender["email"], sender["name"])
-                .to_many(recipients)
-                .subject(subject)
-                .html(html_content)
-                .build()
-            )
-            response = ms.emails.send(email).to_dict()
-        elif Config.MAILER=="smtp":
-            msg = EmailMessage()
-            msg["Subject"] = subject
-            msg["From"] = formataddr((sender["name"], sender["email"]))
-            msg["To"] = recipients[0]["email"]
-            msg.set_content("Your email does not support HTML content")
-            msg.add_alternative(html_content, subtype="html")
-            
-            ctx = ssl.create_default_context()
-            response = None
-            with smtplib.SMTP_SSL(SMTPSettings.HOST, SMTPSettings.PORT, context=ctx,timeout=30) as server:
-                server.ehlo() # If failed here HOST or PORT Wrong                 
-                server.login(SMTPSettings.USER, SMTPSettings.PASS) # If failed here USER or PASS wrong
-                response = server.send_message(msg) # If failed here issue sending mail (check sender/reciever email address or content or attachment)
-            if response:
-                response = dict(response)
+    name = transport or (Config.MAILER if Config.PROD_MODE else Config.DEBUG_TRANSPORT)
+    deliver = transports.get(name)
+    attachments = as_attachments(attachments) + images_in(html_content)
+    return deliver(sender, recipients, subject, html_content, text_content=text_content, attachments=attachments)
+
+def _send_mailersend(sender: Dict[str, str], recipients: List[Dict[str, str]], subject: str, html_content: str, text_content: str = None,
+                     attachments: Sequence[Attachment] = (), api_key: str = None) -> Dict[str, Any]:
+    """Send one message through the MailerSend API.
+
+    `api_key` selects the account; by default the client reads MAILERSEND_API_KEY.
+    """
+    ms = MailerSendClient(api_key=api_key) if api_key else MailerSendClient()
+    builder = (
+        EmailBuilder()
+        .from_email(sender["email"], sender["name"])
+        .to_many(recipients)
+        .subject(subject)
+        .html(html_content)
+    )
+    if text_content:
+        builder = builder.text(text_content)
+    email = builder.build()
+    if attachments:
+        email.attachments = [_mailersend_attachment(attachment) for attachment in attachments]
+    return ms.emails.send(email).to_dict()
+
+def _mailersend_attachment(attachment: Attachment) -> Any:
+    # Built from the cached encoding instead of `EmailBuilder.attach_file`, which re-reads the file.
+    from mailersend.models.email import EmailAttachment
+    return EmailAttachment(content=attachment.base64(), filename=attachment.filename, disposition=attachment.disposition,
+                           id=attachment.content_id)
+
+def _rcpt_limit(server: smtplib.SMTP) -> int:
+    """Return the per-transaction recipient limit, honouring an advertised LIMITS RCPTMAX."""
+    limit = SMTPSettings.MAX_RECIPIENTS
+    for token in server.esmtp_features.get("limits", "").split():
+        name, _, value = token.partition("=")
+        if name.upper() == "RCPTMAX" and value.isdigit():
+            limit = min(limit, int(value))
+    return max(1, limit)
+
+def _send_smtp(sender: Dict[str, str], recipients: List[Dict[str, str]], subject: str, html_content: str, personalize: bool = False, text_content: str = None,
+               attachments: Sequence[Attachment] = (), host: str = None, port: int | str = None, user: str = None,
+               password: str = None) -> Dict[str, Any]:
+    """Send one message to every recipient over a single SMTP connection.
+
+    The MIME body is serialised once (see `mimeskeleton`). By default the
+    recipients share transactions of up to the RCPT TO limit; with
+    `personalize`, each recipient gets their own transaction with their own
+    To header, reusing the same encoded body. Messages with attachments are
+    written to the DATA stream chunk by chunk (see `_stream_mail`).
+    `host`, `port`, `user` and `password` default to `SMTPSettings`.
+    A failure after some transactions were accepted raises `PartialDeliveryError`
+    listing the delivered addresses, so the message is not resent to them.
+    """
+    if not recipients:
+        raise ValueError("At least one recipient is required")
+    skeleton = skeleton_for(sender, subject, html_content, text_content, attachments)
+    addresses = [recipient["email"] for recipient in recipients]
+
+    def deliver(to_addrs: List[str], recipient: Dict[str, str] = None) -> Dict[str, Any]:
+        if skeleton.attachments:
+            return _stream_mail(server, sender["email"], to_addrs, skeleton.chunks(recipient))
+        return server.sendmail(sender["email"], to_addrs, skeleton.render(recipient))
+
+    ctx = ssl.create_default_context()
+    refused: Dict[str, Any] = {}
+    host = SMTPSettings.HOST if host is None else host
+    port = SMTPSettings.PORT if port is None else port
+    user = SMTPSettings.USER if user is None else user
+    password = SMTPSettings.PASS if password is None else password
+    with smtplib.SMTP_SSL(host, port, context=ctx,timeout=30) as server:
+        server.ehlo() # If failed here HOST or PORT Wrong                 
+        server.login(user, password) # If failed here USER or PASS wrong
+        # If sending fails below: check sender/reciever email address or content or attachment
+        delivered: List[str] = []
+        try:
+            if personalize or len(recipients) == 1:
+                for recipient in recipients:
+                    refused.update(deliver([recipient["email"]], recipient) or {})
+                    delivered.append(recipient["email"])
             else:
-                response = {"status": "success", "message":"email sent successfully"}
-                
+                # Several recipients share one body, so keep them out of the headers (BCC semantics).
+                limit = _rcpt_limit(server)
+                for start in range(0, len(addresses), limit):
+                    refused.update(deliver(addresses[start:start + limit]) or {})
+                    delivered.extend(addresses[start:start + limit])
+        except Exception as error:
+            accepted = [address for address in delivered if address not in refused]
+            if accepted:
+                raise PartialDeliveryError(accepted, error) from error
+            raise
+    if refused:
+        return dict(refused)
+    return {"status": "success", "message":"email sent successfully"}
+
+_LEADING_DOT = re.compile(rb"(?m)^\.")
+
+def _stream_mail(server: smtplib.SMTP, from_addr: str, to_addrs: List[str], chunks: Iterable[bytes]) -> Dict[str, Any]:
+    """
+    `SMTP.sendmail` for a message given as chunks: MAIL, RCPT, then DATA written chunk by chunk.
+    Every chunk must start at the beginning of a line (as `MimeSkeleton.chunks` does), so
+    leading dots can be escaped per chunk.
+    Returns:
+        Dict[str, Any]: Refused recipients, as `sendmail` returns them.
+    Raises:
+        smtplib.SMTPSenderRefused, smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError:
+            As `sendmail` does.
+    """
+
+    code, resp = server.mail(from_addr)
+    if code != 250:
+        server.rset()
+        raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+    refused = {}
+    for address in to_addrs:
+        code, resp = server.rcpt(address)
+        if code not in (250, 251):
+            refused[address] = (code, resp)
+    if len(refused) == len(to_addrs):
+        server.rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+    code, resp = server.docmd("data")
+    if code != 354:
+        server.rset()
+        raise smtplib.SMTPDataError(code, resp)
+    last = b"\r\n"
+    for chunk in chunks:
+        if chunk:
+            server.send(_LEADING_DOT.sub(b"..", chunk))
+            last = chunk
+    server.send(b".\r\n" if last.endswith(b"\r\n") else b"\r\n.\r\n")
+    code, resp = server.getreply()
+    if code != 250:
+        server.rset()
+        raise smtplib.SMTPDataError(code, resp)
+    return refused
+
+def send_bulk(sender: Dict[str, str], subject: str, messages: Iterable[Tuple[Dict[str, str], str]], personalize: bool = False,
+              attachments: Sequence[Attachment | Path | str] = None, transport: str = None) -> List[Dict[str, Any]]:
+    """Send many (recipient, html_content) pairs, grouping recipients that share identical content.
+
+    Over SMTP (any transport registered with `bcc=True`) each group becomes one
+    message delivered with many RCPT TO commands per transaction (see
+    `send_email`), so an announcement to 50k recipients costs a few hundred
+    DATA transfers instead of 50k. Other transports, which would expose every
+    address in the To header, still get one call per recipient.
+
+    Args:
+        sender (Dict[str, str]): Sender with "email" and "name" keys.
+        subject (str): Subject line shared by every message.
+        messages (Iterable[Tuple[Dict[str, str], str]]): (recipient, html_content) pairs.
+        personalize (bool, optional): Over SMTP, address each recipient in their own To
+            header instead of batching envelopes. The MIME body of each group is still
+            encoded only once and only the To, Message-ID and Date headers change.
+            Defaults to False.
+        attachments (Sequence[Attachment | Path | str], optional): Files attached to every
+            message. Each file is encoded once and the encoding is reused for every send.
+            Defaults to None.
+        transport (str, optional): Name of the transport to use instead of the configured one.
+
+    Returns:
+        List[Dict[str, Any]]: One `send_email` response per call made.
+
+    Example:
+        >>> send_bulk(sender, "News", [(alice, html), (bob, html)])  # one SMTP message
+    """
+
+    groups: Dict[str, List[Dict[str, str]]] = {}
+    for recipient, html_content in messages:
+        groups.setdefault(html_content, []).append(recipient)
+    name = transport or (Config.MAILER if Config.PROD_MODE else Config.DEBUG_TRANSPORT)
+    attachments = as_attachments(attachments)
+    extra: Dict[str, Any] = {"attachments": attachments} if attachments else {}
+    if transport:
+        extra["transport"] = transport
+    responses = []
+    for html_content, recipients in groups.items():
+        if transports.bcc(name):
+            responses.append(transports.get(name)(sender, recipients, subject, html_content, personalize=personalize,
+                                                  attachments=attachments + images_in(html_content)))
         else:
-            print("Some error happened need to debug. See emailutils.py:94")
-    else:
-        response = {"status": "debug", "message": "Email not sent in non-production mode."}
-        print("Production mode is OFF. Writing email to debug-email.html")
-        with open("debug-email.html", "w", encoding="utf-8") as debug_file:
-            debug_file.write(html_content)
-    return response
+            responses.extend(send_email(sender, [recipient], subject, html_content, **extra) for recipient in recipients)
+    return responses
@@ -0,0 +1,249 @@
+"""
+Post-render optimisation of HTML email bodies.
+
+Templates are usually written for humans: indented, commented and with the
+same inline styles repeated on many elements. None of that is needed by the
+recipient's client, but all of it is transmitted with every message. This
+module shrinks rendered HTML before it is sent:
+
+- `minify_html` drops comments (keeping Outlook conditional comments) and
+  collapses insignificant whitespace, leaving `<pre>`, `<textarea>`,
+  `<script>` and `<style>` contents untouched.
+- `collapse_inline_css` normalises `style` attributes: repeated identical
+  declarations are reduced to the last one, and spacing is removed. A
+  property repeated with different values is kept, as such repeats are
+  usually fallbacks for clients that ignore the later value.
+- `html_to_text` derives a readable plain-text alternative, replacing the
+  static "Your email does not support HTML content" part.
+
+`HtmlOptimizer` chains the steps, caches results by content and reports the
+bytes saved.
+"""
+import hashlib
+import html as htmllib
+import re
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import Dict, List, NamedTuple
+
+_PRESERVE = re.compile(r"(<(pre|textarea|script|style)\b[^>]*>.*?</\2\s*>)", re.IGNORECASE | re.DOTALL)
+_COMMENT = re.compile(r"<!--(?!\[if|<!\[endif).*?-->", re.DOTALL)
+_BLOCK_TAG = re.compile(
+    r"\s*(</?(?:html|head|body|meta|link|title|div|p|table|thead|tbody|tfoot|tr|td|th|ul|ol|li"
+    r"|h[1-6]|br|hr|blockquote|section|article|header|footer|center)\b[^>]*>)\s*",
+    re.IGNORECASE,
+)
+_WHITESPACE = re.compile(r"\s+")
+_TAG = re.compile(r"""<[a-zA-Z](?:"[^"]*"|'[^']*'|[^'">])*>""")
+_STYLE_ATTR = re.compile(r"""(\sstyle\s*=\s*)(["'])(.*?)\2""", re.IGNORECASE | re.DOTALL)
+_SEMICOLON_IN_PARENS = re.compile(r"\([^)]*;")
+_DECLARATION = re.compile(r"""(?:[^;"']|"[^"]*"|'[^']*')+""")
+
+def minify_html(html: str) -> str:
+    """
+    Remove comments and insignificant whitespace from HTML.
+    Whitespace around block-level tags is dropped and other runs of whitespace
+    collapse to a single space, which is how browsers render them anyway.
+    Args:
+        html (str): The HTML to minify.
+    Returns:
+        str: The minified HTML.
+    Example:
+        >>> minify_html("<p>\\n  Hello   <b>world</b>  <!-- note -->\\n</p>")
+        '<p>Hello <b>world</b></p>'
+    """
+
+    parts = _PRESERVE.split(html)
+    out: List[str] = []
+    # re.split with two groups yields [text, block, tag name, text, block, tag name, ...]
+    for idx in range(0, len(parts), 3):
+        text = _COMMENT.sub("", parts[idx])
+        text = _BLOCK_TAG.sub(r"\1", text)
+        out.append(_WHITESPACE.sub(" ", text))
+        if idx + 1 < len(parts):
+            out.append(parts[idx + 1])
+    return "".join(out).strip()
+
+def _collapse_declarations(style: str) -> str:
+    declarations: Dict[str, None] = {}
+    # A semicolon inside a quoted string (font names, `content`) does not end a declaration.
+    for declaration in _DECLARATION.findall(style):
+        name, sep, value = declaration.partition(":")
+        name, value = name.strip().lower(), _WHITESPACE.sub(" ", value.strip())
+        if not sep or not name or not value:
+            continue
+        # Only an identical earlier declaration is redundant; different values of the same
+        # property (`background:#fff;background:linear-gradient(...)`) are fallbacks.
+        declarations.pop(f"{name}:{value}", None)
+        declarations[f"{name}:{value}"] = None
+    return ";".join(declarations)
+
+def collapse_inline_css(html: str) -> str:
+    """
+    Normalise every inline `style` attribute.
+    A declaration repeated with the same value is kept only in its last
+    position; spacing and trailing semicolons are removed and empty attributes
+    dropped. Only attributes of tags are touched, never text or the contents
+    of `<pre>`, `<textarea>`, `<script>` and `<style>`.
+    Args:
+        html (str): The HTML to process.
+    Returns:
+        str: HTML with collapsed inline styles.
+    Example:
+        >>> collapse_inline_css('<p style="color: red; margin: 0; color: red;">x</p>')
+        '<p style="margin:0;color:red">x</p>'
+    """
+
+    def replace(match: re.Match) -> str:
+        # The attribute value is HTML-escaped: `&quot;` hides a quote and a semicolon.
+        style, quote = htmllib.unescape(match.group(3)), match.group(2)
+        if _SEMICOLON_IN_PARENS.search(style) or style.count('"') % 2 or style.count("'") % 2:
+            # e.g. url(data:image/png;base64,...) or an unbalanced quote -- not safe to split on ";"
+            return match.group(0)
+        collapsed = _collapse_declarations(style)
+        return f" style={quote}{htmllib.escape(collapsed)}{quote}" if collapsed else ""
+
+    def in_tag(match: re.Match) -> str:
+        return _STYLE_ATTR.sub(replace, match.group(0))
+
+    parts = _PRESERVE.split(html)
+    out: List[str] = []
+    for idx in range(0, len(parts), 3):
+        out.append(_TAG.sub(in_tag, parts[idx]))
+        if idx + 1 < len(parts):
+            # Of a preserved block only the opening tag is rewritten.
+            block = parts[idx + 1]
+            opening = _TAG.match(block)
+            out.append(in_tag(opening) + block[opening.end():] if opening else block)
+    return "".join(out)
+
+class _TextExtractor(HTMLParser):
+    _BLOCKS = {"p", "div", "br", "tr", "table", "h1", "h2", "h3", "h4", "h5", "h6", "li", "ul", "ol", "blockquote", "hr", "section", "article", "header", "footer"}
+    _SKIP = {"script", "style", "head", "title"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip = 0
+        self._links: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skip += 1
+        elif tag in self._BLOCKS:
+            self.parts.append("\n")
+        if tag == "li":
+            self.parts.append("- ")
+        if tag == "a":
+            self._links.append(dict(attrs).get("href") or "")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self._skip = max(0, self._skip - 1)
+        elif tag in self._BLOCKS and tag != "li":
+            self.parts.append("\n")
+        if tag == "a" and self._links:
+            href = self._links.pop()
+            if href and not href.startswith(("#", "mailto:", "cid:")):
+                self.parts.append(f" ({href})")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(_WHITESPACE.sub(" ", data))
+
+def html_to_text(html: str) -> str:
+    """
+    Derive a plain-text alternative from HTML.
+    Block elements become line breaks, list items are bulleted, link targets
+    are appended in parentheses and scripts, styles and the document head
+    are skipped.
+    Args:
+        html (str): The HTML to convert.
+    Returns:
+        str: Readable plain text.
+    Example:
+        >>> html_to_text('<h1>Hi</h1><p>See <a href="https://x.io">this</a></p>')
+        'Hi\\n\\nSee this (https://x.io)'
+    """
+
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    lines = [line.strip() for line in "".join(parser.parts).split("\n")]
+    text = "\n".join(lines)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+class OptimizedContent(NamedTuple):
+    """Result of `HtmlOptimizer.optimize`."""
+    html: str
+    text: str | None
+    original_bytes: int
+    optimized_bytes: int
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.optimized_bytes
+
+class HtmlOptimizer:
+    """Minify HTML, collapse inline CSS and build a text part, caching by content.
+
+    Attributes:
+        minify (bool): Run `minify_html`.
+        collapse_css (bool): Run `collapse_inline_css`.
+        plain_text (bool): Generate a plain-text alternative with `html_to_text`.
+        max_entries (int): Most results kept in the cache.
+        bytes_in (int): Total UTF-8 bytes of HTML given to `optimize`.
+        bytes_out (int): Total UTF-8 bytes of HTML returned by `optimize`.
+    """
+
+    def __init__(self, minify: bool = True, collapse_css: bool = True, plain_text: bool = True, max_entries: int = 256):
+        self.minify = minify
+        self.collapse_css = collapse_css
+        self.plain_text = plain_text
+        self.max_entries = max_entries
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._cache: "OrderedDict[bytes, OptimizedContent]" = OrderedDict()
+
+    def optimize(self, html: str) -> OptimizedContent:
+        """
+        Optimise rendered HTML, reusing the cached result for identical content.
+        Args:
+            html (str): Rendered HTML, as returned by `build_html_content`.
+        Returns:
+            OptimizedContent: The optimised HTML, the text alternative (or None) and sizes.
+        """
+
+        encoded = html.encode("utf-8")
+        key = hashlib.sha1(encoded).digest()
+        result = self._cache.get(key)
+        if result is None:
+            optimized = html
+            if self.collapse_css:
+                optimized = collapse_inline_css(optimized)
+            if self.minify:
+                optimized = minify_html(optimized)
+            text = html_to_text(html) if self.plain_text else None
+            result = OptimizedContent(optimized, text, len(encoded), len(optimized.encode("utf-8")))
+            self._cache[key] = result
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        self.bytes_in += result.original_bytes
+        self.bytes_out += result.optimized_bytes
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Report the effect of optimisation so far.
+        Returns:
+            Dict[str, int]: bytes_in, bytes_out, bytes_saved and cached entries.
+        """
+
+        return {
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "entries": len(self._cache),
+        }
@@ -0,0 +1,131 @@
+"""
+Inline (CID) images for HTML emails.
+
+Templates that point `<img src>` at remote URLs depend on the recipient's
+client fetching them, and embedding an image with every message re-encodes
+it each time. `embed_images` rewrites local image references in rendered
+HTML to `cid:` URLs and registers the files as inline `Attachment`s:
+
+    <img src="logo.png">  ->  <img src="cid:3f2a...@email-me-anything">
+
+Only image files inside the base directory (the template's directory) are
+embedded; absolute paths, `../` escapes and non-image files are left as they
+are, so a row value that ends up in an `<img src>` cannot attach arbitrary
+files.
+
+The Content-ID is derived from a SHA-256 of the file contents, so the same
+image referenced twice (or from two paths) becomes one MIME part, and every
+message reuses one cached encoding (see `attachments`). Digests are cached
+by path, size and modification time, so a file is hashed again only after
+it changes.
+
+`send_email` attaches the images referenced by `cid:...@email-me-anything`
+URLs in the HTML it is given, so `build_html_content(..., inline_images=True)`
+is all a caller needs.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from email_me_anything.attachments import CHUNK_BYTES, Attachment
+
+CID_DOMAIN = "email-me-anything"
+
+_SRC = re.compile(r"""(<(?:img\b[^>]*?\ssrc|\w+\b[^>]*?\sbackground)\s*=\s*)(["'])(.*?)\2""", re.IGNORECASE | re.DOTALL)
+_CID = re.compile(r"cid:([0-9a-f]{32}@" + re.escape(CID_DOMAIN) + r")")
+_REMOTE = re.compile(r"^(?:[a-z][a-z0-9+.-]*:|//)", re.IGNORECASE)
+
+_digests: Dict[Tuple[str, int, int], str] = {}
+_images: Dict[str, Attachment] = {}
+_lock = threading.Lock()
+
+def image_for(path: Path) -> Attachment | None:
+    """
+    Return the inline `Attachment` for an image file, hashing it only when it changed.
+    Args:
+        path (Path): The image file.
+    Returns:
+        Attachment | None: An inline attachment whose `content_id` is derived from the
+            file's contents, or None if the file does not exist.
+    """
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _digests.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(CHUNK_BYTES), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        _digests[key] = digest
+    content_id = f"{digest[:32]}@{CID_DOMAIN}"
+    image = _images.get(content_id)
+    if image is None or image.path != Path(path):
+        # The most recently seen path wins, so a registered image never points at a deleted file.
+        image = Attachment(path, disposition="inline", content_id=content_id, digest=digest)
+        with _lock:
+            _images[content_id] = image
+    return image
+
+def embed_images(html_content: str, base_dir: Path) -> str:
+    """
+    Rewrite local `<img src>` and `background` attribute references to `cid:` URLs.
+    Remote (`https:`, `//`), `data:` and `cid:` URLs, files that do not exist, files
+    outside `base_dir` and files that are not images are left unchanged.
+    Args:
+        html_content (str): Rendered HTML.
+        base_dir (Path): Directory relative paths are resolved against and images must
+            live under, usually the template's directory.
+    Returns:
+        str: The HTML with local images referenced by Content-ID.
+    Example:
+        >>> embed_images('<img src="logo.png">', Path("templates"))
+        '<img src="cid:9c1e...@email-me-anything">'
+    """
+
+    root = Path(base_dir).resolve()
+
+    def replace(match: re.Match) -> str:
+        prefix, quote, src = match.groups()
+        if not src or _REMOTE.match(src):
+            return match.group(0)
+        path = Path(src.split("?", 1)[0].split("#", 1)[0])
+        if path.is_absolute() or not (mimetypes.guess_type(path.name)[0] or "").startswith("image/"):
+            return match.group(0)
+        path = root / path
+        if not path.resolve().is_relative_to(root):
+            return match.group(0)
+        image = image_for(path)
+        if image is None:
+            return match.group(0)
+        return f"{prefix}{quote}cid:{image.content_id}{quote}"
+
+    return _SRC.sub(replace, html_content)
+
+def images_in(html_content: str) -> Tuple[Attachment, ...]:
+    """
+    Return the registered inline images referenced from `html_content`, each once.
+    Args:
+        html_content (str): HTML produced with `embed_images`.
+    Returns:
+        Tuple[Attachment, ...]: Inline attachments in order of first reference.
+    """
+
+    if "cid:" not in html_content:
+        return ()
+    found: List[Attachment] = []
+    seen = set()
+    for content_id in _CID.findall(html_content):
+        image = _images.get(content_id)
+        if image is not None and content_id not in seen:
+            seen.add(content_id)
+            found.append(image)
+    return tuple(found)
@@ -0,0 +1,165 @@
+"""
+Send journal: resumable batch runs with idempotency keys.
+
+A large send that crashes halfway leaves no record of what went out. A
+`SendJournal` is an append-only file with one idempotency key per delivered
+message. Opening it loads the keys into a set, so a restarted batch skips
+delivered messages with one set lookup each and carries on from where the
+previous run stopped:
+
+    with SendJournal("newsletter.journal") as journal:
+        for recipient in recipients:
+            key = idempotency_key("newsletter-2024-05", recipient["email"])
+            journal.send(key, send_email, sender, [recipient], subject, html)
+
+`send` records a message only when it was delivered: not when the send
+function returns None, and not when the transport in effect (the
+`transport` keyword, else the configured one) delivers nothing, such as the
+debug transport outside production.
+
+Records are written through a buffered file and made durable in periodic
+checkpoints (flush + fsync every `checkpoint_every` records, at most
+`checkpoint_interval` seconds after a record, and on close), so journaling
+does not add a disk sync per message. A crash can lose at most the records
+since the last checkpoint; those messages are sent again on restart
+(at-least-once delivery).
+"""
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Set
+
+from . import transports
+
+def idempotency_key(*parts: Any) -> str:
+    """
+    Derive a stable key from the parts that identify one message.
+    Args:
+        *parts (Any): E.g. a campaign name and the recipient address; converted with `str`.
+    Returns:
+        str: A 32-character hex digest.
+    Example:
+        >>> idempotency_key("welcome", "ada@example.com") == idempotency_key("welcome", "ada@example.com")
+        True
+    """
+
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:32]
+
+class SendJournal:
+    """Append-only record of delivered messages, keyed by idempotency key.
+
+    Attributes:
+        path (Path): The journal file.
+        checkpoint_every (int): Records between fsync'd checkpoints.
+        checkpoint_interval (float): Longest time in seconds a record waits for a checkpoint.
+        skipped (int): Messages skipped because they were already delivered.
+        recorded (int): Messages recorded by this instance.
+    """
+
+    def __init__(self, path: Path | str, checkpoint_every: int = 256, checkpoint_interval: float = 1.0):
+        self.path = Path(path)
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.checkpoint_interval = checkpoint_interval
+        self.skipped = 0
+        self.recorded = 0
+        self._keys: Set[str] = set()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_checkpoint = time.monotonic()
+        self._timer: threading.Timer | None = None
+        self._load()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            # A torn final record from a crash mid-write: drop it so appends stay line-aligned.
+            with open(self.path, "r+b") as file:
+                file.truncate(complete)
+        self._keys.update(data[:complete].decode("utf-8").split())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def delivered(self, key: str) -> bool:
+        """Return True if `key` was recorded, counting it as skipped."""
+        if key in self._keys:
+            self.skipped += 1
+            return True
+        return False
+
+    def record(self, key: str) -> None:
+        """Record `key` as delivered; it becomes durable at the next checkpoint."""
+        with self._lock:
+            if key in self._keys:
+                return
+            self._keys.add(key)
+            self._file.write(key + "\n")
+            self.recorded += 1
+            self._pending += 1
+            if self._pending >= self.checkpoint_every or time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+                self._checkpoint()
+            elif self._timer is None:
+                # A quiet journal still reaches a checkpoint within `checkpoint_interval`.
+                self._timer = threading.Timer(self.checkpoint_interval, self.checkpoint)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def checkpoint(self) -> None:
+        """Flush and fsync every record made so far."""
+        with self._lock:
+            self._checkpoint()
+
+    def _checkpoint(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._file.closed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_checkpoint = time.monotonic()
+
+    def send(self, key: str, send: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Call `send(*args, **kwargs)` unless `key` was already delivered, then record it if
+        the message was delivered: the response is not None and the transport in effect
+        (`kwargs["transport"]` or the configured one) delivers (see `transports.delivers`).
+        Args:
+            key (str): Idempotency key of the message, e.g. from `idempotency_key`.
+            send (Callable[..., Any]): The sending function, e.g. `send_email`.
+        Returns:
+            Any: The send function's response, or None if the message was skipped.
+        Raises:
+            Any exception raised by `send`; the key is not recorded then.
+        """
+
+        if self.delivered(key):
+            return None
+        response = send(*args, **kwargs)
+        if response is not None and transports.delivers(transports.selected(kwargs.get("transport"))):
+            self.record(key)
+        return response
+
+    def close(self) -> None:
+        """Write a final checkpoint and close the file."""
+        with self._lock:
+            self._checkpoint()
+            self._file.close()
+
+    def __enter__(self) -> "SendJournal":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
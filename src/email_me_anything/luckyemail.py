@@ -8,6 +8,10 @@ from .config import Config
 
 from .csvutils import select_random_row
 from .emailutils import build_html_content, send_email
+from .htmlopt import HtmlOptimizer
+from .journal import SendJournal
+from . import profiling, transports
+from .rendercache import RenderCache
 
 def send_lucky_email(
     csv_path: Path,
@@ -16,7 +20,11 @@ def send_lucky_email(
     sender_name: str = Config.EMAIL_SENDER,
     recipients: list = [{"email": Config.EMAIL_RECIPIENT_0_ADDRESS, "name": Config.EMAIL_RECIPIENT_0_NAME}],
     variable_map: dict=None,
-    subject: str = None
+    subject: str = None,
+    render_cache: RenderCache = None,
+    optimizer: HtmlOptimizer = None,
+    journal: SendJournal = None,
+    idempotency_key: str = None
 ) -> bool:
     """Select a random CSV row, render it into an HTML template, and send or write the email.
 
@@ -28,32 +36,63 @@ def send_lucky_email(
         recipients (list): List of recipient dicts with keys 'email' and 'name'.
         variable_map (dict, optional): Optional mapping of template variable names to CSV columns.
         subject (str, optional): Email subject. If omitted, defaults to "New Data Row!".
+        render_cache (RenderCache, optional): Cache reused across calls so a row that was
+            already rendered into this template is not rendered again.
+        optimizer (HtmlOptimizer, optional): Post-render stage that minifies the HTML and
+            generates a plain-text alternative before sending.
+        journal (SendJournal, optional): Journal of delivered messages. With an
+            `idempotency_key`, a message the journal already records is not sent again.
+        idempotency_key (str, optional): Identifies this send in `journal`, e.g.
+            `journal.idempotency_key("daily-quote", date.today())`.
 
     Returns:
-        bool: True when the operation completes (email sent or debug file written),
-              False when no row could be selected from the CSV (empty or read error).
+        bool: True when the operation completes (email sent, debug file written or
+              already delivered according to the journal), False when no row could be
+              selected from the CSV (empty or read error).
 
     Raises:
-        Exception: May raise exceptions from `select_random_row`, `build_html_content`, or `send_email`.
+        Exception: May raise exceptions from `select_random_row`, `build_html_content`, or `send_email`
+            (e.g. KeyError when the configured transport is not registered).
+
+    When `EMAIL_PROFILE` is set, the call is profiled (see `profiling`).
     """
+    if Config.PROFILE:
+        with profiling.session("send_lucky_email", profiling.configured_modes()):
+            return _send_lucky_email(csv_path, template_path, sender_address, sender_name, recipients, variable_map,
+                                     subject, render_cache, optimizer, journal, idempotency_key)
+    return _send_lucky_email(csv_path, template_path, sender_address, sender_name, recipients, variable_map,
+                             subject, render_cache, optimizer, journal, idempotency_key)
+
+def _send_lucky_email(csv_path, template_path, sender_address, sender_name, recipients, variable_map, subject,
+                      render_cache, optimizer, journal, idempotency_key) -> bool:
+    if journal is not None and idempotency_key is not None and journal.delivered(idempotency_key):
+        print(f"Already delivered: {idempotency_key}")
+        return True
     selected_data = select_random_row(csv_path)
     if not selected_data:
         print("No row selected.")
         return False
         
-    html_content = build_html_content(template_path, selected_data, variable_map)
+    html_content = build_html_content(template_path, selected_data, variable_map, cache=render_cache)
 
     if not subject:
         subject = "New Data Row!"
         
     sender = {"email": sender_address, "name": sender_name}
     recipients = recipients
-    response = send_email(
-        sender,
-        recipients,
-        subject,
-        html_content
-    )
+    if optimizer is not None:
+        optimized = optimizer.optimize(html_content)
+        response = send_email(sender, recipients, subject, optimized.html, text_content=optimized.text)
+    else:
+        response = send_email(
+            sender,
+            recipients,
+            subject,
+            html_content
+        )
+    if journal is not None and idempotency_key is not None and Config.PROD_MODE and transports.delivers(Config.MAILER):
+        # Debug-mode runs and discarding transports deliver nothing, so they must not mark the message as sent.
+        journal.record(idempotency_key)
     print(f"Email sent: {response}")
     
     return True
@@ -0,0 +1,147 @@
+"""
+Prebuilt MIME messages with per-recipient header substitution.
+
+Building an `EmailMessage`, calling `set_content`/`add_alternative` and having
+the `email` package serialise it again for every recipient dominates CPU time
+when one rendered body fans out to many people. A `MimeSkeleton` serialises
+the shared part (From, Subject, MIME structure and encoded bodies) to bytes
+once; each send only prepends the headers that differ per message (To,
+Message-ID and Date) and hands the result to `smtplib.SMTP.sendmail`.
+
+Attachments are not serialised into the skeleton. It keeps the bytes around
+them and the `Attachment` objects, and `chunks()` interleaves the two, so
+the encoded files can be streamed into DATA (see `attachments`). Inline
+images (attachments with a `content_id`) are placed next to the HTML part in
+a multipart/related, where `cid:` URLs can reference them.
+"""
+from email import policy
+from email.message import EmailMessage
+from email.utils import formataddr, formatdate, make_msgid
+from functools import lru_cache
+from typing import Dict, Iterator, List, Tuple
+from uuid import uuid4
+
+from email_me_anything.attachments import Attachment
+
+PLAIN_TEXT_FALLBACK = "Your email does not support HTML content"
+
+class MimeSkeleton:
+    """The serialised, recipient-independent part of a message.
+
+    Attributes:
+        sender (Dict[str, str]): Sender with "email" and "name" keys.
+        attachments (Tuple[Attachment, ...]): Files attached to the message.
+        segments (List[bytes | Attachment]): Shared headers and MIME body, CRLF-terminated,
+            with each attachment's data left out and its `Attachment` in its place.
+    """
+
+    def __init__(self, sender: Dict[str, str], subject: str, html_content: str, text_content: str = None,
+                 attachments: Tuple[Attachment, ...] = ()):
+        msg = EmailMessage()
+        msg["Subject"] = subject
+        msg["From"] = formataddr((sender["name"], sender["email"]))
+        msg.set_content(text_content or PLAIN_TEXT_FALLBACK)
+        msg.add_alternative(html_content, subtype="html")
+        self.sender = sender
+        self.attachments = tuple(attachments)
+        self.segments: List[bytes | Attachment] = []
+        # Inline images go in a multipart/related around the HTML part, other files
+        # in a multipart/mixed around the whole message.
+        inline = [a for a in self.attachments if a.content_id]
+        files = [a for a in self.attachments if not a.content_id]
+        token = uuid4().hex
+        placed: List[Tuple[bytes, Attachment]] = []
+        html_part = msg.get_payload()[1]
+        for attachment in inline:
+            maintype, _, subtype = attachment.content_type.partition("/")
+            html_part.add_related(b"", maintype, subtype or "octet-stream", cid=f"<{attachment.content_id}>",
+                                  disposition="inline")
+            placed.append((self._placeholder(html_part.get_payload()[-1], token, len(placed)), attachment))
+        if files:
+            msg.make_mixed()
+            for attachment in files:
+                maintype, _, subtype = attachment.content_type.partition("/")
+                msg.add_attachment(b"", maintype, subtype or "octet-stream", filename=attachment.filename,
+                                   disposition=attachment.disposition)
+                placed.append((self._placeholder(msg.get_payload()[-1], token, len(placed)), attachment))
+        rest = msg.as_bytes(policy=policy.SMTP)
+        for marker, attachment in placed:
+            head, rest = rest.split(marker, 1)
+            self.segments += [head, attachment]
+        self.segments.append(rest)
+        self._domain = (sender.get("email") or "").rpartition("@")[2] or "localhost"
+
+    @staticmethod
+    def _placeholder(part: EmailMessage, token: str, idx: int) -> bytes:
+        # A placeholder payload marks where the encoded file goes.
+        marker = f"attachment-{token}-{idx}"
+        part.set_payload(marker)
+        return marker.encode("ascii")
+
+    @property
+    def body(self) -> bytes:
+        """Shared headers and the whole MIME body, attachments encoded, ready for DATA."""
+        if len(self.segments) == 1:
+            return self.segments[0]
+        return b"".join(self._body_chunks())
+
+    def _body_chunks(self) -> Iterator[bytes]:
+        for segment in self.segments:
+            if isinstance(segment, Attachment):
+                yield from segment.chunks()
+            else:
+                yield segment
+
+    def headers_for(self, to: str) -> bytes:
+        """Return the per-message header block (To, Message-ID, Date) for a To header value."""
+        return (
+            f"To: {to}\r\n"
+            f"Message-ID: {make_msgid(domain=self._domain)}\r\n"
+            f"Date: {formatdate(usegmt=True)}\r\n"
+        ).encode("utf-8")
+
+    def render(self, recipient: Dict[str, str] = None) -> bytes:
+        """
+        Return the full message for one recipient.
+        Args:
+            recipient (Dict[str, str], optional): Recipient with "email" and optional "name".
+                When omitted the To header is "undisclosed-recipients:;", for messages
+                whose real recipients travel only in the envelope.
+        Returns:
+            bytes: The complete message, suitable for `SMTP.sendmail`.
+        """
+
+        return self.headers_for(_to_header(recipient)) + self.body
+
+    def chunks(self, recipient: Dict[str, str] = None) -> Iterator[bytes]:
+        """
+        Yield the full message for one recipient piece by piece, for streaming into DATA.
+        Attachment data comes from `Attachment.chunks`, so the encoded files are never
+        joined into one buffer. `b"".join(chunks(r))` has the layout of `render(r)`.
+        """
+
+        yield self.headers_for(_to_header(recipient))
+        yield from self._body_chunks()
+
+def _to_header(recipient: Dict[str, str] | None) -> str:
+    if recipient is None:
+        return "undisclosed-recipients:;"
+    if recipient.get("name"):
+        return formataddr((recipient["name"], recipient["email"]))
+    return recipient["email"]
+
+@lru_cache(maxsize=64)
+def _cached_skeleton(sender_email: str, sender_name: str, subject: str, html_content: str, text_content: str,
+                     attachments: Tuple[Attachment, ...] = ()) -> MimeSkeleton:
+    return MimeSkeleton({"email": sender_email, "name": sender_name}, subject, html_content, text_content, attachments)
+
+def skeleton_for(sender: Dict[str, str], subject: str, html_content: str, text_content: str = None,
+                 attachments: Tuple[Attachment, ...] = ()) -> MimeSkeleton:
+    """
+    Return a (cached) skeleton for this sender, subject, content and attachments.
+    The 64 most recently used skeletons are kept, so repeated sends of the same
+    rendered content reuse the already encoded body. Attachments compare by file
+    path, size and mtime, so an edited file gets a new skeleton.
+    """
+
+    return _cached_skeleton(sender["email"], sender["name"], subject, html_content, text_content, tuple(attachments))
@@ -0,0 +1,241 @@
+"""
+Built-in profiling for the send pipeline.
+
+Wrapping a slow run in cProfile by hand is no longer needed. A profiling
+session can record three kinds of profile and write each to a directory:
+
+- "cprofile": a deterministic cProfile of the session, dumped as a `.prof`
+  file (open it with `pstats` or snakeviz) plus a `.txt` with the top
+  functions by cumulative time. Threads started during the session (such as
+  the `--workers` pool) are profiled too and merged into the same file;
+  threads that were already running when it started are not.
+- "memory": a `tracemalloc` snapshot taken at the start and at the end, with
+  the top allocation sites by growth written to `.memory.txt`.
+- "sample": a wall-clock sampler. A background thread looks at every other
+  thread's stack each `interval` seconds and records how often it was inside
+  `select_random_row`, `build_html_content` and `send_email`. Unlike
+  cProfile it also counts time spent waiting on the network and disk, and it
+  covers worker threads. The stage totals and collapsed stacks (the
+  flamegraph.pl input format) go to `.samples.txt`.
+
+Sessions are started through the API:
+
+    from email_me_anything import profiling
+    with profiling.session("nightly", modes=("cprofile", "sample")):
+        send_lucky_email(...)
+
+or by setting `EMAIL_PROFILE=cprofile,memory,sample` (or `all`), in which case
+`send_lucky_email` and the command-line runner profile themselves. Output goes
+to `EMAIL_PROFILE_DIR` (default "profiles"). Nothing is installed when no
+session is running: no wrappers, tracers or threads, so there is no overhead
+when profiling is disabled.
+"""
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence
+
+from .config import Config
+
+MODES = ("cprofile", "memory", "sample")
+STAGES = ("select_random_row", "build_html_content", "send_email")
+
+_lock = threading.Lock()
+_running = False
+_sequence = itertools.count(1)
+
+def configured_modes(value: str = None) -> List[str]:
+    """
+    Parse a comma-separated list of profiling modes, such as the `EMAIL_PROFILE` setting.
+    Args:
+        value (str, optional): The setting; defaults to `Config.PROFILE`. "all" enables every mode.
+    Returns:
+        List[str]: Known modes, in `MODES` order.
+    """
+
+    value = Config.PROFILE if value is None else value
+    names = {name.strip().lower() for name in (value or "").split(",")}
+    if "all" in names or "1" in names or "true" in names:
+        return list(MODES)
+    return [mode for mode in MODES if mode in names]
+
+class _ThreadProfiles:
+    """Gives every thread started during a session its own `cProfile.Profile`.
+
+    Before Python 3.12 a profiler only sees the thread that enabled it, so the
+    hook installed with `threading.setprofile` enables one in each new thread.
+    From 3.12 cProfile is built on `sys.monitoring` and sees every thread.
+    """
+
+    def __init__(self):
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        threading.setprofile(self._begin)
+
+    def stop(self) -> None:
+        threading.setprofile(None)
+
+    def _begin(self, frame, event, arg) -> None:
+        # Runs once per thread: enabling the profiler replaces this hook for the thread.
+        profile = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+class _Sampler:
+    """Samples every thread's stack from a background thread."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.stages: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="email-me-anything-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                names.reverse()
+                self.samples += 1
+                self.stacks[";".join(names)] += 1
+                for stage in STAGES:
+                    if any(name.startswith(stage + " ") for name in names):
+                        self.stages[stage] += 1
+
+    def report(self) -> str:
+        lines = [f"{self.samples} samples every {self.interval * 1000:g} ms", "", "stage                  samples  share"]
+        for stage in STAGES:
+            share = self.stages[stage] / self.samples if self.samples else 0.0
+            lines.append(f"{stage:<22} {self.stages[stage]:>7}  {share:6.1%}")
+        lines += ["", "# collapsed stacks"]
+        lines += [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
+@contextmanager
+def session(label: str = "run", modes: Sequence[str] = None, directory: Path | str = None,
+            interval: float = None) -> Iterator[Dict[str, Path]]:
+    """
+    Profile the enclosed block and write the results to `directory`.
+    Nested sessions (e.g. `send_lucky_email` called from a profiled CLI run) are
+    folded into the outer one.
+    Args:
+        label (str, optional): Prefix of the output file names. Defaults to "run".
+        modes (Sequence[str], optional): Any of "cprofile", "memory" and "sample".
+            Defaults to the `EMAIL_PROFILE` setting, or all three if that is empty.
+        directory (Path | str, optional): Output directory, created if needed.
+            Defaults to `EMAIL_PROFILE_DIR`.
+        interval (float, optional): Seconds between stack samples. Defaults to
+            `EMAIL_PROFILE_INTERVAL` (5 ms).
+    Yields:
+        Dict[str, Path]: Filled in on exit with the written files, keyed by mode.
+    Example:
+        >>> with session("digest", modes=["sample"]) as written:
+        ...     send_lucky_email(Path("quotes.csv"), Path("quote.html"))
+        >>> written["sample"]
+        PosixPath('profiles/digest-20240501-080000-1234-1.samples.txt')
+    """
+
+    global _running
+    written: Dict[str, Path] = {}
+    with _lock:
+        nested, _running = _running, True
+    if nested:
+        yield written
+        return
+    modes = [mode for mode in (modes or configured_modes() or MODES) if mode in MODES]
+    directory = Path(directory or Config.PROFILE_DIR)
+    profiler = cProfile.Profile() if "cprofile" in modes else None
+    threads = _ThreadProfiles() if profiler and sys.version_info < (3, 12) else None
+    sampler = _Sampler(interval or Config.PROFILE_INTERVAL) if "sample" in modes else None
+    tracing = "memory" in modes and not tracemalloc.is_tracing()
+    before = None
+    if "memory" in modes:
+        if tracing:
+            tracemalloc.start(10)
+        before = tracemalloc.take_snapshot()
+    if sampler:
+        sampler.start()
+    started = time.perf_counter()
+    try:
+        if threads:
+            threads.start()
+        if profiler:
+            profiler.enable()
+        try:
+            yield written
+        finally:
+            if profiler:
+                profiler.disable()
+            if threads:
+                threads.stop()
+    finally:
+        elapsed = time.perf_counter() - started
+        if sampler:
+            sampler.stop()
+        after = tracemalloc.take_snapshot() if before is not None else None
+        traced = tracemalloc.get_traced_memory() if before is not None else (0, 0)
+        if tracing:
+            tracemalloc.stop()
+        with _lock:
+            _running = False
+        directory.mkdir(parents=True, exist_ok=True)
+        stem = directory / f"{label}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence)}"
+        if profiler:
+            written["cprofile"] = _write_cprofile([profiler] + (threads.profiles if threads else []), stem)
+        if after is not None:
+            written["memory"] = _write_memory(before, after, traced, stem)
+        if sampler:
+            written["sample"] = Path(f"{stem}.samples.txt")
+            written["sample"].write_text(sampler.report(), encoding="utf-8")
+        print(f"Profiled {label} ({elapsed:.3f}s): " + ", ".join(str(path) for path in written.values()))
+
+def _write_cprofile(profilers: List[cProfile.Profile], stem: Path) -> Path:
+    path = Path(f"{stem}.prof")
+    text = io.StringIO()
+    stats = pstats.Stats(stream=text)
+    for profiler in profilers:
+        profiler.create_stats()
+        if profiler.stats:  # a thread that ended before recording anything
+            stats.add(pstats.Stats(profiler))
+    stats.dump_stats(path)
+    stats.sort_stats("cumulative").print_stats(40)
+    Path(f"{stem}.txt").write_text(text.getvalue(), encoding="utf-8")
+    return path
+
+def _write_memory(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, traced: tuple, stem: Path) -> Path:
+    path = Path(f"{stem}.memory.txt")
+    current, peak = traced
+    lines = [f"traced memory at end: {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB", "",
+             "top allocation sites by growth:"]
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    for stat in after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")[:25]:
+        lines.append(str(stat))
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
@@ -0,0 +1,137 @@
+"""
+Bounded memoisation of rendered templates.
+
+Rendering the same CSV row into the same template over and over (small CSVs,
+many recipients, repeated runs in one process) only needs to happen once.
+`RenderCache` keys rendered HTML by template identity, a fingerprint of the
+row data and the `variable_map`, and evicts the least recently used entries
+once either the entry count or the total cached size exceeds its limits.
+"""
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Mapping, Tuple
+
+from . import watch
+
+def template_identity(template_path: Path) -> Tuple[str, int, int]:
+    """
+    Identify a template file by its resolved path, modification time and size.
+    While a file watcher is active (`watch.start()`), the watcher's change counter
+    replaces mtime and size, so no `stat` call is needed.
+    Args:
+        template_path (Path): Path to the template file.
+    Returns:
+        Tuple[str, int, int]: (absolute path, mtime in nanoseconds, size in bytes), or
+            (absolute path, -1, change counter) while watching.
+    Raises:
+        FileNotFoundError: If the template file does not exist.
+    """
+
+    watcher = watch.active()
+    if watcher is not None:
+        return (watcher.key(template_path), -1, watcher.generation(template_path))
+    stat = os.stat(template_path)
+    return (os.path.abspath(template_path), stat.st_mtime_ns, stat.st_size)
+
+def fingerprint(mapping: Mapping[str, Any] | None) -> Hashable:
+    """
+    Build a hashable fingerprint of a mapping (row data or variable map).
+    Args:
+        mapping (Mapping[str, Any] | None): The mapping to fingerprint.
+    Returns:
+        Hashable: A frozenset of the items when they are hashable, otherwise a
+                  sorted tuple of their reprs. None is passed through unchanged.
+    Example:
+        >>> fingerprint({"a": "1"}) == fingerprint({"a": "1"})
+        True
+    """
+
+    if mapping is None:
+        return None
+    try:
+        items = frozenset(mapping.items())
+        hash(items)
+        return items
+    except TypeError:
+        return tuple(sorted((key, repr(value)) for key, value in mapping.items()))
+
+class RenderCache:
+    """LRU cache of rendered HTML bounded by entry count and total characters.
+
+    Attributes:
+        max_entries (int): Maximum number of rendered documents kept.
+        max_bytes (int): Maximum total size (in characters) of cached documents.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that had to render.
+        evictions (int): Number of entries dropped to respect the limits.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = 0
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, template_path: Path, data: Mapping[str, Any], variable_map: Dict[str, str] = None) -> Hashable:
+        """Return the cache key for a (template, row, variable_map) triple."""
+        return (template_identity(template_path), fingerprint(data), fingerprint(variable_map))
+
+    def get_or_render(self, key: Hashable, render: Callable[[], str]) -> str:
+        """
+        Return the cached document for `key`, calling `render` on a miss.
+        Args:
+            key (Hashable): Cache key, usually from `RenderCache.key`.
+            render (Callable[[], str]): Zero-argument callable producing the HTML.
+        Returns:
+            str: The rendered HTML.
+        Raises:
+            Any exception raised by `render`; failed renders are not cached.
+        """
+
+        html = self._entries.get(key)
+        if html is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+        self.misses += 1
+        html = render()
+        self._store(key, html)
+        return html
+
+    def _store(self, key: Hashable, html: str) -> None:
+        if len(html) > self.max_bytes:
+            return
+        self._entries[key] = html
+        self._size += len(html)
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every cached document and reset the statistics."""
+        self._entries.clear()
+        self._size = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Report cache effectiveness.
+        Returns:
+            Dict[str, int]: hits, misses, evictions, entries and bytes currently cached.
+        """
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._size,
+        }
@@ -0,0 +1,455 @@
+"""
+Long-running scheduler for recurring lucky emails.
+
+Running `send_lucky_email` from cron pays for interpreter start-up, imports,
+`.env` parsing and CSV parsing on every tick. `Scheduler` instead runs many
+recurring jobs from a single process: jobs live in a heap ordered by their
+next run time, parsed CSV tables are kept in memory until their file changes,
+and rendered templates are memoised in a shared `RenderCache`.
+
+Jobs are described in a JSON file:
+
+    {
+        "jobs": [
+            {
+                "name": "daily-quote",
+                "csv": "quotes.csv",
+                "template": "quote.html",
+                "cron": "0 8 * * *",
+                "subject": "Quote of the Day",
+                "recipients": [{"email": "friend@example.com", "name": "Friend"}],
+                "variable_map": {"quote": "Quote", "author": "Author"}
+            },
+            {"name": "heartbeat", "csv": "facts.csv", "template": "fact.html", "every": 3600}
+        ]
+    }
+
+A job with `"prerender": 3600` picks its row and renders its email an hour
+before each run and keeps the result in memory, so at the scheduled time only
+delivery remains. A pre-rendered email is discarded and rendered again when
+the job's CSV or template changes before it is sent. `EMAIL_PRERENDER_AHEAD`
+sets the lead time for jobs that do not specify one (default 0: render at send
+time).
+
+Transports are not kept open between runs: every send opens its own SMTP
+connection or MailerSend client, because relays drop idle connections long
+before the next run of a typical job.
+
+Relative paths are resolved against the directory of the config file. Sending
+SIGHUP reloads the file once the job currently sending (if any) has finished;
+SIGTERM and SIGINT stop the daemon the same way.
+
+Run it with `python -m email_me_anything.scheduler jobs.json`.
+"""
+import heapq
+import json
+import os
+import signal
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Set, Tuple
+
+from . import watch
+from .config import Config
+from .csvutils import pick_random_row, read_table
+from .emailutils import build_html_content, send_email
+from .rendercache import RenderCache, template_identity
+from .table import CsvTable
+
+class CronExpression:
+    """A standard five-field cron expression (minute hour day-of-month month day-of-week).
+
+    Fields accept `*`, single values, ranges (`1-5`), steps (`*/15`, `1-30/5`)
+    and comma-separated lists. Day-of-week runs from 0 (Sunday) to 6, with 7
+    also meaning Sunday. As in cron, when both day fields are restricted a day
+    matches if either of them does.
+    """
+
+    _BOUNDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: {expression!r}")
+        self.expression = expression
+        parsed = [self._parse(field, low, high) for field, (low, high) in zip(fields, self._BOUNDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {day % 7 for day in weekdays}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> Set[int]:
+        values: Set[int] = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/", 1)
+                step = int(step_text)
+                if step < 1:
+                    raise ValueError(f"Invalid cron step: {field!r}")
+            if part == "*":
+                start, stop = low, high
+            elif "-" in part:
+                start, stop = (int(v) for v in part.split("-", 1))
+            else:
+                start = int(part)
+                stop = high if step > 1 else start
+            if start < low or stop > high or start > stop:
+                raise ValueError(f"Cron field {field!r} out of range {low}-{high}")
+            values.update(range(start, stop + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.isoweekday() % 7) in self.weekdays
+        if self._any_day:
+            return weekday_ok
+        if self._any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """
+        Return the first matching minute strictly after `moment`.
+        Args:
+            moment (datetime): The reference time.
+        Returns:
+            datetime: The next time the expression fires.
+        Raises:
+            ValueError: If the expression never matches (e.g. `0 0 31 2 *`).
+        """
+
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+class Job:
+    """One recurring lucky email, as described by an entry of the jobs file."""
+
+    def __init__(self, spec: Dict[str, Any], base_dir: Path = Path(".")):
+        if "cron" not in spec and "every" not in spec:
+            raise ValueError(f"Job {spec.get('name')!r} needs either 'cron' or 'every'")
+        missing = [key for key in ("csv", "template") if not spec.get(key)]
+        if missing:
+            raise ValueError(f"Job {spec.get('name')!r} needs {' and '.join(repr(key) for key in missing)}")
+        self.spec = spec
+        self.name = spec.get("name") or spec["csv"]
+        self.csv_path = base_dir / spec["csv"]
+        self.template_path = base_dir / spec["template"]
+        self.subject = spec.get("subject") or "New Data Row!"
+        self.sender = {
+            "email": spec.get("sender_address", Config.EMAIL_SENDER_ADDRESS),
+            "name": spec.get("sender_name", Config.EMAIL_SENDER),
+        }
+        self.recipients = spec.get("recipients") or [
+            {"email": Config.EMAIL_RECIPIENT_0_ADDRESS, "name": Config.EMAIL_RECIPIENT_0_NAME}
+        ]
+        self.variable_map = spec.get("variable_map")
+        self.cron = CronExpression(spec["cron"]) if "cron" in spec else None
+        if self.cron is not None:
+            self.cron.next_after(datetime.now())  # raises ValueError for an expression that never fires
+        self.every = float(spec["every"]) if "every" in spec else None
+        if self.every is not None and not self.every > 0:
+            raise ValueError(f"Job {self.name!r}: 'every' must be a positive number of seconds")
+        self.prerender = float(spec.get("prerender", Config.PRERENDER_AHEAD))
+
+    def next_run(self, after: float) -> float:
+        """Return the timestamp of the next run strictly after `after`."""
+        if self.cron is not None:
+            return self.cron.next_after(datetime.fromtimestamp(after)).timestamp()
+        return after + self.every
+
+class PreRendered:
+    """An email rendered ahead of its run, with the source versions it was rendered from."""
+
+    __slots__ = ("run_at", "spec", "sources", "html")
+
+    def __init__(self, run_at: float, spec: Dict[str, Any], sources: Tuple[Any, Any], html: str):
+        self.run_at = run_at
+        self.spec = spec
+        self.sources = sources
+        self.html = html
+
+def _sources(job: Job) -> Tuple[Any, Any] | None:
+    """Versions of the job's CSV and template (watcher counters or mtime and size), None if either is missing."""
+    try:
+        return (template_identity(job.csv_path), template_identity(job.template_path))
+    except OSError:
+        return None
+
+def load_jobs(config_path: Path) -> List[Job]:
+    """
+    Load job definitions from a JSON jobs file.
+    Args:
+        config_path (Path): Path to the jobs file.
+    Returns:
+        List[Job]: The parsed jobs.
+    Raises:
+        ValueError: If a job is malformed or two jobs share a name.
+        OSError, json.JSONDecodeError: If the file cannot be read or parsed.
+    """
+
+    config_path = Path(config_path)
+    with open(config_path, "r", encoding="utf-8") as file:
+        specs = json.load(file).get("jobs", [])
+    jobs = [Job(spec, config_path.parent) for spec in specs]
+    names = [job.name for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("Job names must be unique")
+    return jobs
+
+class Scheduler:
+    """Heap-based in-process scheduler that keeps data and templates warm between runs.
+
+    Attributes:
+        config_path (Path | None): Jobs file, re-read on `reload()`.
+        render_cache (RenderCache): Rendered templates shared by every job.
+        poll_interval (float): Longest uninterrupted sleep, which bounds how quickly
+            a reload or stop request is noticed while idle.
+        prerender_hits (int): Runs that sent a pre-rendered email.
+        prerender_misses (int): Runs of pre-rendering jobs that had to render at send time.
+    """
+
+    def __init__(self, jobs: List[Job] = None, config_path: Path = None, render_cache: RenderCache = None, poll_interval: float = 1.0):
+        self.config_path = Path(config_path) if config_path else None
+        self.render_cache = render_cache or RenderCache()
+        self.poll_interval = poll_interval
+        self._heap: List[Tuple[float, int, Job]] = []
+        self._prerender_heap: List[Tuple[float, int, float, Job]] = []
+        self._prerendered: Dict[str, PreRendered] = {}
+        self.prerender_hits = 0
+        self.prerender_misses = 0
+        self._seq = 0
+        self._tables: Dict[Path, Tuple[Tuple[int, int], CsvTable]] = {}
+        self._reload_requested = False
+        self._stop_requested = False
+        if jobs is None and self.config_path is not None:
+            jobs = load_jobs(self.config_path)
+        self._schedule(jobs or [], time.time())
+
+    def _schedule(self, jobs: List[Job], now: float, previous: Dict[str, Tuple[float, Job]] = None) -> None:
+        # Every run time is computed before the heaps are replaced, so a failure keeps the old schedule.
+        entries = []
+        for job in jobs:
+            kept = (previous or {}).get(job.name)
+            entries.append((kept[0] if kept and kept[1].spec == job.spec else job.next_run(now), job))
+        self._heap = []
+        self._prerender_heap = []
+        for when, job in entries:
+            self._push(when, job)
+        # Pre-renders of removed or changed jobs are never sent.
+        self._prerendered = {name: entry for name, entry in self._prerendered.items()
+                             if any(job.name == name and job.spec == entry.spec for job in jobs)}
+
+    def _push(self, when: float, job: Job) -> None:
+        self._seq += 1
+        heapq.heappush(self._heap, (when, self._seq, job))
+        if job.prerender > 0:
+            heapq.heappush(self._prerender_heap, (when - job.prerender, self._seq, when, job))
+
+    @property
+    def jobs(self) -> List[Job]:
+        """Scheduled jobs, soonest first."""
+        return [job for _, _, job in sorted(self._heap)]
+
+    def next_due(self) -> float | None:
+        """Timestamp of the soonest scheduled run, or None when no jobs are scheduled."""
+        return self._heap[0][0] if self._heap else None
+
+    def _next_wakeup(self) -> float | None:
+        times = [entry[0] for entry in (self._heap[:1] + self._prerender_heap[:1])]
+        return min(times) if times else None
+
+    def reload(self) -> None:
+        """Re-read the jobs file. Unchanged jobs keep their next run time."""
+        if self.config_path is None:
+            return
+        previous = {job.name: (when, job) for when, _, job in self._heap}
+        try:
+            jobs = load_jobs(self.config_path)
+            self._schedule(jobs, time.time(), previous)
+        except Exception as e:
+            print(f"Keeping current jobs, reload failed: {e}")
+            return
+        print(f"Reloaded {len(jobs)} job(s) from {self.config_path}")
+
+    def _table(self, csv_path: Path) -> CsvTable | None:
+        watcher = watch.active()
+        if watcher is not None:
+            return watcher.cached(csv_path, read_table, "table")
+        try:
+            stat = os.stat(csv_path)
+        except OSError as e:
+            print(f"Error reading CSV file: {e}")
+            return None
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._tables.get(csv_path)
+        if cached and cached[0] == version:
+            return cached[1]
+        table = read_table(csv_path)
+        if table is not None:
+            self._tables[csv_path] = (version, table)
+        return table
+
+    def _render(self, job: Job) -> str | None:
+        table = self._table(job.csv_path)
+        selected_data = pick_random_row(table) if table else None
+        if not selected_data:
+            print(f"[{job.name}] No row selected.")
+            return None
+        return build_html_content(job.template_path, selected_data, job.variable_map, cache=self.render_cache)
+
+    def prerender_pending(self, now: float = None) -> int:
+        """
+        Render the emails of runs that start within their job's `prerender` lead time, and
+        render again any buffered email whose CSV or template has changed since.
+        A failing render is reported; the run then renders at send time.
+        Args:
+            now (float, optional): Current timestamp. Defaults to `time.time()`.
+        Returns:
+            int: Number of emails rendered.
+        """
+
+        now = time.time() if now is None else now
+        rendered = 0
+        while self._prerender_heap and self._prerender_heap[0][0] <= now and not self._stop_requested:
+            _, _, run_at, job = heapq.heappop(self._prerender_heap)
+            entry = self._prerendered.get(job.name)
+            if entry is None or entry.run_at != run_at or entry.spec != job.spec or entry.sources != _sources(job):
+                rendered += self._prerender(job, run_at)
+        for name, entry in list(self._prerendered.items()):
+            if entry.run_at > now:
+                job = next((job for _, _, job in self._heap if job.name == name), None)
+                if job is not None and entry.sources != _sources(job):
+                    print(f"[{name}] Source changed; rendering again")
+                    rendered += self._prerender(job, entry.run_at)
+        return rendered
+
+    def _prerender(self, job: Job, run_at: float) -> int:
+        self._prerendered.pop(job.name, None)
+        sources = _sources(job)
+        try:
+            html_content = self._render(job)
+        except Exception as e:
+            print(f"[{job.name}] Pre-render failed: {e}")
+            return 0
+        if html_content is None or sources is None:
+            return 0
+        self._prerendered[job.name] = PreRendered(run_at, job.spec, sources, html_content)
+        return 1
+
+    def _take_prerendered(self, job: Job, when: float | None) -> str | None:
+        entry = self._prerendered.pop(job.name, None)
+        if entry is not None and entry.run_at == when and entry.spec == job.spec and entry.sources == _sources(job):
+            self.prerender_hits += 1
+            return entry.html
+        if job.prerender > 0:
+            self.prerender_misses += 1
+        return None
+
+    def run_job(self, job: Job, when: float = None) -> bool:
+        """
+        Send one lucky email for `job` using the warm table and render cache.
+        Args:
+            job (Job): The job to run.
+            when (float, optional): The scheduled run time. A valid email pre-rendered for
+                this run is sent as it is; otherwise one is rendered now.
+        Returns:
+            bool: True when an email was sent (or written in debug mode), False otherwise.
+        """
+
+        html_content = self._take_prerendered(job, when)
+        if html_content is None:
+            html_content = self._render(job)
+            if html_content is None:
+                return False
+        response = send_email(job.sender, job.recipients, job.subject, html_content)
+        print(f"[{job.name}] Email sent: {response}")
+        return True
+
+    def run_pending(self, now: float = None) -> int:
+        """
+        Run every job that is due at `now` and reschedule it.
+        A failing job is reported and rescheduled; it never stops the others.
+        Args:
+            now (float, optional): Current timestamp. Defaults to `time.time()`.
+        Returns:
+            int: Number of jobs run.
+        """
+
+        now = time.time() if now is None else now
+        ran = 0
+        while self._heap and self._heap[0][0] <= now and not self._stop_requested:
+            when, _, job = heapq.heappop(self._heap)
+            try:
+                self.run_job(job, when)
+            except Exception as e:
+                print(f"[{job.name}] Job failed: {e}")
+            ran += 1
+            try:
+                self._push(job.next_run(max(when, now)), job)
+            except Exception as e:
+                print(f"[{job.name}] Dropped from the schedule, no next run: {e}")
+            if self._reload_requested:
+                break
+        return ran
+
+    def request_reload(self, *_: Any) -> None:
+        """Ask the run loop to reload the jobs file after the current send (SIGHUP handler)."""
+        self._reload_requested = True
+
+    def request_stop(self, *_: Any) -> None:
+        """Ask the run loop to exit after the current send (SIGTERM/SIGINT handler)."""
+        self._stop_requested = True
+
+    def run_forever(self) -> None:
+        """Run jobs as they fall due until `request_stop()` is called."""
+        while not self._stop_requested:
+            if self._reload_requested:
+                self._reload_requested = False
+                self.reload()
+            self.prerender_pending()
+            due = self._next_wakeup()
+            delay = self.poll_interval if due is None else due - time.time()
+            if delay > 0:
+                # Signal handlers only set flags, so sleep in short slices to notice them.
+                time.sleep(min(delay, self.poll_interval))
+                continue
+            self.run_pending()
+
+def main(argv: List[str] = None) -> int:
+    """Run the scheduler daemon for the jobs file given on the command line."""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Usage: python -m email_me_anything.scheduler JOBS.json")
+        return 2
+    scheduler = Scheduler(config_path=Path(argv[0]))
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, scheduler.request_reload)
+    signal.signal(signal.SIGTERM, scheduler.request_stop)
+    signal.signal(signal.SIGINT, scheduler.request_stop)
+    watcher = watch.start()
+    print(f"Scheduler started with {len(scheduler.jobs)} job(s), watching files via {watcher.backend}")
+    try:
+        scheduler.run_forever()
+    finally:
+        watch.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
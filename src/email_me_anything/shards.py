@@ -0,0 +1,180 @@
+"""
+Datasets split across many CSV files ("shards").
+
+`select_random_row` accepts a directory or a glob pattern as well as a single
+file. To keep the pick uniform over every row of the dataset, a shard is
+chosen with probability proportional to its data-row count and a row is then
+picked inside it. The row counts are kept in a manifest
+(`.shards.json` in the dataset directory) together with each shard's size and
+mtime; a call only `stat`s the shards and recounts the ones that changed, so
+the other shards are never opened.
+
+A shard may be a plain `.csv` or a compressed `.csv.gz` / `.csv.zst` file.
+"""
+import bisect
+import csv
+import glob
+import json
+import os
+import random
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from . import compressed
+
+MANIFEST_NAME = ".shards.json"
+SHARD_PATTERNS = ("*.csv", "*.csv.gz", "*.csv.zst")
+_GLOB_CHARS = set("*?[")
+
+def is_sharded(path: Path) -> bool:
+    """Return True if `path` is a directory or a glob pattern rather than a single file.
+    An existing file is never a pattern, even if its name contains `[`, `?` or `*`."""
+    if os.path.isfile(path):
+        return False
+    return os.path.isdir(path) or bool(_GLOB_CHARS & set(str(path)))
+
+def _root(path: Path) -> Path:
+    """The directory that holds the manifest: the directory itself, or the glob's fixed prefix."""
+    if os.path.isdir(path):
+        return Path(path)
+    fixed = []
+    for part in Path(path).parts:
+        if _GLOB_CHARS & set(part):
+            break
+        fixed.append(part)
+    return Path(*fixed) if fixed else Path(".")
+
+def shard_paths(path: Path) -> List[Path]:
+    """
+    List the shards of a dataset in a stable order.
+    Args:
+        path (Path): A directory (its `*.csv`, `*.csv.gz` and `*.csv.zst` files are used)
+            or a glob pattern such as `data/part-*.csv`.
+    Returns:
+        List[Path]: Matching files, sorted by path.
+    """
+
+    if os.path.isdir(path):
+        found = {p for pattern in SHARD_PATTERNS for p in Path(path).glob(pattern)}
+    else:
+        found = {Path(p) for p in glob.glob(str(path), recursive=True)}
+    return sorted(p for p in found if p.is_file())
+
+def count_rows(shard: Path) -> int:
+    """Return the number of CSV rows in a shard, header included."""
+    if compressed.compression_of(shard):
+        return compressed.load_index(shard)["rows"]
+    with open(shard, mode="r", encoding="utf-8") as file:
+        return sum(1 for _ in csv.reader(file))
+
+class ShardManifest:
+    """Per-shard row counts for one dataset, persisted next to the shards.
+
+    Attributes:
+        path (Path): Manifest file location.
+        entries (Dict[str, List[int]]): Shard path -> [size, mtime_ns, rows].
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries: Dict[str, List[int]] = {}
+        self._dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                self.entries = json.load(file)["shards"]
+        except (OSError, ValueError, KeyError):
+            self.entries = {}
+
+    def rows(self, shard: Path) -> int:
+        """Return the shard's row count, recounting only if its size or mtime changed."""
+        stat = os.stat(shard)
+        key = os.path.abspath(shard)
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != stat.st_size or entry[1] != stat.st_mtime_ns:
+            entry = [stat.st_size, stat.st_mtime_ns, count_rows(shard)]
+            self.entries[key] = entry
+            self._dirty = True
+        return entry[2]
+
+    def refresh(self, shards: List[Path]) -> List[int]:
+        """Return row counts for `shards`, dropping entries for shards that no longer exist.
+        Entries of other files in the directory (e.g. matched by another glob) are kept."""
+        counts = [self.rows(shard) for shard in shards]
+        current = {os.path.abspath(shard) for shard in shards}
+        for stale in [key for key in self.entries if key not in current and not os.path.isfile(key)]:
+            del self.entries[stale]
+            self._dirty = True
+        return counts
+
+    def save(self) -> None:
+        """Write the manifest if anything changed; failures are printed and ignored."""
+        if not self._dirty:
+            return
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as file:
+                json.dump({"shards": self.entries}, file)
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError as e:
+            print(f"Could not write shard manifest {self.path}: {e}")
+
+def _row_at(shard: Path, row: int, skip_header: bool, use_cache: bool = None) -> Dict[str, Any]:
+    from .csvutils import convert_row_to_dict, read_table
+
+    if compressed.compression_of(shard) and not use_cache:
+        index = compressed.load_index(shard)
+        values = compressed.read_row(shard, row, index)
+        return convert_row_to_dict(values, headers=index["header"] if skip_header else None)
+    table = read_table(shard, use_cache=use_cache)
+    if table is None:
+        raise OSError(f"Could not read shard {shard}")
+    return dict(table.record(row, skip_header))
+
+def random_row(path: Path, skip_header: bool = True, use_cache: bool = None) -> Dict[str, Any] | None | bool:
+    """
+    Pick a row uniformly at random from all shards of a dataset.
+    Args:
+        path (Path): A directory or glob pattern of CSV shards.
+        skip_header (bool, optional): Whether each shard starts with a header row. Defaults to True.
+        use_cache (bool, optional): Passed on to `read_table` for the chosen shard.
+    Returns:
+        Dict[str, Any] | None | bool: The row keyed by its shard's header (or `col0`, ...),
+            None when no shard has data rows, or False when no shards are found or
+            a shard cannot be read.
+    """
+
+    try:
+        shards = shard_paths(path)
+        if not shards:
+            print("No data found in CSV.")
+            return False
+        manifest = ShardManifest(_root(path) / MANIFEST_NAME)
+        counts = manifest.refresh(shards)
+        manifest.save()
+        shard, row = pick_shard_row(shards, counts, skip_header)
+        if shard is None:
+            return None
+        return _row_at(shard, row, skip_header, use_cache)
+    except Exception as e:
+        print(f"Error reading CSV file: {e}")
+        return False
+
+def pick_shard_row(shards: List[Path], counts: List[int], skip_header: bool = True) -> Tuple[Path | None, int]:
+    """
+    Choose a (shard, raw row number) pair, weighting shards by their data-row count.
+    Returns (None, -1) when there are no data rows at all.
+    """
+
+    start = 1 if skip_header else 0
+    cumulative: List[int] = []
+    total = 0
+    for rows in counts:
+        total += max(0, rows - start)
+        cumulative.append(total)
+    if not total:
+        return None, -1
+    target = random.randrange(total)
+    position = bisect.bisect_right(cumulative, target)
+    before = cumulative[position - 1] if position else 0
+    return shards[position], start + target - before
@@ -0,0 +1,163 @@
+"""
+SQLite-backed data source.
+
+Re-parsing a CSV that changes often is the slowest part of picking a random
+row. `import_csv` converts a CSV into a SQLite database once; afterwards
+`read_csv`, `read_table` and `select_random_row` accept the database path
+(`.db`, `.sqlite` or `.sqlite3`) wherever they accept a CSV path.
+
+Layout: raw CSV row `i` (row 0 being the header) is stored at rowid `i + 1`
+of the `rows` table, in columns `c0`, `c1`, ... (NULL where a short row has
+no value). The header and the source file's size and mtime are kept in the
+`meta` table. A random pick draws a rowid and does a primary-key lookup
+instead of `ORDER BY RANDOM()`, so its cost does not grow with the table.
+"""
+import csv
+import json
+import os
+import random
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+_BATCH = 5000
+
+def is_sqlite(filepath: Path) -> bool:
+    """Return True if `filepath` has a SQLite database suffix."""
+    return Path(filepath).suffix.lower() in SQLITE_SUFFIXES
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    """Open an existing database read-only (never creates an empty file)."""
+    return sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+
+def _meta(conn: sqlite3.Connection) -> Dict[str, Any]:
+    return {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM meta")}
+
+def _values(row: Iterable[str | None]) -> List[str]:
+    values = list(row)
+    while values and values[-1] is None:
+        values.pop()
+    return ["" if value is None else value for value in values]
+
+def import_csv(csv_path: Path, db_path: Path = None, force: bool = False) -> Path:
+    """
+    Convert a CSV file into a SQLite database usable as a data source.
+    Args:
+        csv_path (Path): The CSV to import (`.csv.gz` / `.csv.zst` are decompressed).
+        db_path (Path, optional): Target database. Defaults to the CSV path with its `.csv`
+            (and compression) suffix replaced by `.db`.
+        force (bool, optional): Re-import even if the database is up to date with the
+            CSV's size and mtime. Defaults to False.
+    Returns:
+        Path: The database path.
+    Raises:
+        OSError: If the CSV cannot be read.
+        sqlite3.Error: If the database cannot be written.
+    Example:
+        >>> db = import_csv(Path("quotes.csv"))
+        >>> select_random_row(db)
+        {'name': 'Ada', 'quote': '...'}
+    """
+
+    from .compressed import compression_of, open_text
+
+    csv_path = Path(csv_path)
+    # quotes.2024.csv and quotes.2024.csv.gz both default to quotes.2024.db.
+    uncompressed = csv_path.with_suffix("") if compression_of(csv_path) else csv_path
+    db_path = Path(db_path) if db_path else uncompressed.with_suffix(".db")
+    stat = os.stat(csv_path)
+    source = {"path": os.path.abspath(csv_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if not force and db_path.exists():
+        try:
+            with closing(_connect(db_path)) as conn:
+                if _meta(conn).get("source") == source:
+                    return db_path
+        except sqlite3.Error:
+            pass
+
+    tmp = db_path.with_name(db_path.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("CREATE TABLE rows (id INTEGER PRIMARY KEY, c0 TEXT)")
+        width = 1
+        header: List[str] | None = None
+        batch: List[List[str]] = []
+        with open_text(csv_path) as file:
+            for row in csv.reader(file):
+                if header is None:
+                    header = row
+                for idx in range(width, len(row)):
+                    # ADD COLUMN only touches the schema; earlier rows read as NULL.
+                    conn.execute(f"ALTER TABLE rows ADD COLUMN c{idx} TEXT")
+                width = max(width, len(row))
+                batch.append(row)
+                if len(batch) >= _BATCH:
+                    _insert(conn, batch)
+                    batch = []
+        _insert(conn, batch)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("source", json.dumps(source)),
+            ("header", json.dumps(header or [])),
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, db_path)
+    return db_path
+
+def _insert(conn: sqlite3.Connection, rows: List[List[str]]) -> None:
+    """Insert rows in order, running consecutive rows of equal width as one executemany."""
+    start = 0
+    while start < len(rows):
+        size = len(rows[start])
+        stop = start
+        while stop < len(rows) and len(rows[stop]) == size:
+            stop += 1
+        if size:
+            columns = ", ".join(f"c{idx}" for idx in range(size))
+            conn.executemany(f"INSERT INTO rows ({columns}) VALUES ({', '.join('?' * size)})", rows[start:stop])
+        else:
+            conn.executemany("INSERT INTO rows (c0) VALUES (NULL)", [()] * (stop - start))
+        start = stop
+
+def read_rows(db_path: Path) -> List[List[str]]:
+    """Return every stored row, header included, as `read_csv` would."""
+    with closing(_connect(db_path)) as conn:
+        return [_values(row[1:]) for row in conn.execute("SELECT * FROM rows ORDER BY id")]
+
+def random_row(db_path: Path, skip_header: bool = True) -> Dict[str, Any] | None | bool:
+    """
+    Pick a random row from an imported database by rowid.
+    Args:
+        db_path (Path): A database written by `import_csv`.
+        skip_header (bool, optional): Whether the first row is a header. Defaults to True.
+    Returns:
+        Dict[str, Any] | None | bool: The row keyed like `convert_row_to_dict`, None when
+            there are no data rows, or False when the database cannot be read or is empty.
+    """
+
+    from .csvutils import convert_row_to_dict
+
+    try:
+        with closing(_connect(db_path)) as conn:
+            last = conn.execute("SELECT max(id) FROM rows").fetchone()[0]
+            if not last:
+                print("No data found in CSV.")
+                return False
+            first = 2 if skip_header else 1
+            if last < first:
+                return None
+            # Rowids are contiguous after an import; the >= lookup still finds a row if
+            # rows were deleted by hand, at the cost of a slight bias towards the row after a gap.
+            row = conn.execute("SELECT * FROM rows WHERE id >= ? ORDER BY id LIMIT 1", (random.randint(first, last),)).fetchone()
+            header = _meta(conn)["header"] if skip_header else None
+    except Exception as e:
+        print(f"Error reading CSV file: {e}")
+        return False
+    return convert_row_to_dict(_values(row[1:]), headers=header)
@@ -0,0 +1,204 @@
+"""
+Compact columnar storage for parsed CSV data.
+
+`read_csv` returns a list of lists, which costs a Python string object plus a
+list slot for every cell. `CsvTable` instead keeps one UTF-8 buffer per column
+and an `array` of end offsets into it, so a large CSV occupies little more
+than its encoded size. Rows are exposed through `RowView`, a slotted read-only
+mapping that resolves keys against interned header names without building a
+dict, and can be passed straight to `build_context` or `str.format_map`.
+"""
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Any, Iterable, Iterator, List, Sequence, Tuple
+
+def _compact(offsets: array) -> array:
+    """Downcast a 64-bit offset array to 32 bits when every offset fits."""
+    if offsets and offsets[-1] < 2 ** 32:
+        return array("I", offsets)
+    return offsets
+
+class CsvTable:
+    """Immutable, column-oriented table of CSV rows.
+
+    The table stores every raw row of the file, header included, so
+    `rows()` reproduces `read_csv` output exactly. Cell `(r, c)` lives in
+    column buffer `c` between `offsets[c][r]` and `offsets[c][r + 1]`; rows
+    shorter than the widest row keep empty slices for their missing cells,
+    and `widths[r]` remembers how many fields row `r` really had.
+    """
+
+    __slots__ = ("_data", "_offsets", "_widths", "_key_index", "_auto_keys")
+
+    def __init__(self, data: Sequence[Any], offsets: Sequence[Sequence[int]], widths: Sequence[int]):
+        self._data = list(data)
+        self._offsets = list(offsets)
+        self._widths = widths
+        self._auto_keys = [sys.intern(f"col{idx}") for idx in range(len(self._data))]
+        headers = self.row_values(0) if len(widths) else []
+        self._key_index = {sys.intern(key): idx for idx, key in enumerate(headers)}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[List[str]]) -> "CsvTable":
+        """
+        Build a table from an iterable of rows, such as a `csv.reader`.
+        Args:
+            rows (Iterable[List[str]]): Rows of string values; they are consumed
+                                        one at a time and not retained.
+        Returns:
+            CsvTable: The columnar table.
+        Example:
+            >>> table = CsvTable.from_rows([["name", "age"], ["Alice", "25"]])
+            >>> dict(table.record(1))
+            {'name': 'Alice', 'age': '25'}
+        """
+
+        data: List[bytearray] = []
+        offsets: List[array] = []
+        widths = array("I")
+        for nrow, row in enumerate(rows):
+            while len(data) < len(row):
+                data.append(bytearray())
+                offsets.append(array("Q", [0] * (nrow + 1)))
+            for idx, value in enumerate(row):
+                data[idx] += value.encode("utf-8")
+            for idx, buffer in enumerate(data):
+                offsets[idx].append(len(buffer))
+            widths.append(len(row))
+        return cls([bytes(buffer) for buffer in data], [_compact(o) for o in offsets], widths)
+
+    def __len__(self) -> int:
+        return len(self._widths)
+
+    @property
+    def width(self) -> int:
+        """Number of columns in the widest row."""
+        return len(self._data)
+
+    @property
+    def headers(self) -> List[str]:
+        """Interned header names taken from the first row (empty for an empty table)."""
+        return list(self._key_index)
+
+    def cell(self, row: int, col: int) -> str:
+        """Return the value at (`row`, `col`), or an empty string for a missing field."""
+        offsets = self._offsets[col]
+        return str(self._data[col][offsets[row]:offsets[row + 1]], "utf-8")
+
+    def row_values(self, row: int) -> List[str]:
+        """Return raw row `row` as a list of strings, exactly as `csv.reader` produced it."""
+        return [self.cell(row, col) for col in range(self._widths[row])]
+
+    def rows(self) -> List[List[str]]:
+        """Materialise the whole table in the list-of-lists shape returned by `read_csv`."""
+        return [self.row_values(row) for row in range(len(self))]
+
+    def column(self, col: int, start: int = 0, stop: int = None) -> List[str]:
+        """Return the values of column `col` for rows `start` to `stop` (exclusive)."""
+        stop = len(self) if stop is None else stop
+        if col >= len(self._data):
+            return [""] * (stop - start)
+        offsets, buffer = self._offsets[col], self._data[col]
+        bounds = offsets[start:stop + 1]
+        if len(bounds) < 2:
+            return []
+        base = bounds[0]
+        text = str(buffer[base:bounds[-1]], "utf-8")
+        if len(text) == bounds[-1] - base:
+            # ASCII-only block: byte offsets are character offsets, so slice the decoded text.
+            return [text[a - base:b - base] for a, b in zip(bounds, bounds[1:])]
+        return [str(buffer[a:b], "utf-8") for a, b in zip(bounds, bounds[1:])]
+
+    def column_index(self, key: str, skip_header: bool = True) -> int | None:
+        """
+        Resolve a record key to its column position, as `RowView` would.
+        Args:
+            key (str): A header name, or `col0`, `col1`, etc. when there is no header.
+            skip_header (bool, optional): Resolve against the header row. Defaults to True.
+        Returns:
+            int | None: The column position, or None when no such key exists.
+        """
+
+        if skip_header and self._key_index:
+            return self._key_index.get(key)
+        if key.startswith("col") and key[3:].isdigit():
+            col = int(key[3:])
+            if col < len(self._auto_keys) and key == self._auto_keys[col]:
+                return col
+        return None
+
+    def record(self, row: int, skip_header: bool = True) -> "RowView":
+        """
+        Return a mapping view of raw row `row`.
+        Args:
+            row (int): Raw row index (row 0 is the header when `skip_header` is True).
+            skip_header (bool, optional): Key the view by the header row; otherwise
+                                          use `col0`, `col1`, etc. Defaults to True.
+        Returns:
+            RowView: A view that behaves like `convert_row_to_dict(row, headers)`.
+        """
+
+        return RowView(self, row, skip_header and bool(self._key_index))
+
+    def records(self, skip_header: bool = True) -> Iterator["RowView"]:
+        """Iterate over views of every data row."""
+        start = 1 if skip_header else 0
+        for row in range(start, len(self)):
+            yield self.record(row, skip_header)
+
+    def buffers(self) -> Tuple[List[Any], List[Sequence[int]], Sequence[int]]:
+        """Return the raw (column buffers, column offsets, row widths) backing the table."""
+        return self._data, self._offsets, self._widths
+
+    def nbytes(self) -> int:
+        """Approximate memory held by cell data and offsets, in bytes."""
+        return sum(len(buffer) for buffer in self._data) + sum(
+            o.itemsize * len(o) for o in self._offsets
+        ) + self._widths.itemsize * len(self._widths)
+
+class RowView(Mapping):
+    """Read-only mapping over one table row.
+
+    With headers, every header is a key and fields missing from a short row
+    read as empty strings; without headers, keys are `col0`..`colN` for the
+    fields the row actually has. This mirrors `convert_row_to_dict`.
+    """
+
+    __slots__ = ("_table", "_row", "_named")
+
+    def __init__(self, table: CsvTable, row: int, named: bool):
+        self._table = table
+        self._row = row
+        self._named = named
+
+    def _column(self, key: str) -> int:
+        table = self._table
+        if self._named:
+            return table._key_index[key]
+        if not key.startswith("col") or not key[3:].isdigit():
+            raise KeyError(key)
+        col = int(key[3:])
+        if col >= table._widths[self._row] or key != table._auto_keys[col]:
+            raise KeyError(key)
+        return col
+
+    def __getitem__(self, key: str) -> str:
+        try:
+            col = self._column(key)
+        except (KeyError, AttributeError):
+            raise KeyError(key) from None
+        return self._table.cell(self._row, col)
+
+    def __iter__(self) -> Iterator[str]:
+        if self._named:
+            return iter(self._table._key_index)
+        return iter(self._table._auto_keys[:self._table._widths[self._row]])
+
+    def __len__(self) -> int:
+        if self._named:
+            return len(self._table._key_index)
+        return self._table._widths[self._row]
+
+    def __repr__(self) -> str:
+        return f"RowView({dict(self)!r})"
@@ -0,0 +1,156 @@
+"""
+Incremental reading of CSV files that only ever grow.
+
+Append-only CSVs (logs that gain rows through the day) are otherwise reparsed
+from byte zero on every `read_csv`. A `TailReader` remembers how far it has
+parsed (byte offset, header, row count) together with the file's size, mtime
+and a checksum of the parsed prefix. On the next read:
+
+- unchanged size and mtime: nothing is read;
+- the file grew and the prefix checksum still matches: only the new bytes are
+  parsed and appended;
+- the file shrank or the prefix changed (truncated, rewritten, rotated): the
+  whole file is parsed again.
+
+The prefix checksum covers the first and the last `WINDOW` bytes of the parsed
+region, which catches rewrites without reading the whole prefix each time.
+A row that may still be being written (no final newline yet, or a quoted field
+the csv parser has not seen closed) is not committed: it is parsed again on the
+next read, but until then it is returned as the file's last row, exactly as a
+full `read_csv` would return it.
+
+`read_csv(path, incremental=True)` keeps one reader per file in the process.
+"""
+import csv
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+from .compressed import _lines, _RowScanner
+
+WINDOW = 64 * 1024
+# Appended after the complete lines: a quoted field that is still open swallows it,
+# otherwise the parser returns it as a row of its own.
+_SENTINEL = "\x1e"
+
+def prefix_checksum(filepath: Path, length: int) -> str:
+    """Return the SHA-1 of the first and last `WINDOW` bytes of `filepath[:length]`."""
+    digest = hashlib.sha1(str(length).encode())
+    with open(filepath, "rb") as file:
+        digest.update(file.read(min(length, WINDOW)))
+        if length > WINDOW:
+            file.seek(max(WINDOW, length - WINDOW))
+            digest.update(file.read(length - file.tell()))
+    return digest.hexdigest()
+
+class TailReader:
+    """Parsed rows of one growing CSV file plus the state needed to extend them.
+
+    Attributes:
+        path (Path): The CSV file.
+        rows (List[List[str]]): Every complete row parsed so far, header included.
+        tail (List[List[str]]): Rows parsed from the bytes after `offset` (an unterminated
+            last line or an open quoted field); parsed again by the next refresh.
+        offset (int): Bytes of the file consumed by `rows`.
+        size (int): File size at the last refresh.
+        mtime_ns (int): File mtime at the last refresh.
+        checksum (str | None): `prefix_checksum` of the first `offset` bytes.
+        full_parses (int): Number of times the file was parsed from the start.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.rows: List[List[str]] = []
+        self.tail: List[List[str]] = []
+        self.offset = 0
+        self.size = -1
+        self.mtime_ns = -1
+        self.checksum: str | None = None
+        self.full_parses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def header(self) -> List[str] | None:
+        return self.rows[0] if self.rows else None
+
+    def _reset(self) -> None:
+        self.rows, self.tail, self.offset, self.checksum = [], [], 0, None
+        self.full_parses += 1
+
+    def refresh(self) -> List[List[str]]:
+        """
+        Bring `rows` up to date with the file.
+        Returns:
+            List[List[str]]: The rows added by this refresh (all rows after a full parse).
+        Raises:
+            OSError: If the file cannot be read.
+        """
+
+        with self._lock:
+            stat = os.stat(self.path)
+            if stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns:
+                return []
+            if stat.st_size < self.offset or (self.offset and prefix_checksum(self.path, self.offset) != self.checksum):
+                self._reset()
+            elif not self.offset:
+                self.full_parses += 1
+            start = len(self.rows)
+            self._parse_from(self.offset, stat.st_size)
+            self.size, self.mtime_ns = stat.st_size, stat.st_mtime_ns
+            self.checksum = prefix_checksum(self.path, self.offset)
+            return self.rows[start:]
+
+    def _parse_from(self, offset: int, end: int) -> None:
+        with open(self.path, "rb") as file:
+            file.seek(offset)
+            data = file.read(end - offset)
+        # Only complete lines are committed; a partially written last line is picked up next time.
+        complete = data.rfind(b"\n") + 1
+        parsed: List[List[str]] = []
+        starts: List[int] = []
+        if complete:
+            sentinel = (_SENTINEL + "\n").encode()
+            for row_start, row in _RowScanner(_lines(iter([data[:complete], sentinel]))):
+                parsed.append(row)
+                starts.append(row_start)
+            if parsed[-1] == [_SENTINEL]:
+                parsed.pop()
+            else:
+                # The sentinel was read into the last row: its quoted field is still open.
+                parsed.pop()
+                complete = starts.pop()
+        self.rows.extend(parsed)
+        self.offset = offset + complete
+        rest = data[complete:].decode("utf-8", errors="replace").replace("\r\n", "\n")
+        self.tail = list(csv.reader(rest.splitlines(keepends=True))) if rest else []
+
+_readers: Dict[str, TailReader] = {}
+_readers_lock = threading.Lock()
+
+def reader_for(filepath: Path) -> TailReader:
+    """Return the process-wide `TailReader` for a file, creating it on first use."""
+    key = os.path.abspath(filepath)
+    with _readers_lock:
+        reader = _readers.get(key)
+        if reader is None:
+            reader = _readers[key] = TailReader(Path(filepath))
+        return reader
+
+def read_incremental(filepath: Path) -> List[List[str]]:
+    """
+    Return all rows of `filepath`, parsing only what was appended since the last call.
+    Args:
+        filepath (Path): The CSV file to read.
+    Returns:
+        List[List[str]]: A new list holding every row, header included, as `read_csv`
+            without `incremental` would return them.
+    Raises:
+        OSError: If the file cannot be read.
+    """
+
+    reader = reader_for(filepath)
+    reader.refresh()
+    with reader._lock:
+        return reader.rows + reader.tail
@@ -0,0 +1,373 @@
+"""
+A small template language compiled to Python functions.
+
+Plain templates are rendered with `str.format_map`, which cannot repeat a
+section or leave one out, so digests and lists had to be pre-rendered in
+Python. This module adds blocks and filters on top of the same `{name}`
+placeholders:
+
+    <h1>{title|escape}</h1>
+    {% if items %}
+    <ul>
+    {% for item in items %}  <li class="{% if loop.first %}first{% endif %}">{loop.index}. {item.name|escape}</li>
+    {% endfor %}
+    </ul>
+    {% else %}
+    <p>Nothing new today.</p>
+    {% endif %}
+
+- `{path}` outputs a value; `path` is a name with optional `.key` / `.0` parts
+  (mapping keys, attributes or sequence indexes). Filters are chained with `|`
+  (`escape`/`e`, `upper`, `lower`, `title`, `capitalize`, `strip`, `length`,
+  `urlencode`, `nl2br`) and a format spec may follow a colon, as in
+  `{price:.2f}`. A missing top-level name raises KeyError, as with `format_map`.
+- `{% for x in expr %}...{% else %}...{% endfor %}` repeats a section; `loop.index`,
+  `loop.index0`, `loop.first`, `loop.last` and `loop.length` are available inside.
+  The optional `else` part renders when there is nothing to iterate.
+- `{% if expr %}...{% elif expr %}...{% else %}...{% endif %}` where `expr` is a
+  Python-style expression of names, literals, comparisons, `and`/`or`/`not` and
+  `in`. Missing names are falsy here rather than errors.
+- `{{` and `}}` are literal braces, as with `format_map`. `{%-` / `-%}` strip
+  the whitespace before / after a tag.
+
+`compile_template` turns the source into a Python function once; consecutive
+text and placeholders become a single f-string, so a template without blocks
+renders as one string build, as fast as `format_map`. Compiled functions are
+cached by source text.
+"""
+import ast
+import html
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Mapping, Tuple
+from urllib.parse import quote_plus
+
+class TemplateSyntaxError(ValueError):
+    """Raised when a template cannot be compiled."""
+
+_TOKEN = re.compile(r"(\{%-?.*?-?%\}|\{\{|\}\}|\{[^{}]*\})", re.DOTALL)
+_PLACEHOLDER = re.compile(r"^\s*([A-Za-z_]\w*(?:\.\w+)*)\s*((?:\|\s*\w+\s*)*)(?::(.*))?$", re.DOTALL)
+_TAG = re.compile(r"^\{%(-?)\s*(\w+)\s*(.*?)\s*(-?)%\}$", re.DOTALL)
+_FOR = re.compile(r"^([A-Za-z_]\w*)\s+in\s+(.+)$", re.DOTALL)
+
+def _nl2br(value: Any) -> str:
+    return str(value).replace("\n", "<br>\n")
+
+FILTERS: Dict[str, Callable[[Any], Any]] = {
+    "escape": lambda value: html.escape(str(value)),
+    "e": lambda value: html.escape(str(value)),
+    "upper": lambda value: str(value).upper(),
+    "lower": lambda value: str(value).lower(),
+    "title": lambda value: str(value).title(),
+    "capitalize": lambda value: str(value).capitalize(),
+    "strip": lambda value: str(value).strip(),
+    "length": len,
+    "urlencode": lambda value: quote_plus(str(value)),
+    "nl2br": _nl2br,
+}
+
+class LoopInfo:
+    """The `loop` variable inside `{% for %}` blocks."""
+
+    __slots__ = ("index0", "length")
+
+    def __init__(self, length: int):
+        self.index0 = 0
+        self.length = length
+
+    @property
+    def index(self) -> int:
+        return self.index0 + 1
+
+    @property
+    def first(self) -> bool:
+        return self.index0 == 0
+
+    @property
+    def last(self) -> bool:
+        return self.index0 == self.length - 1
+
+
+_LOOP_ATTRS = frozenset({"index", "index0", "first", "last", "length"})
+
+def _lookup(value: Any, key: str) -> Any:
+    """Resolve one `.key` step: mapping key, then sequence index, then attribute."""
+    if type(value) is dict and key in value:
+        return value[key]
+    try:
+        return value[key]
+    except (KeyError, TypeError, IndexError):
+        pass
+    if key.isdigit():
+        try:
+            return value[int(key)]
+        except (KeyError, TypeError, IndexError):
+            pass
+    try:
+        return getattr(value, key)
+    except AttributeError:
+        raise KeyError(key) from None
+
+def _soft_lookup(value: Any, key: str) -> Any:
+    try:
+        return _lookup(value, key)
+    except KeyError:
+        return None
+
+def _get(context: Mapping[str, Any], name: str) -> Any:
+    try:
+        return context[name]
+    except KeyError:
+        return None
+
+_SAFE_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.Compare,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot,
+    ast.Name, ast.Load, ast.Attribute, ast.Subscript, ast.Constant, ast.Tuple, ast.List,
+)
+
+class _Scope(ast.NodeTransformer):
+    """Rewrite template names and attributes into context lookups."""
+
+    def __init__(self, scope: Dict[str, str], used: set):
+        self.scope = scope
+        self.used = used
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id in self.scope:
+            self.used.add(self.scope[node.id])
+            return ast.copy_location(ast.Name(self.scope[node.id], ast.Load()), node)
+        call = ast.Call(ast.Name("_get", ast.Load()), [ast.Name("ctx", ast.Load()), ast.Constant(node.id)], [])
+        return ast.copy_location(call, node)
+
+    def visit_Attribute(self, node: ast.Attribute) -> ast.AST:
+        value = self.visit(node.value)
+        if isinstance(value, ast.Name) and value.id.startswith("l_loop_") and node.attr in _LOOP_ATTRS:
+            return ast.copy_location(ast.Attribute(value, node.attr, ast.Load()), node)
+        call = ast.Call(ast.Name("_soft_lookup", ast.Load()), [value, ast.Constant(node.attr)], [])
+        return ast.copy_location(call, node)
+
+def _expression(source: str, scope: Dict[str, str], used: set) -> str:
+    """Compile a block expression to Python source with names resolved against `scope`."""
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise TemplateSyntaxError(f"Invalid expression {source!r}: {e.msg}") from None
+    for node in ast.walk(tree):
+        if not isinstance(node, _SAFE_NODES):
+            raise TemplateSyntaxError(f"Unsupported syntax in {source!r}: {type(node).__name__}")
+    return ast.unparse(ast.fix_missing_locations(_Scope(scope, used).visit(tree)))
+
+class _Compiler:
+    def __init__(self, source: str):
+        self.source = source
+        self.constants: List[str] = []
+        self.lines: List[str] = []
+        self.pending: List[Tuple[bool, str]] = []
+        self.depth = 1
+        self.scope: Dict[str, str] = {}
+        self.blocks: List[Dict[str, Any]] = []
+        self.used: set = set()
+        self.loops: set = set()
+        self.counter = 0
+
+    def constant(self, value: str) -> str:
+        self.constants.append(value)
+        return f"_c{len(self.constants) - 1}"
+
+    def text(self, value: str) -> None:
+        if not value:
+            return
+        if self.pending and self.pending[-1][0]:
+            value = self.pending.pop()[1] + value
+        self.pending.append((True, value))
+
+    def joined(self) -> str:
+        """The pending text and placeholders as one Python expression."""
+        if len(self.pending) == 1 and self.pending[0][0]:
+            return self.constant(self.pending[0][1])
+        fields = ("{" + self.constant(code) + "}" if is_text else code for is_text, code in self.pending)
+        return 'f"' + "".join(fields) + '"'
+
+    def placeholder(self, match: re.Match) -> None:
+        path, filters, spec = match.groups()
+        head, *rest = path.split(".")
+        expr = self.scope.get(head) or f"ctx[{head!r}]"
+        self.used.add(expr)
+        for key in rest:
+            expr = self.step(expr, key)
+        for name in filter(None, (f.strip() for f in filters.split("|"))):
+            if name not in FILTERS:
+                raise TemplateSyntaxError(f"Unknown filter {name!r}")
+            expr = f"_f_{name}({expr})"
+        self.pending.append((False, "{" + expr + (":{" + self.constant(spec) + "}" if spec else "") + "}"))
+
+    def step(self, expr: str, key: str) -> str:
+        """Python source for `expr.key`, inlining the common cases of loop attributes and dict keys."""
+        if expr in self.loops and key in _LOOP_ATTRS:
+            return f"{expr}.{key}"
+        if expr.isidentifier():
+            return f"({expr}[{key!r}] if type({expr}) is dict and {key!r} in {expr} else _lookup({expr}, {key!r}))"
+        return f"_lookup({expr}, {key!r})"
+
+    def flush(self) -> None:
+        if self.pending:
+            self.emit(f"_a({self.joined()})")
+            self.pending = []
+
+    def emit(self, line: str) -> None:
+        self.lines.append("    " * self.depth + line)
+
+    def tag(self, name: str, args: str) -> None:
+        self.flush()
+        if name == "for":
+            match = _FOR.match(args)
+            if not match:
+                raise TemplateSyntaxError(f"Invalid for tag: {{% for {args} %}}")
+            var, iterable = match.groups()
+            self.counter += 1
+            block = {
+                "kind": "for", "scope": self.scope, "iterable": _expression(iterable, self.scope, self.used),
+                "local": f"l_{var}_{self.counter}", "loop": f"l_loop_{self.counter}",
+                "seen": f"_seen_{self.counter}", "line": len(self.lines), "indent": "    " * self.depth,
+            }
+            self.blocks.append(block)
+            # Placeholders for the `else` flag and loop header; finalised at endfor.
+            self.lines.extend(["", "", "", ""])
+            self.loops.add(block["loop"])
+            self.depth += 1
+            self.scope = dict(self.scope, **{var: block["local"], "loop": block["loop"]})
+        elif name == "if":
+            self.blocks.append({"kind": "if", "scope": self.scope})
+            self.emit(f"if {_expression(args, self.scope, self.used)}:")
+            self.depth += 1
+            self.emit("pass")
+        elif name == "elif":
+            self._expect("if", name)
+            self.depth -= 1
+            self.emit(f"elif {_expression(args, self.scope, self.used)}:")
+            self.depth += 1
+            self.emit("pass")
+        elif name == "else":
+            block = self._expect(("if", "for"), name)
+            self.depth -= 1
+            if block["kind"] == "for":
+                # The else part of a for renders when the loop body never ran.
+                self.scope = block["scope"]
+                block["kind"] = "for-else"
+                self.emit(f"if not {block['seen']}:")
+            else:
+                self.emit("else:")
+            self.depth += 1
+            self.emit("pass")
+        elif name in ("endfor", "endif"):
+            block = self._expect(("for", "for-else") if name == "endfor" else ("if",), name)
+            self.blocks.pop()
+            self.scope = block["scope"]
+            self.depth -= 1
+            if name == "endfor":
+                self._finish_for(block)
+        else:
+            raise TemplateSyntaxError(f"Unknown tag {{% {name} %}}")
+
+    def _finish_for(self, block: Dict[str, Any]) -> None:
+        """Fill in the loop header, using the cheaper forms when `loop` or `else` is unused."""
+        line, indent = block["line"], block["indent"]
+        local, info = block["local"], block["loop"]
+        if info in self.used:
+            # `loop.index0` is the enumerate target, so the body reads plain attributes.
+            self.lines[line + 1] = f"{indent}{local}s = list(({block['iterable']}) or ())"
+            self.lines[line + 2] = f"{indent}{info} = _LoopInfo(len({local}s))"
+            header = f"for {info}.index0, {local} in enumerate({local}s):"
+        else:
+            header = f"for {local} in ({block['iterable']}) or ():"
+        self.lines[line + 3] = indent + header
+        if block["kind"] == "for-else":
+            self.lines[line] = f"{indent}{block['seen']} = False"
+            self.lines.insert(line + 4, f"{indent}    {block['seen']} = True")
+
+    def _expect(self, kinds: Any, name: str) -> Dict[str, Any]:
+        kinds = (kinds,) if isinstance(kinds, str) else kinds
+        if not self.blocks or self.blocks[-1]["kind"] not in kinds:
+            raise TemplateSyntaxError(f"Unexpected {{% {name} %}}")
+        return self.blocks[-1]
+
+    def compile(self) -> Callable[[Mapping[str, Any]], str]:
+        parts = _TOKEN.split(self.source)
+        strip_next = False
+        has_blocks = False
+        for idx, part in enumerate(parts):
+            if idx % 2 == 0:
+                if strip_next:
+                    part = part.lstrip()
+                if idx + 1 < len(parts) and parts[idx + 1].startswith("{%-"):
+                    part = part.rstrip()
+                self.text(part)
+                strip_next = False
+                continue
+            if part == "{{":
+                self.text("{")
+            elif part == "}}":
+                self.text("}")
+            elif part.startswith("{%"):
+                match = _TAG.match(part)
+                if not match:
+                    raise TemplateSyntaxError(f"Invalid tag {part!r}")
+                _, name, args, trailing = match.groups()
+                self.tag(name, args)
+                strip_next = bool(trailing)
+                has_blocks = True
+            else:
+                match = _PLACEHOLDER.match(part[1:-1])
+                if match:
+                    self.placeholder(match)
+                else:
+                    self.text(part)
+        if self.blocks:
+            raise TemplateSyntaxError(f"Unclosed {{% {self.blocks[-1]['kind'].split('-')[0]} %}}")
+        if has_blocks:
+            self.flush()
+            body = ["def render(ctx):", "    _o = []", "    _a = _o.append", *filter(None, self.lines), "    return ''.join(_o)"]
+        else:
+            body = ["def render(ctx):", f"    return {self.joined() if self.pending else repr('')}"]
+        namespace: Dict[str, Any] = {
+            "_get": _get, "_lookup": _lookup, "_soft_lookup": _soft_lookup, "_LoopInfo": LoopInfo,
+            **{f"_c{idx}": value for idx, value in enumerate(self.constants)},
+            **{f"_f_{name}": func for name, func in FILTERS.items()},
+        }
+        code = compile("\n".join(body), "<template>", "exec")
+        exec(code, namespace)
+        render = namespace["render"]
+        render.__source__ = "\n".join(body)
+        return render
+
+@lru_cache(maxsize=128)
+def compile_template(source: str) -> Callable[[Mapping[str, Any]], str]:
+    """
+    Compile template source into a function `render(context) -> str`.
+    Results are cached by source text, so repeated calls are dictionary lookups.
+    Args:
+        source (str): Template text.
+    Returns:
+        Callable[[Mapping[str, Any]], str]: The compiled renderer.
+    Raises:
+        TemplateSyntaxError: If a tag, expression or filter is invalid.
+    Example:
+        >>> render = compile_template("{% for n in names %}<b>{n|upper}</b>{% endfor %}")
+        >>> render({"names": ["a", "b"]})
+        '<b>A</b><b>B</b>'
+    """
+
+    return _Compiler(source).compile()
+
+@lru_cache(maxsize=128)
+def uses_blocks(source: str) -> bool:
+    """Return True if `source` needs the compiler (it has `{% ... %}` tags or `|` filters)."""
+    return "{%" in source or any(
+        "|" in part and _PLACEHOLDER.match(part[1:-1])
+        for part in _TOKEN.findall(source) if part.startswith("{") and not part.startswith(("{%", "{{"))
+    )
+
+def render(source: str, context: Mapping[str, Any]) -> str:
+    """Render template source with `context`, compiling it on first use."""
+    return compile_template(source)(context)
@@ -0,0 +1,177 @@
+"""
+Transport registry: the backends `send_email` delivers through.
+
+A transport is any callable taking
+`(sender, recipients, subject, html_content, text_content=None, attachments=())`
+and returning a response dict; it raises when delivery fails. `send_email`
+looks the transport up by name: `MAILER_CLIENT` in production mode,
+`EMAIL_DEBUG_TRANSPORT` otherwise, or the `transport` argument.
+
+Built in:
+
+- "mailersend", "smtp": the MailerSend API and the SMTP relay from `SMTPSettings`.
+- "group": load balancing and failover over `EMAIL_TRANSPORTS` (see `transportgroup`).
+- "debug": writes the HTML to `debug-email.html`; the default outside production.
+- "null": accepts and discards every message. Measures the pipeline without any I/O.
+- "memory": keeps messages in `memory.messages` (the last `OUTBOX_LIMIT`), for
+  tests and high-rate load runs without a file write per message.
+
+Third parties add their own, e.g. in a plugin module imported at startup:
+
+    from email_me_anything import transports
+
+    @transports.register("ses")
+    def send_ses(sender, recipients, subject, html_content, text_content=None, attachments=()):
+        ...
+        return {"status": "success", "message_id": message_id}
+
+and select it with `MAILER_CLIENT=ses`. Transports registered with
+`delivers=False` ("debug", "null", "memory") never reach a recipient, so sends
+through them are not recorded in a `SendJournal`. Transports registered with
+`bcc=True` ("smtp") keep the recipients of one message out of its headers and
+accept a `personalize` keyword (see `emailutils._send_smtp`); `send_bulk` and
+the `campaign` command hand them whole batches. Every other transport gets one
+call per recipient, so addresses are never exposed to each other.
+"""
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List
+
+from . import transportgroup
+from .config import Config
+
+Transport = Callable[..., Dict[str, Any]]
+
+OUTBOX_LIMIT = 10_000
+
+_registry: Dict[str, Transport] = {}
+_discarding: set = set()
+_bcc: set = set()
+_lock = threading.Lock()
+
+def register(name: str, transport: Transport = None, replace: bool = False, delivers: bool = True,
+             bcc: bool = False) -> Any:
+    """
+    Register `transport` under `name`; without `transport`, return a decorator that does.
+    Args:
+        name (str): The name selected with `MAILER_CLIENT` or `send_email(..., transport=name)`.
+        transport (Transport, optional): The transport callable.
+        replace (bool, optional): Allow replacing an already registered transport. Defaults to False.
+        delivers (bool, optional): False for transports that keep or discard messages instead
+            of delivering them. Defaults to True.
+        bcc (bool, optional): True for transports that can send one message to many
+            recipients without listing them in its headers. Defaults to False.
+    Returns:
+        The transport, or a decorator when `transport` is omitted.
+    Raises:
+        ValueError: If `name` is taken and `replace` is False.
+    """
+
+    if transport is None:
+        return lambda function: register(name, function, replace, delivers, bcc)
+    with _lock:
+        if name in _registry and not replace:
+            raise ValueError(f"Transport {name!r} is already registered")
+        _registry[name] = transport
+        for flags, on in ((_discarding, not delivers), (_bcc, bcc)):
+            if on:
+                flags.add(name)
+            else:
+                flags.discard(name)
+    return transport
+
+def unregister(name: str) -> None:
+    """Remove a transport; unknown names are ignored."""
+    with _lock:
+        _registry.pop(name, None)
+        _discarding.discard(name)
+        _bcc.discard(name)
+
+def get(name: str) -> Transport:
+    """
+    Return the transport registered under `name`.
+    Raises:
+        KeyError: If no transport has that name.
+    """
+
+    try:
+        return _registry[name]
+    except KeyError:
+        raise KeyError(f"Unknown transport {name!r}; registered: {', '.join(names())}") from None
+
+def delivers(name: str) -> bool:
+    """Whether `name` is a registered transport that delivers messages to their recipients."""
+    return name in _registry and name not in _discarding
+
+def bcc(name: str) -> bool:
+    """Whether `name` sends one message to many recipients without exposing their addresses."""
+    return name in _bcc and name in _registry
+
+def selected(name: str = None) -> str:
+    """The transport `send_email` uses: `name` if given, else MAILER_CLIENT in production and EMAIL_DEBUG_TRANSPORT otherwise."""
+    return name or (Config.MAILER if Config.PROD_MODE else Config.DEBUG_TRANSPORT)
+
+def names() -> List[str]:
+    """Registered transport names, sorted."""
+    return sorted(_registry)
+
+def null_transport(sender: Dict[str, str], recipients: List[Dict[str, str]], subject: str, html_content: str,
+                   text_content: str = None, attachments: Any = ()) -> Dict[str, Any]:
+    """Accept and discard the message."""
+    return {"status": "null", "message": "Email discarded by the null transport."}
+
+class MemoryTransport:
+    """Captures sent messages in memory.
+
+    Attributes:
+        messages (deque): The most recent messages as dicts with "sender", "recipients",
+            "subject", "html", "text" and "attachments" keys.
+        sent (int): Messages captured since creation or the last `clear`, including
+            ones already dropped from `messages`.
+    """
+
+    def __init__(self, limit: int = OUTBOX_LIMIT):
+        self.messages: deque = deque(maxlen=limit)
+        self.sent = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, sender: Dict[str, str], recipients: List[Dict[str, str]], subject: str, html_content: str,
+                 text_content: str = None, attachments: Any = ()) -> Dict[str, Any]:
+        message = {"sender": sender, "recipients": list(recipients), "subject": subject, "html": html_content,
+                   "text": text_content, "attachments": list(attachments)}
+        with self._lock:
+            self.messages.append(message)
+            self.sent += 1
+        return {"status": "captured", "message": "Email kept in memory."}
+
+    def clear(self) -> None:
+        with self._lock:
+            self.messages.clear()
+            self.sent = 0
+
+memory = MemoryTransport()
+
+def debug_transport(sender: Dict[str, str], recipients: List[Dict[str, str]], subject: str, html_content: str,
+                    text_content: str = None, attachments: Any = ()) -> Dict[str, Any]:
+    """Write the HTML to `debug-email.html` instead of sending it."""
+    print("Production mode is OFF. Writing email to debug-email.html")
+    with open("debug-email.html", "w", encoding="utf-8") as debug_file:
+        debug_file.write(html_content)
+    return {"status": "debug", "message": "Email not sent in non-production mode."}
+
+# The MailerSend and SMTP senders live in emailutils, which imports this module;
+# look them up at call time so reloading or monkeypatching emailutils is honoured.
+def _mailersend(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+    from . import emailutils
+    return emailutils._send_mailersend(*args, **kwargs)
+
+def _smtp(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+    from . import emailutils
+    return emailutils._send_smtp(*args, **kwargs)
+
+register("mailersend", _mailersend)
+register("smtp", _smtp, bcc=True)
+register("group", transportgroup.send)
+register("debug", debug_transport, delivers=False)
+register("null", null_transport, delivers=False)
+register("memory", memory, delivers=False)
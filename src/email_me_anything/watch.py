@@ -0,0 +1,267 @@
+"""
+File watching for long-lived processes.
+
+Workers that render templates and pick CSV rows for hours either re-stat or
+re-read their files on every call, or risk serving stale content. A
+`FileWatcher` keeps loaded files (template text, parsed tables) in memory and
+drops them only when the file actually changes, so a cache hit costs a dict
+lookup and no system calls.
+
+Changes are detected with Linux inotify (through `ctypes`, no extra
+dependency). The parent directory is watched rather than the file itself, so
+editors and tools that replace files atomically (write + rename) are seen too.
+Where inotify is unavailable, a background thread polls the watched files'
+mtime, size and inode instead.
+
+Once `start()` has been called, `build_html_content`, `RenderCache` and
+`select_random_row` use the active watcher automatically:
+
+    from email_me_anything import watch
+    watch.start()
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_DIR_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+             | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT = struct.Struct("iIII")
+
+class _Inotify:
+    """Minimal ctypes binding: one inotify descriptor watching directories."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, directory: str) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(directory), _DIR_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), directory)
+        return wd
+
+    def read_events(self) -> List[Tuple[int, int, str]]:
+        """Return pending (watch descriptor, mask, name) events without blocking."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+class FileWatcher:
+    """Caches values loaded from files and invalidates them when the files change.
+
+    Attributes:
+        backend (str): "inotify" or "polling".
+        poll_interval (float): Seconds between polls (polling backend only).
+    """
+
+    def __init__(self, poll_interval: float = 1.0, force_polling: bool = False):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._keys: Dict[Any, str] = {}
+        self._generations: Dict[str, int] = {}
+        self._values: Dict[Tuple[str, str], Any] = {}
+        self._listeners: List[Callable[[str], None]] = []
+        self._stats: Dict[str, Tuple[int, int, int] | None] = {}
+        self._dirs: Dict[str, Set[str]] = {}
+        self._wds: Dict[int, str] = {}
+        self._closed = threading.Event()
+        self._inotify = None
+        if not force_polling:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                self._inotify = None
+        self.backend = "inotify" if self._inotify else "polling"
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = threading.Thread(target=self._run, name="email-me-anything-watch", daemon=True)
+        self._thread.start()
+
+    def key(self, path: Path) -> str:
+        """Return the absolute path a watched `path` is tracked under, watching it on first use."""
+        key = self._keys.get(path)
+        if key is None:
+            key = os.path.abspath(path)
+            with self._lock:
+                if key not in self._generations:
+                    self._generations[key] = 0
+                    self._stats[key] = _stat(key)
+                    self._watch_dir(key)
+                self._keys[path] = key
+        return key
+
+    def _watch_dir(self, key: str) -> None:
+        directory, name = os.path.split(key)
+        names = self._dirs.get(directory)
+        if names is None:
+            names = self._dirs[directory] = set()
+            if self._inotify:
+                try:
+                    self._wds[self._inotify.add_watch(directory)] = directory
+                except OSError:
+                    pass
+        names.add(name)
+
+    def generation(self, path: Path) -> int:
+        """Return a counter that increases every time `path` changes (watching it if needed)."""
+        return self._generations[self.key(path)]
+
+    def add_listener(self, callback: Callable[[str], None]) -> None:
+        """Call `callback(absolute_path)` from the watcher thread whenever a watched file changes."""
+        self._listeners.append(callback)
+
+    def cached(self, path: Path, loader: Callable[[Path], Any], kind: str = "") -> Any:
+        """
+        Return `loader(path)`, loading it only the first time and after `path` changes.
+        Args:
+            path (Path): The file the value is derived from.
+            loader (Callable[[Path], Any]): Loads the value; a None result is not cached.
+            kind (str, optional): Distinguishes several values derived from the same file
+                (e.g. "template" and "table"). Defaults to "".
+        Returns:
+            Any: The cached or freshly loaded value.
+        """
+
+        key = self.key(path)
+        value = self._values.get((key, kind))
+        if value is not None:
+            return value
+        generation = self._generations[key]
+        value = loader(path)
+        with self._lock:
+            # Only keep the value if the file did not change while it was loading.
+            if value is not None and self._generations.get(key) == generation:
+                self._values[(key, kind)] = value
+        return value
+
+    def invalidate(self, path: Path | str) -> None:
+        """Forget everything loaded from `path` and bump its generation."""
+        key = os.path.abspath(path)
+        with self._lock:
+            if key not in self._generations:
+                return
+            self._generations[key] += 1
+            for cached in [k for k in self._values if k[0] == key]:
+                del self._values[cached]
+        for callback in list(self._listeners):
+            try:
+                callback(key)
+            except Exception as e:
+                print(f"File watch listener failed: {e}")
+
+    def _run(self) -> None:
+        while not self._closed.is_set():
+            if self._inotify:
+                ready, _, _ = select.select([self._inotify.fd, self._wake_r], [], [])
+                if self._inotify.fd in ready:
+                    self._handle(self._inotify.read_events())
+            else:
+                select.select([self._wake_r], [], [], self.poll_interval)
+                self._poll()
+
+    def _handle(self, events: List[Tuple[int, int, str]]) -> None:
+        changed = set()
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                changed.update(self._generations)
+                continue
+            directory = self._wds.get(wd)
+            if directory is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                changed.update(os.path.join(directory, n) for n in self._dirs.get(directory, ()))
+            elif name in self._dirs.get(directory, ()):
+                changed.add(os.path.join(directory, name))
+        for key in changed:
+            self.invalidate(key)
+
+    def _poll(self) -> None:
+        with self._lock:
+            keys = list(self._stats)
+        for key in keys:
+            current = _stat(key)
+            if current != self._stats.get(key):
+                self._stats[key] = current
+                self.invalidate(key)
+
+    def close(self) -> None:
+        """Stop the watcher thread and release the inotify descriptor."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        os.write(self._wake_w, b"x")
+        self._thread.join(timeout=5)
+        for fd in (self._wake_r, self._wake_w):
+            os.close(fd)
+        if self._inotify:
+            self._inotify.close()
+
+def _stat(path: str) -> Tuple[int, int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+_active: FileWatcher | None = None
+
+def start(poll_interval: float = 1.0, force_polling: bool = False) -> FileWatcher:
+    """
+    Start the process-wide watcher used by templates, render caches and CSV selection.
+    Args:
+        poll_interval (float, optional): Polling period when inotify is unavailable. Defaults to 1s.
+        force_polling (bool, optional): Use the polling backend even where inotify exists.
+    Returns:
+        FileWatcher: The active watcher (the existing one if already started).
+    """
+
+    global _active
+    if _active is None:
+        _active = FileWatcher(poll_interval, force_polling)
+    return _active
+
+def stop() -> None:
+    """Stop the process-wide watcher; callers go back to reading files on every call."""
+    global _active
+    watcher, _active = _active, None
+    if watcher is not None:
+        watcher.close()
+
+def active() -> FileWatcher | None:
+    """Return the process-wide watcher, or None when file watching is off."""
+    return _active
@@ -85,3 +85,70 @@ def fake_mailersend(monkeypatch):
 
     monkeypatch.setitem(sys.modules, "mailersend", mod)
     return mod
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    """Replace smtplib.SMTP_SSL with a recorder; returns the list of opened connections."""
+    import smtplib
+
+    connections = []
+
+    class FakeSMTP:
+        esmtp_features = {}
+
+        def __init__(self, host, port, context=None, timeout=None):
+            self.host, self.port = host, port
+            self.transactions = []
+            connections.append(self)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def ehlo(self):
+            return (250, b"ok")
+
+        def login(self, user, password):
+            return (235, b"ok")
+
+        def send_message(self, msg, from_addr=None, to_addrs=None):
+            self.transactions.append({"msg": msg, "to": list(to_addrs or [msg["To"]]), "data": msg.as_bytes()})
+            return {}
+
+        def sendmail(self, from_addr, to_addrs, msg):
+            self.transactions.append({"msg": None, "to": list(to_addrs), "data": msg})
+            return {}
+
+        # Low-level commands used when a message is streamed into DATA.
+        def mail(self, from_addr):
+            self._pending = {"msg": None, "to": [], "chunks": []}
+            return (250, b"ok")
+
+        def rcpt(self, address):
+            self._pending["to"].append(address)
+            return (250, b"ok")
+
+        def docmd(self, cmd):
+            assert cmd == "data"
+            return (354, b"go ahead")
+
+        def send(self, data):
+            self._pending["chunks"].append(data)
+
+        def getreply(self):
+            pending = self._pending
+            raw = b"".join(pending.pop("chunks"))
+            assert raw.endswith(b"\r\n.\r\n")
+            pending["data"] = raw[:-3].replace(b"\r\n..", b"\r\n.")
+            pending["streamed"] = True
+            self.transactions.append(pending)
+            return (250, b"queued")
+
+        def rset(self):
+            return (250, b"ok")
+
+    monkeypatch.setattr(smtplib, "SMTP_SSL", FakeSMTP)
+    return connections
@@ -0,0 +1,150 @@
+from pathlib import Path
+import base64
+import email
+import os
+from email import policy
+
+import pytest
+
+from email_me_anything import attachments
+from email_me_anything.attachments import Attachment, as_attachments
+from email_me_anything.mimeskeleton import MimeSkeleton
+
+SENDER = {"email": "from@example.com", "name": "From"}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    attachments.clear_cache()
+    yield
+    attachments.clear_cache()
+
+
+def _file(tmp_path: Path, size: int, name: str = "report.pdf") -> Path:
+    p = tmp_path / name
+    p.write_bytes(os.urandom(size))
+    return p
+
+
+def _smtp_mode(monkeypatch):
+    from email_me_anything.emailutils import Config
+    monkeypatch.setattr(Config, "PROD_MODE", True)
+    monkeypatch.setattr(Config, "MAILER", "smtp")
+
+
+@pytest.mark.parametrize("size", [0, 1, 56, 57, 58, 57 * 3 + 1, 57 * 7])
+def test_chunks_match_mime_base64(tmp_path: Path, monkeypatch, size):
+    monkeypatch.setattr(attachments, "CHUNK_BYTES", 57 * 2)
+    p = _file(tmp_path, size)
+    expected = base64.encodebytes(p.read_bytes()).replace(b"\n", b"\r\n").removesuffix(b"\r\n")
+
+    chunks = list(Attachment(p).chunks())
+    assert b"".join(chunks) == expected
+    assert all(len(line) <= 76 for line in expected.split(b"\r\n"))
+    assert Attachment(p).base64() == base64.b64encode(p.read_bytes()).decode("ascii")
+    assert attachments._encoded_size(size) == len(expected)
+
+
+def test_encoding_is_cached_until_file_changes(tmp_path: Path, monkeypatch):
+    p = _file(tmp_path, 1000)
+    first = Attachment(p).encoded()
+    assert attachments.cache_info()["entries"] == 1
+    monkeypatch.setattr(attachments, "_encode", lambda *a: pytest.fail("re-encoded a cached file"))
+    assert Attachment(p).encoded() == first
+
+    monkeypatch.undo()
+    p.write_bytes(b"changed")
+    stat = p.stat()
+    os.utime(p, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert base64.b64decode(Attachment(p).encoded()) == b"changed"
+
+
+def test_large_files_are_streamed_not_cached(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(attachments, "CACHE_BYTES", 100)
+    small, large = _file(tmp_path, 30, "a.txt"), _file(tmp_path, 500, "b.bin")
+    Attachment(small).encoded()
+    Attachment(large).encoded()
+    assert attachments.cache_info() == {"entries": 1, "bytes": 40}
+
+
+def test_content_type_and_missing_file(tmp_path: Path):
+    assert Attachment(_file(tmp_path, 3, "notes.csv")).content_type == "text/csv"
+    assert Attachment(_file(tmp_path, 3, "blob")).content_type == "application/octet-stream"
+    with pytest.raises(FileNotFoundError):
+        as_attachments([tmp_path / "missing.pdf"])
+
+
+def test_skeleton_with_attachments_parses(tmp_path: Path):
+    pdf, csv = _file(tmp_path, 5000), tmp_path / "données.csv"
+    csv.write_text("a,b\n1,2\n", encoding="utf-8")
+    skeleton = MimeSkeleton(SENDER, "Report", "<p>See attached</p>", attachments=as_attachments([pdf, csv]))
+
+    streamed = b"".join(skeleton.chunks({"email": "to@example.com"}))
+    msg = email.message_from_bytes(streamed, policy=policy.default)
+    assert msg.get_body(("html",)).get_content().strip() == "<p>See attached</p>"
+    parts = list(msg.iter_attachments())
+    assert [part.get_filename() for part in parts] == ["report.pdf", "données.csv"]
+    assert parts[0].get_content() == pdf.read_bytes()
+    assert parts[1].get_content_type() == "text/csv"
+    assert parts[1].get_payload(decode=True) == b"a,b\n1,2\n"
+    assert skeleton.render().endswith(skeleton.body)
+
+
+def test_smtp_streams_attachments_into_data(tmp_path: Path, fake_smtp, monkeypatch):
+    from email_me_anything.emailutils import send_email
+    _smtp_mode(monkeypatch)
+    p = _file(tmp_path, 200_000)
+    html = "<p>Totals</p>\n.leading dot line\n"
+
+    resp = send_email(SENDER, [{"email": "to@example.com", "name": "To"}], "Report", html, attachments=[p])
+
+    assert resp["status"] == "success"
+    (transaction,) = fake_smtp[0].transactions
+    assert transaction["streamed"] and transaction["to"] == ["to@example.com"]
+    msg = email.message_from_bytes(transaction["data"], policy=policy.default)
+    assert msg["To"] == "To <to@example.com>"
+    assert ".leading dot line" in msg.get_body(("html",)).get_content()
+    assert next(msg.iter_attachments()).get_content() == p.read_bytes()
+
+
+def test_bulk_sends_encode_each_file_once(tmp_path: Path, fake_smtp, monkeypatch):
+    from email_me_anything.emailutils import send_bulk
+    _smtp_mode(monkeypatch)
+    p = _file(tmp_path, 10_000)
+    encodes = []
+    real_encode = attachments._encode
+    monkeypatch.setattr(attachments, "_encode", lambda *a: encodes.append(a) or real_encode(*a))
+    people = [({"email": f"{n}@example.com", "name": n}, f"<p>{n}</p>") for n in "abcd"]
+
+    send_bulk(SENDER, "Report", people, attachments=[p])
+
+    assert len(encodes) == 1
+    transactions = [t for conn in fake_smtp for t in conn.transactions]
+    assert len(transactions) == 4
+    for t in transactions:
+        assert next(email.message_from_bytes(t["data"], policy=policy.default).iter_attachments()).get_content() == p.read_bytes()
+
+
+def test_mailersend_receives_cached_encoding(tmp_path: Path, monkeypatch):
+    from mailersend.builders.email import EmailBuilder
+    from email_me_anything import emailutils
+    monkeypatch.setattr(emailutils.Config, "PROD_MODE", True)
+    monkeypatch.setattr(emailutils.Config, "MAILER", "mailersend")
+    sent = []
+
+    class Client:
+        class emails:
+            @staticmethod
+            def send(request):
+                sent.append(request)
+                return type("Response", (), {"to_dict": lambda self: {"status": "ok"}})()
+
+    monkeypatch.setattr(emailutils, "MailerSendClient", Client)
+    monkeypatch.setattr(emailutils, "EmailBuilder", EmailBuilder)
+    p = _file(tmp_path, 300, "chart.png")
+
+    emailutils.send_email(SENDER, [{"email": "to@example.com", "name": "To"}], "Chart", "<p>x</p>", attachments=[p])
+
+    (attachment,) = sent[0].attachments
+    assert attachment.filename == "chart.png"
+    assert base64.b64decode(attachment.content) == p.read_bytes()
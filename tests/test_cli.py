@@ -0,0 +1,130 @@
+from pathlib import Path
+import time
+
+import pytest
+
+from email_me_anything import cli
+
+
+@pytest.fixture
+def people_csv(tmp_path: Path) -> Path:
+    p = tmp_path / "people.csv"
+    p.write_text("email,name\n" + "".join(f"p{i}@example.com,P{i}\n" for i in range(5)), encoding="utf-8")
+    return p
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    calls = []
+
+    def fake_send_email(sender, recipients, subject, html):
+        calls.append({"sender": sender, "recipients": recipients, "subject": subject, "html": html})
+        return {"status": "sent"}
+
+    monkeypatch.setattr(cli, "send_email", fake_send_email)
+    return calls
+
+
+def test_lucky_dry_run_renders_without_sending(sample_csv: Path, simple_template: Path, sent, capsys):
+    assert cli.main(["lucky", str(sample_csv), str(simple_template), "--count", "3", "--dry-run"]) == 0
+    assert sent == []
+    out = capsys.readouterr().out
+    assert "[dry run]" in out and "message(s) in 3 send(s)" in out and "p95=" in out
+
+
+def test_lucky_sends_count_emails(sample_csv: Path, simple_template: Path, sent):
+    cli.main(["lucky", str(sample_csv), str(simple_template), "--count", "4", "--workers", "2",
+              "--to", "a@example.com", "--subject", "Hi"])
+    assert len(sent) == 4
+    assert all(call["recipients"] == [{"email": "a@example.com", "name": "a@example.com"}] for call in sent)
+    assert "Ada" in sent[0]["html"]
+
+
+def test_campaign_batches_recipients(people_csv: Path, simple_template: Path, sample_csv: Path, sent):
+    cli.main(["campaign", str(simple_template), "--recipients", str(people_csv), "--data", str(sample_csv),
+              "--batch-size", "2"])
+    assert [len(call["recipients"]) for call in sent] == [2, 2, 1]
+    assert len({call["html"] for call in sent}) == 1
+
+
+def test_campaign_sends_one_recipient_per_message_over_mailersend(people_csv: Path, simple_template: Path, sample_csv: Path,
+                                                                  sent, monkeypatch):
+    monkeypatch.setattr(cli.Config, "PROD_MODE", True)
+    monkeypatch.setattr(cli.Config, "MAILER", "mailersend")
+    assert cli.main(["campaign", str(simple_template), "--recipients", str(people_csv), "--data", str(sample_csv),
+                     "--batch-size", "2"]) == 0
+    assert [[r["email"] for r in call["recipients"]] for call in sent] == [[f"p{i}@example.com"] for i in range(5)]
+
+
+def test_merge_personalises_each_row(people_csv: Path, tmp_path: Path, sent):
+    template = tmp_path / "welcome.html"
+    template.write_text("<p>Hello {name}</p>", encoding="utf-8")
+    cli.main(["merge", str(people_csv), str(template), "--subject", "Welcome {name}", "--batch-size", "2", "--count", "3"])
+    assert [call["recipients"][0]["email"] for call in sent] == ["p0@example.com", "p1@example.com", "p2@example.com"]
+    assert sent[1]["subject"] == "Welcome P1"
+    assert sent[1]["html"] == "<p>Hello P1</p>"
+
+
+def test_attach_passes_files_to_every_send(people_csv: Path, simple_template: Path, sample_csv: Path, tmp_path: Path, monkeypatch):
+    report = tmp_path / "report.pdf"
+    report.write_bytes(b"%PDF")
+    calls = []
+    monkeypatch.setattr(cli, "send_email", lambda *args, attachments=None: calls.append(attachments) or {"status": "sent"})
+
+    cli.main(["campaign", str(simple_template), "--recipients", str(people_csv), "--data", str(sample_csv),
+              "--batch-size", "2", "--attach", str(report)])
+
+    assert len(calls) == 3 and calls[0] is calls[2]
+    assert [a.filename for a in calls[0]] == ["report.pdf"]
+    with pytest.raises(SystemExit, match="Attachment not found"):
+        cli.main(["campaign", str(simple_template), "--recipients", str(people_csv), "--data", str(sample_csv),
+                  "--attach", str(tmp_path / "nope.pdf")])
+
+
+def test_failed_sends_are_counted(sample_csv: Path, simple_template: Path, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(cli, "send_email", broken)
+    assert cli.main(["lucky", str(sample_csv), str(simple_template), "--count", "2"]) == 1
+
+
+def test_none_responses_are_counted_as_failures(sample_csv: Path, simple_template: Path, monkeypatch):
+    monkeypatch.setattr(cli, "send_email", lambda *args: None)
+    assert cli.main(["lucky", str(sample_csv), str(simple_template), "--count", "3"]) == 1
+
+
+def test_unknown_configured_transport_exits_before_sending(sample_csv: Path, simple_template: Path, sent, monkeypatch):
+    monkeypatch.setattr(cli.Config, "PROD_MODE", True)
+    monkeypatch.setattr(cli.Config, "MAILER", "nope")
+    with pytest.raises(SystemExit, match="nope"):
+        cli.main(["lucky", str(sample_csv), str(simple_template), "--count", "3"])
+    with pytest.raises(SystemExit, match="nope"):
+        cli.main(["lucky", str(sample_csv), str(simple_template), "--transport", "nope"])
+    assert sent == []
+
+
+def test_merge_reuses_the_render_cache(people_csv: Path, tmp_path: Path, sent, monkeypatch):
+    template = tmp_path / "welcome.html"
+    template.write_text("<p>Hello {name}</p>", encoding="utf-8")
+    caches = []
+    render = cli.build_html_content
+    monkeypatch.setattr(cli, "build_html_content", lambda *args, cache=None: caches.append(cache) or render(*args, cache=cache))
+    cli.main(["merge", str(people_csv), str(template), "--count", "3"])
+    assert len(caches) == 3 and caches[0] is not None and caches[0] is caches[2]
+
+
+def test_run_sends_summary():
+    summary = cli.run_sends(iter([lambda: 2, lambda: 3]), workers=2)
+    assert summary["sends"] == 2
+    assert summary["messages"] == 5
+    assert summary["failures"] == 0
+    assert summary["max"] >= summary["p50"] >= 0
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = cli.RateLimiter(rate=50)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.wait()
+    assert time.monotonic() - start >= 0.09
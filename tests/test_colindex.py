@@ -0,0 +1,108 @@
+from collections import Counter
+from pathlib import Path
+import os
+
+import pytest
+
+from email_me_anything import colindex
+from email_me_anything.colindex import ColumnIndex, ensure_index, index_path, matching_rows
+from email_me_anything.csvutils import select_random_row
+
+
+def _catalog(tmp_path: Path) -> Path:
+    p = tmp_path / "quotes.csv"
+    rows = ["name,category,language"]
+    rows += [f"n{i},{'poetry' if i % 3 == 0 else 'prose'},{'en' if i % 2 == 0 else 'fr'}" for i in range(60)]
+    p.write_text("\n".join(rows) + "\n", encoding="utf-8")
+    return p
+
+
+def test_filtered_pick_only_returns_matches(tmp_path: Path):
+    p = _catalog(tmp_path)
+    picks = [select_random_row(p, where={"category": "poetry"}) for _ in range(200)]
+
+    assert all(row["category"] == "poetry" for row in picks)
+    assert len({row["name"] for row in picks}) > 10
+    assert index_path(p).exists()
+
+
+def test_multiple_conditions_intersect(tmp_path: Path):
+    p = _catalog(tmp_path)
+    counts = Counter(select_random_row(p, where={"category": "poetry", "language": "fr"})["name"] for _ in range(300))
+    # i % 3 == 0 and odd -> 3, 9, 15, ..., 57
+    assert set(counts) == {f"n{i}" for i in range(3, 60, 6)}
+
+
+def test_no_match_and_bad_column(tmp_path: Path):
+    p = _catalog(tmp_path)
+    assert select_random_row(p, where={"category": "drama"}) is None
+    assert select_random_row(p, where={"nope": "x"}) is False
+    assert select_random_row(tmp_path / "missing.csv", where={"category": "x"}) is False
+
+
+def test_index_is_persisted_and_reused(tmp_path: Path, monkeypatch):
+    p = _catalog(tmp_path)
+    ensure_index(p, ["category"])
+    colindex._loaded.clear()
+    monkeypatch.setattr(colindex, "build_postings", lambda *a: (_ for _ in ()).throw(AssertionError("rebuilt")))
+
+    index, table = ensure_index(p, ["category"])
+    assert table is None
+    assert len(index.postings("category", "poetry")) == 20
+    assert list(matching_rows(index, {"category": "poetry"}))[:3] == [1, 4, 7]
+
+
+def test_index_rebuilt_when_source_changes(tmp_path: Path):
+    p = _catalog(tmp_path)
+    assert select_random_row(p, where={"category": "poetry"})["category"] == "poetry"
+
+    p.write_text("name,category\nz,drama\n", encoding="utf-8")
+    stat = p.stat()
+    os.utime(p, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert select_random_row(p, where={"category": "drama"}) == {"name": "z", "category": "drama"}
+    assert select_random_row(p, where={"category": "poetry"}) is None
+
+
+def test_headerless_columns(tmp_path: Path):
+    p = tmp_path / "plain.csv"
+    p.write_text("a,x\nb,y\nc,x\n", encoding="utf-8")
+    names = {select_random_row(p, skip_header=False, where={"col1": "x"})["col0"] for _ in range(50)}
+    assert names == {"a", "c"}
+    assert ColumnIndex.key("col1", False) in ColumnIndex.load(p, colindex._source(p)).columns
+
+
+def test_filtered_pick_follows_csv_cache_setting(tmp_path: Path, monkeypatch):
+    from email_me_anything import csvutils
+    from email_me_anything.csvcache import cache_path
+    p = _catalog(tmp_path)
+
+    monkeypatch.setattr(csvutils.Config, "CSV_CACHE", False)
+    assert colindex.random_matching_row(p, {"category": "poetry"})["category"] == "poetry"
+    assert not cache_path(p).exists()
+
+    monkeypatch.setattr(csvutils.Config, "CSV_CACHE", True)
+    index_path(p).unlink()
+    colindex._loaded.clear()
+    colindex.random_matching_row(p, {"category": "poetry"})
+    assert cache_path(p).exists()
+
+
+def test_picks_read_only_the_chosen_row(tmp_path: Path, monkeypatch):
+    from email_me_anything import csvutils
+    p = _catalog(tmp_path)
+    ensure_index(p, ["category", "language"])
+    colindex._loaded.clear()
+    monkeypatch.setattr(csvutils, "read_table", lambda *a, **k: pytest.fail("table read for a pick"))
+
+    picks = [colindex.random_matching_row(p, {"category": "poetry", "language": "fr"}) for _ in range(100)]
+
+    assert {row["name"] for row in picks} == {f"n{i}" for i in range(3, 60, 6)}
+    assert picks[0].keys() == {"name", "category", "language"}
+    assert len(colindex._loaded[os.path.abspath(p)].matches) == 1
+
+
+def test_duplicate_headers_resolve_like_row_views(tmp_path: Path):
+    p = tmp_path / "dups.csv"
+    p.write_text("a,b,a,c\n1,2,3,p\n4,5,6,q\n", encoding="utf-8")
+    assert select_random_row(p, where={"c": "p"}) == {"a": "3", "b": "2", "c": "p"}
+    assert select_random_row(p, where={"a": "6"}) == {"a": "6", "b": "5", "c": "q"}
@@ -0,0 +1,145 @@
+from pathlib import Path
+import gzip
+import os
+
+import pytest
+
+from email_me_anything import compressed
+from email_me_anything.compressed import build_index, index_path, load_index, read_row, write_seekable
+from email_me_anything.csvutils import read_csv, read_table, select_random_row
+
+
+def _rows(n: int):
+    return [["id", "quote"]] + [[str(i), f"quote number {i}"] for i in range(n)]
+
+
+def _plain_csv(tmp_path: Path, n: int = 500) -> Path:
+    p = tmp_path / "data.csv"
+    p.write_text("".join(",".join(row) + "\n" for row in _rows(n)), encoding="utf-8")
+    return p
+
+
+def test_read_csv_decompresses_gzip(tmp_path: Path):
+    p = tmp_path / "data.csv.gz"
+    p.write_bytes(gzip.compress(b'name,quote\nAda,"Hi, there"\n'))
+    assert read_csv(p, use_cache=False) == [["name", "quote"], ["Ada", "Hi, there"]]
+    assert read_table(p, use_cache=False).rows() == read_csv(p, use_cache=False)
+
+
+def test_index_has_checkpoint_per_member(tmp_path: Path):
+    target = write_seekable(_plain_csv(tmp_path), tmp_path / "data.csv.gz", frame_size=1024)
+    index = build_index(target)
+
+    assert index["rows"] == 501
+    assert index["header"] == ["id", "quote"]
+    assert len(index["checkpoints"]) > 5
+    assert index_path(target).exists()
+    assert [read_row(target, r, index) for r in (0, 1, 250, 500)] == [_rows(500)[r] for r in (0, 1, 250, 500)]
+
+
+def test_rows_spanning_members_are_read_whole(tmp_path: Path):
+    """Members cut mid-row still yield every row exactly once"""
+    data = "".join(",".join(row) + "\n" for row in _rows(200)).encode("utf-8")
+    p = tmp_path / "data.csv.gz"
+    p.write_bytes(b"".join(gzip.compress(data[i:i + 37]) for i in range(0, len(data), 37)))
+
+    index = build_index(p)
+    assert index["rows"] == 201
+    assert [read_row(p, r, index) for r in range(201)] == _rows(200)
+
+
+def test_select_random_row_uses_index(tmp_path: Path, monkeypatch):
+    target = write_seekable(_plain_csv(tmp_path), tmp_path / "data.csv.gz", frame_size=1024)
+    monkeypatch.setattr(compressed.random, "randint", lambda a, b: 321)
+
+    assert select_random_row(target, use_cache=False) == {"id": "320", "quote": "quote number 320"}
+    assert select_random_row(target, skip_header=False, use_cache=False) == {"col0": "320", "col1": "quote number 320"}
+
+
+def test_stale_index_is_rebuilt(tmp_path: Path):
+    p = tmp_path / "data.csv.gz"
+    p.write_bytes(gzip.compress(b"name\nAda\n"))
+    assert load_index(p)["rows"] == 2
+
+    p.write_bytes(gzip.compress(b"name\nAda\nBob\n"))
+    stat = p.stat()
+    os.utime(p, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert load_index(p)["rows"] == 3
+
+
+def test_header_only_and_empty_archives(tmp_path: Path):
+    header = tmp_path / "header.csv.gz"
+    header.write_bytes(gzip.compress(b"name,quote\n"))
+    empty = tmp_path / "empty.csv.gz"
+    empty.write_bytes(gzip.compress(b""))
+
+    assert select_random_row(header, use_cache=False) is None
+    assert select_random_row(empty, use_cache=False) is False
+    assert select_random_row(tmp_path / "missing.csv.gz", use_cache=False) is False
+
+
+def test_zstd_frames(tmp_path: Path):
+    pytest.importorskip("zstandard")
+    target = write_seekable(_plain_csv(tmp_path), tmp_path / "data.csv.zst", frame_size=1024)
+
+    assert read_csv(target, use_cache=False) == _rows(500)
+    index = build_index(target)
+    assert len(index["checkpoints"]) > 5
+    assert read_row(target, 499, index) == ["498", "quote number 498"]
+
+
+def test_single_member_gzip_gets_inflate_checkpoints(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(compressed, "CHECKPOINT_SPAN", 4096)
+    monkeypatch.setattr(compressed, "_FEED", 512)
+    monkeypatch.setattr(compressed, "_inflate_points", {})
+    rows = _rows(3000)
+    p = tmp_path / "data.csv.gz"
+    p.write_bytes(gzip.compress("".join(",".join(row) + "\n" for row in rows).encode("utf-8")))
+
+    index = build_index(p)
+    assert len(index["checkpoints"]) == 1
+    points = compressed._points_for(index, p)
+    assert len(points) > 10
+
+    starts = []
+    scan = compressed._scan
+    monkeypatch.setattr(compressed, "_scan", lambda file, kind, checkpoint, found: starts.append(checkpoint) or scan(file, kind, checkpoint, found))
+    for r in (0, 1, 1500, 2999, 3000):
+        assert read_row(p, r, index) == rows[r]
+    assert len(starts[2]) == 5 and 1500 - starts[2][2] < 300
+
+
+def test_picks_remember_inflate_checkpoints_in_a_new_process(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(compressed, "CHECKPOINT_SPAN", 4096)
+    monkeypatch.setattr(compressed, "_FEED", 512)
+    rows = _rows(3000)
+    p = tmp_path / "data.csv.gz"
+    p.write_bytes(gzip.compress("".join(",".join(row) + "\n" for row in rows).encode("utf-8")))
+    build_index(p)
+    monkeypatch.setattr(compressed, "_inflate_points", {})
+
+    index = load_index(p)
+    assert read_row(p, 2000, index) == rows[2000]
+    assert compressed._points_for(index, p)
+    assert read_row(p, 2500, index) == rows[2500]
+    assert [read_row(p, r, index) for r in range(1990, 2010)] == rows[1990:2010]
+
+
+def test_zero_padding_between_gzip_members(tmp_path: Path):
+    first, second = gzip.compress(b"id\n1\n"), gzip.compress(b"2\n3\n")
+    p = tmp_path / "data.csv.gz"
+    p.write_bytes(first + b"\0" * 100 + second + b"\0" * 50)
+
+    index = build_index(p)
+    assert [cp[0] for cp in index["checkpoints"]] == [0, len(first) + 100]
+    assert [read_row(p, r, index) for r in range(4)] == [["id"], ["1"], ["2"], ["3"]]
+
+
+def test_write_seekable_sizes_frames_in_bytes(tmp_path: Path):
+    source = tmp_path / "data.csv"
+    source.write_text("".join(f"{i},{'é' * 20}\n" for i in range(400)), encoding="utf-8")
+    target = write_seekable(source, tmp_path / "data.csv.gz", frame_size=1024)
+
+    starts = [cp[1] for cp in build_index(target)["checkpoints"]]
+    sizes = [b - a for a, b in zip(starts, starts[1:])]
+    assert sizes and all(1024 <= size < 1024 + 50 for size in sizes)
@@ -0,0 +1,125 @@
+from pathlib import Path
+import os
+
+import pytest
+
+from email_me_anything.csvcache import cache_path, load_table, store_table
+from email_me_anything.csvutils import read_csv, read_table, select_random_row
+from email_me_anything.table import CsvTable
+
+
+def _bump_mtime(p: Path):
+    stat = p.stat()
+    os.utime(p, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_read_table_writes_and_reuses_cache(tmp_path: Path):
+    p = tmp_path / "data.csv"
+    p.write_text("name,quote\nAda,Hello\nBob,\"Hi, there\"\n", encoding="utf-8")
+
+    parsed = read_table(p, use_cache=True)
+    assert cache_path(p).exists()
+
+    cached = load_table(p)
+    assert cached is not None
+    assert cached.rows() == parsed.rows() == read_csv(p, use_cache=False)
+    assert isinstance(cached.buffers()[0][0], memoryview)
+
+
+def test_cache_is_ignored_when_source_changes(tmp_path: Path):
+    p = tmp_path / "data.csv"
+    p.write_text("name\nAda\n", encoding="utf-8")
+    read_table(p, use_cache=True)
+
+    p.write_text("name\nAda\nBob\n", encoding="utf-8")
+    assert load_table(p) is None
+    assert read_csv(p, use_cache=True) == [["name"], ["Ada"], ["Bob"]]
+    assert load_table(p).rows() == [["name"], ["Ada"], ["Bob"]]
+
+
+def test_touched_source_with_same_content_keeps_cache(tmp_path: Path):
+    p = tmp_path / "data.csv"
+    p.write_text("name\nAda\n", encoding="utf-8")
+    read_table(p, use_cache=True)
+
+    _bump_mtime(p)
+    assert load_table(p).rows() == [["name"], ["Ada"]]
+
+
+def test_touched_source_is_hashed_only_once(tmp_path: Path, monkeypatch):
+    from email_me_anything import csvcache
+    p = tmp_path / "data.csv"
+    p.write_text("name\nAda\n", encoding="utf-8")
+    read_table(p, use_cache=True)
+    _bump_mtime(p)
+    hashes = []
+    real_digest = csvcache.file_digest
+    monkeypatch.setattr(csvcache, "file_digest", lambda path: hashes.append(path) or real_digest(path))
+
+    assert load_table(p).rows() == [["name"], ["Ada"]]
+    assert load_table(p).rows() == [["name"], ["Ada"]]
+    assert len(hashes) == 1
+
+
+def test_same_size_rewrite_invalidates_cache(tmp_path: Path):
+    p = tmp_path / "data.csv"
+    p.write_text("name\nAda\n", encoding="utf-8")
+    read_table(p, use_cache=True)
+
+    p.write_text("name\nBob\n", encoding="utf-8")
+    _bump_mtime(p)
+    assert load_table(p) is None
+
+
+def test_corrupt_cache_falls_back_to_parsing(tmp_path: Path):
+    p = tmp_path / "data.csv"
+    p.write_text("name\nAda\n", encoding="utf-8")
+    cache_path(p).write_bytes(b"not a cache")
+
+    assert select_random_row(p, use_cache=True) == {"name": "Ada"}
+    assert load_table(p) is not None
+
+
+def test_cache_handles_ragged_and_empty_rows(tmp_path: Path):
+    p = tmp_path / "data.csv"
+    p.write_text("a,b,c\n1,2\n\n3,4,5,6\n", encoding="utf-8")
+    read_table(p, use_cache=True)
+
+    cached = load_table(p)
+    assert cached.rows() == [["a", "b", "c"], ["1", "2"], [], ["3", "4", "5", "6"]]
+    assert dict(cached.record(1)) == {"a": "1", "b": "2", "c": ""}
+
+
+def test_store_table_unwritable_location_returns_false(tmp_path: Path):
+    table = CsvTable.from_rows([["name"], ["Ada"]])
+    assert store_table(tmp_path / "nope" / "data.csv", table) is False
+
+
+def test_cache_disabled_by_default(sample_csv: Path):
+    select_random_row(sample_csv)
+    assert not cache_path(sample_csv).exists()
+
+
+def test_cache_hashes_the_bytes_it_parsed(tmp_path: Path, monkeypatch):
+    import gzip
+    import hashlib
+    from email_me_anything import csvcache
+    monkeypatch.setattr(csvcache, "file_digest", lambda path: pytest.fail("file read twice"))
+    for p in (tmp_path / "data.csv", tmp_path / "data.csv.gz"):
+        content = b"name\n" + b"".join(b"row%d\n" % i for i in range(20000))
+        p.write_bytes(gzip.compress(content) if p.suffix == ".gz" else content)
+        assert len(read_table(p, use_cache=True)) == 20001
+        meta = cache_path(p).read_bytes()
+        assert hashlib.sha256(p.read_bytes()).hexdigest().encode() in meta
+
+
+def test_store_table_refuses_a_source_changed_since_stat(tmp_path: Path):
+    p = tmp_path / "data.csv"
+    p.write_text("name\nAda\n", encoding="utf-8")
+    stat = p.stat()
+    table = read_table(p, use_cache=False)
+    p.write_text("name\nBob\n", encoding="utf-8")
+    _bump_mtime(p)
+
+    assert store_table(p, table, stat) is False
+    assert not cache_path(p).exists()
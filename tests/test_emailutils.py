@@ -1,4 +1,6 @@
 from pathlib import Path
+import email
+import email.policy
 import importlib
 
 import pytest
@@ -295,3 +297,119 @@ def test_build_html_content_with_html_special_chars(tmp_path: Path):
     html = build_html_content(t, data)
     # format_map doesn't escape HTML - it's inserted as-is
     assert "<script>alert('XSS')</script>" in html
+
+
+def _smtp_mode(monkeypatch, max_recipients=100):
+    from email_me_anything.emailutils import Config, SMTPSettings
+    monkeypatch.setattr(Config, "PROD_MODE", True)
+    monkeypatch.setattr(Config, "MAILER", "smtp")
+    monkeypatch.setattr(SMTPSettings, "MAX_RECIPIENTS", max_recipients)
+
+
+def test_send_email_smtp_single_recipient_in_to_header(fake_smtp, monkeypatch):
+    from email_me_anything.emailutils import send_email
+    _smtp_mode(monkeypatch)
+
+    resp = send_email({"email": "from@example.com", "name": "From"}, [{"email": "to@example.com", "name": "To"}], "Hi", "<p>Hi</p>")
+
+    assert resp["status"] == "success"
+    (transaction,) = fake_smtp[0].transactions
+    assert transaction["to"] == ["to@example.com"]
+    assert email.message_from_bytes(transaction["data"])["To"] == "To <to@example.com>"
+
+
+def test_send_email_smtp_batches_all_recipients_privately(fake_smtp, monkeypatch):
+    """Every recipient is delivered, in RCPT TO chunks, without appearing in headers"""
+    from email_me_anything.emailutils import send_email
+    _smtp_mode(monkeypatch, max_recipients=2)
+    recipients = [{"email": f"to{i}@example.com", "name": f"To{i}"} for i in range(5)]
+
+    send_email({"email": "from@example.com", "name": "From"}, recipients, "Hi", "<p>Hi</p>")
+
+    (connection,) = fake_smtp
+    assert [t["to"] for t in connection.transactions] == [
+        ["to0@example.com", "to1@example.com"],
+        ["to2@example.com", "to3@example.com"],
+        ["to4@example.com"],
+    ]
+    assert b"to1@example.com" not in connection.transactions[0]["data"]
+    assert "undisclosed-recipients" in email.message_from_bytes(connection.transactions[0]["data"])["To"]
+
+
+def test_send_email_smtp_honours_server_rcptmax(fake_smtp, monkeypatch):
+    from email_me_anything.emailutils import send_email
+    import smtplib
+    _smtp_mode(monkeypatch, max_recipients=100)
+    monkeypatch.setattr(smtplib.SMTP_SSL, "esmtp_features", {"limits": "MAILMAX=10 RCPTMAX=3"})
+    recipients = [{"email": f"to{i}@example.com", "name": ""} for i in range(7)]
+
+    send_email({"email": "from@example.com", "name": "From"}, recipients, "Hi", "<p>Hi</p>")
+
+    assert [len(t["to"]) for t in fake_smtp[0].transactions] == [3, 3, 1]
+
+
+def test_send_bulk_groups_identical_content(fake_smtp, monkeypatch):
+    from email_me_anything.emailutils import send_bulk
+    _smtp_mode(monkeypatch)
+    a, b, c = ({"email": f"{n}@example.com", "name": n} for n in "abc")
+
+    responses = send_bulk({"email": "from@example.com", "name": "From"}, "News", [(a, "<p>1</p>"), (b, "<p>2</p>"), (c, "<p>1</p>")])
+
+    assert len(responses) == 2
+    assert sorted(t["to"] for conn in fake_smtp for t in conn.transactions) == [
+        ["a@example.com", "c@example.com"],
+        ["b@example.com"],
+    ]
+
+
+def test_send_bulk_non_smtp_sends_individually(monkeypatch):
+    from email_me_anything import emailutils
+    monkeypatch.setattr(emailutils.Config, "PROD_MODE", True)
+    monkeypatch.setattr(emailutils.Config, "MAILER", "mailersend")
+    calls = []
+    monkeypatch.setattr(emailutils, "send_email", lambda sender, recipients, subject, html: calls.append(recipients) or {})
+    a, b = ({"email": f"{n}@example.com", "name": n} for n in "ab")
+
+    emailutils.send_bulk({"email": "from@example.com", "name": "From"}, "News", [(a, "x"), (b, "x")])
+
+    assert calls == [[a], [b]]
+
+
+def test_send_bulk_personalize_reuses_body_with_own_headers(fake_smtp, monkeypatch):
+    from email_me_anything.emailutils import send_bulk
+    _smtp_mode(monkeypatch)
+    a, b = ({"email": f"{n}@example.com", "name": n.upper()} for n in "ab")
+
+    send_bulk({"email": "from@example.com", "name": "From"}, "News", [(a, "<p>1</p>"), (b, "<p>1</p>")], personalize=True)
+
+    (connection,) = fake_smtp
+    messages = [email.message_from_bytes(t["data"], policy=email.policy.default) for t in connection.transactions]
+    assert [t["to"] for t in connection.transactions] == [["a@example.com"], ["b@example.com"]]
+    assert [m["To"] for m in messages] == ["A <a@example.com>", "B <b@example.com>"]
+    assert messages[0]["Message-ID"] != messages[1]["Message-ID"]
+    assert messages[0].get_body(("html",)).get_content().strip() == "<p>1</p>"
+
+
+@pytest.mark.parametrize("variable_map", [None, {"who": "name", "where": "city", "nothing": "missing"}, {}])
+@pytest.mark.parametrize("skip_header", [True, False])
+def test_build_contexts_matches_per_row_build_context(variable_map, skip_header):
+    from email_me_anything.emailutils import build_context, build_contexts, iter_contexts
+    from email_me_anything.table import CsvTable
+
+    rows = [["name", "age", "city"], ["Alice", "25", "NYC"], ["Bob", "30"], [], ["Zoë", "41", "Köln", "extra"]]
+    table = CsvTable.from_rows(rows)
+    if not skip_header and variable_map:
+        variable_map = {"who": "col0", "where": "col2", "nothing": "col9"}
+    expected = [build_context(dict(record), variable_map) for record in table.records(skip_header)]
+
+    assert build_contexts(table, variable_map, skip_header=skip_header) == expected
+    assert build_contexts(rows, variable_map, skip_header=skip_header) == expected
+    assert list(iter_contexts(table, variable_map, skip_header=skip_header, block_size=2)) == expected
+
+
+def test_build_contexts_row_range():
+    from email_me_anything.emailutils import build_contexts
+
+    rows = [["n"]] + [[str(i)] for i in range(10)]
+    assert build_contexts(rows, {"x": "n"}, start=3, stop=5) == [{"x": "2"}, {"x": "3"}]
+    assert build_contexts(rows, {"x": "n"}, start=9, stop=50) == [{"x": "8"}, {"x": "9"}]
@@ -0,0 +1,82 @@
+from pathlib import Path
+import importlib
+
+from email_me_anything.htmlopt import HtmlOptimizer, collapse_inline_css, html_to_text, minify_html
+
+
+def test_minify_removes_comments_and_whitespace():
+    html = "<html>\n  <body>\n    <!-- header -->\n    <h1>  Daily   Quote </h1>\n    <p>Hi <b>there</b> <i>you</i></p>\n  </body>\n</html>\n"
+    assert minify_html(html) == "<html><body><h1>Daily Quote</h1><p>Hi <b>there</b> <i>you</i></p></body></html>"
+
+
+def test_minify_keeps_conditional_comments_and_preformatted_blocks():
+    html = "<div>\n<!--[if mso]><table><![endif]-->\n<pre>  keep\n   this </pre>\n</div>"
+    result = minify_html(html)
+    assert "<!--[if mso]>" in result
+    assert "<pre>  keep\n   this </pre>" in result
+
+
+def test_collapse_inline_css_drops_identical_declarations():
+    html = '<p style="color: red ; margin:0;color : red;">x</p><td style=" ">y</td>'
+    assert collapse_inline_css(html) == '<p style="margin:0;color:red">x</p><td>y</td>'
+
+
+def test_collapse_inline_css_keeps_fallback_values():
+    html = '<td style="background: #fff; background: linear-gradient(#fff, #eee)">x</td>'
+    assert collapse_inline_css(html) == '<td style="background:#fff;background:linear-gradient(#fff, #eee)">x</td>'
+
+
+def test_collapse_inline_css_only_rewrites_tags():
+    html = '<p>Write style="a: 1; a: 1" in text</p><pre style="margin: 0">x style="b: 2; b: 2"</pre>'
+    assert collapse_inline_css(html) == '<p>Write style="a: 1; a: 1" in text</p><pre style="margin:0">x style="b: 2; b: 2"</pre>'
+
+
+def test_collapse_inline_css_respects_important_and_data_urls():
+    assert collapse_inline_css('<p style="color:red !important;color:blue">x</p>') == '<p style="color:red !important;color:blue">x</p>'
+    data_url = '<div style="background:url(data:image/png;base64,AAAA); color: red">x</div>'
+    assert collapse_inline_css(data_url) == data_url
+
+
+def test_html_to_text():
+    html = "<html><head><title>T</title><style>p{}</style></head><body><h1>Quote</h1><p>Be&nbsp;kind &amp; <a href='https://example.com'>read</a></p><ul><li>one</li><li>two</li></ul></body></html>"
+    assert html_to_text(html) == "Quote\n\nBe kind & read (https://example.com)\n\n- one\n- two"
+
+
+def test_optimizer_caches_and_reports_savings():
+    optimizer = HtmlOptimizer()
+    html = "<div>\n    <p style='color: red; color: red'>Hello</p>\n</div>\n" * 3
+
+    first = optimizer.optimize(html)
+    second = optimizer.optimize(html)
+
+    assert first is second
+    assert first.bytes_saved > 0
+    assert first.text.startswith("Hello")
+    assert optimizer.stats()["bytes_saved"] == 2 * first.bytes_saved
+    assert optimizer.stats()["entries"] == 1
+
+
+def test_optimizer_without_text():
+    assert HtmlOptimizer(plain_text=False).optimize("<p>x</p>").text is None
+
+
+def test_send_lucky_email_with_optimizer(sample_csv: Path, simple_template: Path, monkeypatch, fake_mailersend):
+    lucky = importlib.import_module("email_me_anything.luckyemail")
+    calls = {}
+
+    def fake_send_email(sender, recipients, subject, html, text_content=None):
+        calls.update(html=html, text=text_content)
+        return {"status": "sent"}
+
+    monkeypatch.setattr(lucky, "send_email", fake_send_email)
+    optimizer = HtmlOptimizer()
+    assert lucky.send_lucky_email(sample_csv, simple_template, recipients=[{"email": "to@example.com", "name": "To"}], optimizer=optimizer)
+    assert calls["text"] == "Imagination is intelligence with an erection\nAda"
+    assert optimizer.stats()["bytes_in"] > 0
+
+
+def test_collapse_inline_css_keeps_escaped_quotes_intact():
+    html = '<p style="font-family: &quot;Open Sans&quot;, Arial; color: red; color: blue">x</p>'
+    assert collapse_inline_css(html) == '<p style="font-family:&quot;Open Sans&quot;, Arial;color:red;color:blue">x</p>'
+    single = "<p style='content: \"a;b\"; color: red'>x</p>"
+    assert collapse_inline_css(single) == "<p style='content:&quot;a;b&quot;;color:red'>x</p>"
@@ -0,0 +1,103 @@
+from pathlib import Path
+import email
+import os
+from email import policy
+
+import pytest
+
+from email_me_anything import attachments, inline
+from email_me_anything.emailutils import build_html_content
+from email_me_anything.inline import embed_images, image_for, images_in
+from email_me_anything.mimeskeleton import MimeSkeleton
+
+SENDER = {"email": "from@example.com", "name": "From"}
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+
+
+@pytest.fixture
+def assets(tmp_path: Path) -> Path:
+    (tmp_path / "img").mkdir()
+    (tmp_path / "img" / "logo.png").write_bytes(PNG)
+    (tmp_path / "copy.png").write_bytes(PNG)
+    (tmp_path / "chart.gif").write_bytes(b"GIF89a" + os.urandom(500))
+    return tmp_path
+
+
+def test_local_images_become_deduplicated_cids(assets: Path):
+    html = ('<img src="img/logo.png"><IMG alt=x SRC=\'copy.png\'><img src="chart.gif?v=2">'
+            '<td background="img/logo.png"></td><img src="https://cdn.example.com/a.png">'
+            '<img src="data:image/png;base64,AA=="><img src="missing.png">')
+
+    out = embed_images(html, assets)
+
+    logo = image_for(assets / "img" / "logo.png")
+    chart = image_for(assets / "chart.gif")
+    assert out.count(f"cid:{logo.content_id}") == 3
+    assert f'src="cid:{chart.content_id}"' in out
+    assert 'src="https://cdn.example.com/a.png"' in out and 'src="missing.png"' in out and "data:image" in out
+    assert images_in(out) == (logo, chart)
+    assert logo.disposition == "inline" and logo.content_type == "image/png"
+
+
+def test_digest_is_computed_once_per_file_version(assets: Path, monkeypatch):
+    logo = assets / "img" / "logo.png"
+    first = image_for(logo)
+    monkeypatch.setattr(inline.hashlib, "sha256", lambda *a: pytest.fail("re-hashed an unchanged file"))
+    assert image_for(logo) is first
+
+    monkeypatch.undo()
+    logo.write_bytes(PNG[::-1])
+    stat = logo.stat()
+    os.utime(logo, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert image_for(logo).content_id != first.content_id
+
+
+def test_only_images_under_the_base_directory_are_embedded(assets: Path):
+    template_dir = assets / "img"
+    (assets / "secret.png").write_bytes(PNG)
+    (template_dir / "notes.txt").write_text("private", encoding="utf-8")
+    html = (f'<img src="{assets / "copy.png"}"><img src="../secret.png"><img src="notes.txt">'
+            '<img src="logo.png">')
+
+    out = embed_images(html, template_dir)
+
+    assert f'src="{assets / "copy.png"}"' in out and 'src="../secret.png"' in out and 'src="notes.txt"' in out
+    assert images_in(out) == (image_for(template_dir / "logo.png"),)
+
+
+def test_skeleton_places_images_in_related_part(assets: Path):
+    html = embed_images('<p><img src="img/logo.png"><img src="copy.png"></p>', assets)
+    report = assets / "report.txt"
+    report.write_text("numbers", encoding="utf-8")
+    skeleton = MimeSkeleton(SENDER, "Logo", html, attachments=images_in(html) + (attachments.Attachment(report),))
+
+    msg = email.message_from_bytes(b"".join(skeleton.chunks()), policy=policy.default)
+    assert msg.get_content_type() == "multipart/mixed"
+    related = msg.get_body(("related",))
+    (image,) = [part for part in related.iter_parts() if part.get_content_maintype() == "image"]
+    assert image["Content-ID"] == f"<{images_in(html)[0].content_id}>"
+    assert image.get_content() == PNG
+    assert [a.get_filename() for a in msg.iter_attachments()] == ["report.txt"]
+
+
+def test_send_email_embeds_images_from_build_html_content(assets: Path, fake_smtp, monkeypatch):
+    from email_me_anything.emailutils import Config, send_bulk, send_email
+    monkeypatch.setattr(Config, "PROD_MODE", True)
+    monkeypatch.setattr(Config, "MAILER", "smtp")
+    template = assets / "mail.html"
+    template.write_text('<img src="img/logo.png"><p>{name}</p><img src="copy.png">', encoding="utf-8")
+    attachments.clear_cache()
+    encodes = []
+    real_encode = attachments._encode
+    monkeypatch.setattr(attachments, "_encode", lambda *a: encodes.append(a) or real_encode(*a))
+
+    html = build_html_content(template, {"name": "Ada"}, inline_images=True)
+    send_email(SENDER, [{"email": "a@example.com", "name": "A"}], "Hi", html)
+    send_bulk(SENDER, "Hi", [({"email": "b@example.com", "name": "B"}, build_html_content(template, {"name": "Bob"}, inline_images=True))])
+
+    assert len(encodes) == 1
+    for transaction in fake_smtp[0].transactions + fake_smtp[1].transactions:
+        msg = email.message_from_bytes(transaction["data"], policy=policy.default)
+        images = [p for p in msg.walk() if p.get_content_maintype() == "image"]
+        assert len(images) == 1 and images[0].get_content() == PNG
+        assert images[0]["Content-ID"].strip("<>") in msg.get_body(("html",)).get_content()
@@ -0,0 +1,135 @@
+from pathlib import Path
+import os
+import time
+
+import pytest
+
+from email_me_anything import cli, journal as journal_module
+from email_me_anything.journal import SendJournal, idempotency_key
+
+
+@pytest.fixture
+def production(monkeypatch):
+    monkeypatch.setattr(journal_module.transports.Config, "PROD_MODE", True)
+    monkeypatch.setattr(journal_module.transports.Config, "MAILER", "smtp")
+
+
+def test_send_skips_recorded_keys_across_reopen(tmp_path: Path, production):
+    path = tmp_path / "run.journal"
+    sent = []
+    with SendJournal(path) as journal:
+        for n in range(5):
+            journal.send(idempotency_key("run", n), lambda n: sent.append(n) or "ok", n)
+    assert sent == [0, 1, 2, 3, 4]
+
+    with SendJournal(path) as journal:
+        assert len(journal) == 5
+        responses = [journal.send(idempotency_key("run", n), lambda n: sent.append(n) or "ok", n) for n in range(7)]
+        assert responses == [None] * 5 + ["ok", "ok"]
+        assert (journal.skipped, journal.recorded) == (5, 2)
+    assert sent[5:] == [5, 6]
+
+
+def test_failed_send_is_not_recorded(tmp_path: Path, production):
+    with SendJournal(tmp_path / "j") as journal:
+        with pytest.raises(RuntimeError):
+            journal.send("k", lambda: (_ for _ in ()).throw(RuntimeError("smtp down")))
+        assert "k" not in journal
+        assert journal.send("k", lambda: "ok") == "ok"
+
+
+def test_undelivered_sends_are_not_recorded(tmp_path: Path, production, monkeypatch):
+    with SendJournal(tmp_path / "j") as journal:
+        journal.send("none", lambda: None)
+        journal.send("null", lambda **kwargs: {"status": "null"}, transport="null")
+        monkeypatch.setattr(journal_module.transports.Config, "PROD_MODE", False)
+        journal.send("debug", lambda: {"status": "debug"})
+        assert len(journal) == 0 and journal.recorded == 0
+
+
+def test_quiet_journal_is_checkpointed_within_the_interval(tmp_path: Path, monkeypatch):
+    syncs = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(journal_module.os, "fsync", lambda fd: syncs.append(fd) or real_fsync(fd))
+    journal = SendJournal(tmp_path / "j", checkpoint_interval=0.05)
+    journal.record("only")
+    deadline = time.monotonic() + 5
+    while not syncs and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert syncs and (tmp_path / "j").read_text() == "only\n"
+    journal.close()
+
+
+def test_checkpoints_fsync_periodically_not_per_record(tmp_path: Path, monkeypatch):
+    syncs = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(journal_module.os, "fsync", lambda fd: syncs.append(fd) or real_fsync(fd))
+    journal = SendJournal(tmp_path / "j", checkpoint_every=10, checkpoint_interval=3600)
+    for n in range(25):
+        journal.record(str(n))
+    assert len(syncs) == 2
+    assert (tmp_path / "j").read_text().split() == [str(n) for n in range(20)]
+    journal.close()
+    assert len(syncs) == 3 and len((tmp_path / "j").read_text().split()) == 25
+
+
+def test_torn_last_record_is_dropped(tmp_path: Path):
+    path = tmp_path / "j"
+    path.write_text("aaa\nbbb\nccc", encoding="utf-8")
+    with SendJournal(path) as journal:
+        assert "bbb" in journal and "ccc" not in journal
+        journal.record("ddd")
+    assert path.read_text(encoding="utf-8") == "aaa\nbbb\nddd\n"
+
+
+def test_send_lucky_email_skips_delivered_key(sample_csv: Path, simple_template: Path, tmp_path: Path, monkeypatch):
+    from email_me_anything import luckyemail
+    monkeypatch.setattr(luckyemail.Config, "PROD_MODE", True)
+    calls = []
+    monkeypatch.setattr(luckyemail, "send_email", lambda *args: calls.append(args) or {"status": "success"})
+
+    with SendJournal(tmp_path / "daily.journal") as journal:
+        for _ in range(3):
+            assert luckyemail.send_lucky_email(sample_csv, simple_template, journal=journal, idempotency_key="2024-05-01")
+    assert len(calls) == 1
+
+
+def test_cli_resumes_merge_after_crash(tmp_path: Path, monkeypatch, capsys):
+    people = tmp_path / "people.csv"
+    people.write_text("email,name\n" + "".join(f"p{i}@example.com,P{i}\n" for i in range(6)), encoding="utf-8")
+    template = tmp_path / "t.html"
+    template.write_text("<p>{name}</p>", encoding="utf-8")
+    monkeypatch.setattr(cli.Config, "PROD_MODE", True)
+    delivered = []
+
+    def flaky(sender, recipients, subject, html):
+        if recipients[0]["email"] == "p3@example.com" and "p3@example.com" not in crashed:
+            crashed.append("p3@example.com")
+            raise ConnectionError("connection reset")
+        delivered.append(recipients[0]["email"])
+        return {"status": "sent"}
+
+    crashed = []
+    monkeypatch.setattr(cli, "send_email", flaky)
+    argv = ["merge", str(people), str(template), "--journal", str(tmp_path / "merge.journal")]
+    assert cli.main(argv) == 1
+    assert cli.main(argv) == 0
+
+    assert delivered == [f"p{i}@example.com" for i in (0, 1, 2, 4, 5, 3)]
+    assert "5 already delivered, 1 recorded" in capsys.readouterr().out
+
+
+def test_cli_campaign_skips_delivered_recipients(tmp_path: Path, simple_template: Path, sample_csv: Path, monkeypatch):
+    people = tmp_path / "people.csv"
+    people.write_text("email,name\n" + "".join(f"p{i}@example.com,P{i}\n" for i in range(5)), encoding="utf-8")
+    monkeypatch.setattr(cli.Config, "PROD_MODE", True)
+    monkeypatch.setattr(cli.Config, "MAILER", "smtp")
+    batches = []
+    monkeypatch.setattr(cli, "send_email", lambda sender, recipients, subject, html: batches.append([r["email"] for r in recipients]) or {"status": "sent"})
+    argv = ["campaign", str(simple_template), "--recipients", str(people), "--data", str(sample_csv),
+            "--batch-size", "2", "--journal", str(tmp_path / "c.journal")]
+
+    cli.main(argv + ["--count", "3"])
+    cli.main(argv)
+
+    assert batches == [["p0@example.com", "p1@example.com"], ["p2@example.com"], ["p3@example.com", "p4@example.com"]]
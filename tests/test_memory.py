@@ -0,0 +1,30 @@
+from pathlib import Path
+import importlib.util
+import json
+
+import pytest
+
+BENCHMARK = Path(__file__).resolve().parents[1] / "benchmarks" / "bench_memory.py"
+
+
+def load_benchmark():
+    spec = importlib.util.spec_from_file_location("bench_memory", BENCHMARK)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_check_allows_tolerance_and_flags_regressions():
+    bench = load_benchmark()
+    budget = {"rss": 100.0, "traced": 40.0}
+    assert bench.check({"rss": 118.0, "traced": 46.0}, budget, 0.15) == []
+    problems = bench.check({"rss": 130.0, "traced": 47.0}, budget, 0.15)
+    assert [problem.split()[0] for problem in problems] == ["rss", "traced"]
+
+
+@pytest.mark.benchmark
+def test_small_csv_cases_stay_within_recorded_budgets(capsys):
+    bench = load_benchmark()
+    assert all(f"{function}/10000" in json.loads(bench.BUDGETS.read_text()) for function in bench.FUNCTIONS)
+    status = bench.main(["--rows", "10000"])
+    assert status == 0, capsys.readouterr().out
@@ -0,0 +1,44 @@
+import email
+from email import policy
+
+from email_me_anything.mimeskeleton import MimeSkeleton, skeleton_for, PLAIN_TEXT_FALLBACK
+
+
+SENDER = {"email": "from@example.com", "name": "From Person"}
+
+
+def test_render_produces_complete_message():
+    skeleton = MimeSkeleton(SENDER, "Hello", "<p>Hi 👋</p>")
+    msg = email.message_from_bytes(skeleton.render({"email": "to@example.com", "name": "Tö"}), policy=policy.default)
+
+    assert msg["Subject"] == "Hello"
+    assert msg["From"] == "From Person <from@example.com>"
+    assert msg["To"] == "Tö <to@example.com>"
+    assert msg["Message-ID"].endswith("@example.com>")
+    assert msg["Date"]
+    assert msg.get_body(("html",)).get_content().strip() == "<p>Hi 👋</p>"
+    assert msg.get_body(("plain",)).get_content().strip() == PLAIN_TEXT_FALLBACK
+
+
+def test_render_uses_crlf_and_shares_body():
+    skeleton = MimeSkeleton(SENDER, "Hello", "<p>Hi</p>")
+    first = skeleton.render({"email": "a@example.com"})
+    second = skeleton.render({"email": "b@example.com"})
+
+    assert b"\r\n" in first and b"\n" not in first.replace(b"\r\n", b"")
+    assert first.endswith(skeleton.body) and second.endswith(skeleton.body)
+
+
+def test_render_without_recipient_hides_addresses():
+    msg = email.message_from_bytes(MimeSkeleton(SENDER, "Hello", "<p>Hi</p>").render())
+    assert msg["To"] == "undisclosed-recipients:;"
+
+
+def test_text_content_replaces_fallback():
+    msg = email.message_from_bytes(MimeSkeleton(SENDER, "s", "<p>Hi</p>", "Hi").render(), policy=policy.default)
+    assert msg.get_body(("plain",)).get_content().strip() == "Hi"
+
+
+def test_skeleton_for_is_cached():
+    assert skeleton_for(SENDER, "s", "<p>x</p>") is skeleton_for(dict(SENDER), "s", "<p>x</p>")
+    assert skeleton_for(SENDER, "s", "<p>x</p>") is not skeleton_for(SENDER, "s", "<p>y</p>")
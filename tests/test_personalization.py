@@ -0,0 +1,84 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import threading
+
+import pytest
+
+from email_me_anything import personalization
+from email_me_anything.personalization import send_personalized
+
+SENDER = {"email": "news@example.com", "name": "News"}
+
+
+@pytest.fixture
+def mailersend_stand_in():
+    """A local HTTP server answering MailerSend's bulk email endpoint; yields (base_url, requests)."""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            received.append({"path": self.path, "auth": self.headers["Authorization"], "body": json.loads(body),
+                             "bytes": len(body)})
+            reply = json.dumps({"message": "The bulk email is being processed.", "bulk_email_id": f"bulk-{len(received)}"}).encode()
+            self.send_response(202)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v1/", received
+    server.shutdown()
+    server.server_close()
+
+
+def people(count):
+    return [({"email": f"p{i}@example.com", "name": f"P{i}"}, {"first": f"P{i}", "plan": "pro", "internal": "x"})
+            for i in range(count)]
+
+
+def test_batches_personalization_per_request(mailersend_stand_in, monkeypatch):
+    base_url, received = mailersend_stand_in
+    monkeypatch.setattr(personalization.Config, "PROD_MODE", True)
+
+    responses = send_personalized(SENDER, "Hi {{ name }}", "tmpl-1", iter(people(5)), variable_map={"name": "first", "plan": "plan"},
+                                  batch_size=2, api_key="test-key", base_url=base_url)
+
+    assert [r["data"]["bulk_email_id"] for r in responses] == ["bulk-1", "bulk-2", "bulk-3"]
+    assert [len(r["body"]) for r in received] == [2, 2, 1]
+    assert all(r["path"] == "/v1/bulk-email" and r["auth"] == "Bearer test-key" for r in received)
+    first = received[0]["body"][0]
+    assert first == {
+        "from": SENDER, "to": [{"email": "p0@example.com", "name": "P0"}], "subject": "Hi {{ name }}", "template_id": "tmpl-1",
+        "personalization": [{"email": "p0@example.com", "data": {"name": "P0", "plan": "pro"}}],
+    }
+    assert "html" not in first
+
+
+def test_payload_is_much_smaller_than_rendered_html(mailersend_stand_in, monkeypatch):
+    base_url, received = mailersend_stand_in
+    monkeypatch.setattr(personalization.Config, "PROD_MODE", True)
+    rendered_html_bytes = 20_000  # a typical newsletter body, uploaded per message by send_email
+
+    send_personalized(SENDER, "Digest", "tmpl-1", people(500), api_key="k", base_url=base_url)
+
+    (request,) = received
+    assert request["bytes"] / 500 < rendered_html_bytes / 50
+
+
+def test_non_production_mode_sends_nothing(monkeypatch):
+    monkeypatch.setattr(personalization.Config, "PROD_MODE", False)
+    monkeypatch.setattr(personalization, "MailerSendClient", lambda **kwargs: pytest.fail("client created"))
+    responses = send_personalized(SENDER, "Hi", "tmpl-1", people(3), batch_size=2)
+    assert [r["status"] for r in responses] == ["debug", "debug"]
+
+
+def test_batch_size_is_limited_by_the_api():
+    with pytest.raises(ValueError):
+        send_personalized(SENDER, "Hi", "tmpl-1", people(1), batch_size=501)
@@ -0,0 +1,83 @@
+from pathlib import Path
+import pstats
+import time
+
+import pytest
+
+from email_me_anything import cli, luckyemail, profiling
+from email_me_anything.profiling import configured_modes, session
+
+
+def select_random_row(seconds):
+    # Named like the pipeline stage so the sampler attributes it.
+    time.sleep(seconds)
+    return {"name": "Ada"}
+
+
+def test_configured_modes():
+    assert configured_modes("") == []
+    assert configured_modes("sample, CPROFILE,bogus") == ["cprofile", "sample"]
+    assert configured_modes("all") == ["cprofile", "memory", "sample"]
+
+
+def test_session_writes_every_profile(tmp_path: Path):
+    with session("unit", modes=["cprofile", "memory", "sample"], directory=tmp_path, interval=0.002) as written:
+        select_random_row(0.1)
+        blob = [bytearray(1024) for _ in range(200)]
+
+    assert set(written) == {"cprofile", "memory", "sample"}
+    stats = pstats.Stats(str(written["cprofile"]))
+    assert any(name == "select_random_row" for _, _, name in stats.stats)
+    assert "top allocation sites" in written["memory"].read_text()
+    report = written["sample"].read_text()
+    samples = int(report.split("select_random_row")[1].split()[0])
+    assert samples >= 10
+    assert "# collapsed stacks" in report
+    del blob
+
+
+def test_cprofile_covers_worker_threads(tmp_path: Path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    with session("workers", modes=["cprofile"], directory=tmp_path) as written:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(select_random_row, [0.01] * 4))
+
+    stats = pstats.Stats(str(written["cprofile"]))
+    ((calls, *_),) = [value for (_, _, name), value in stats.stats.items() if name == "select_random_row"]
+    assert calls == 4
+
+
+def test_nested_sessions_fold_into_outer(tmp_path: Path):
+    with session("outer", modes=["sample"], directory=tmp_path) as outer:
+        with session("inner", modes=["sample"], directory=tmp_path) as inner:
+            pass
+        assert inner == {}
+    assert list(outer) == ["sample"]
+    assert [p.name.split("-")[0] for p in tmp_path.iterdir()] == ["outer"]
+
+
+def test_disabled_profiling_installs_nothing(sample_csv: Path, simple_template: Path, monkeypatch):
+    monkeypatch.setattr(luckyemail.Config, "PROFILE", "")
+    monkeypatch.setattr(profiling, "session", lambda *a, **k: pytest.fail("profiling started"))
+    monkeypatch.setattr(luckyemail, "send_email", lambda *args: {"status": "debug"})
+    assert luckyemail.send_lucky_email(sample_csv, simple_template)
+
+
+def test_environment_enables_profiling_of_send_lucky_email(sample_csv: Path, simple_template: Path, tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(luckyemail.Config, "PROFILE", "cprofile,sample")
+    monkeypatch.setattr(luckyemail.Config, "PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setattr(luckyemail, "send_email", lambda *args: {"status": "debug"})
+
+    assert luckyemail.send_lucky_email(sample_csv, simple_template)
+
+    names = sorted(p.name for p in (tmp_path / "profiles").iterdir())
+    assert all(name.startswith("send_lucky_email-") for name in names)
+    assert sorted(name.split(".", 1)[1] for name in names) == ["prof", "samples.txt", "txt"]
+
+
+def test_cli_profile_flag(sample_csv: Path, simple_template: Path, tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(cli.Config, "PROFILE_DIR", str(tmp_path / "out"))
+    cli.main(["lucky", str(sample_csv), str(simple_template), "--count", "2", "--dry-run", "--profile", "memory"])
+    (written,) = (tmp_path / "out").iterdir()
+    assert written.name.startswith("lucky-") and written.name.endswith(".memory.txt")
@@ -0,0 +1,78 @@
+from pathlib import Path
+import os
+
+import pytest
+
+from email_me_anything.rendercache import RenderCache, fingerprint
+from email_me_anything.emailutils import build_html_content
+
+
+def test_fingerprint_is_order_independent():
+    assert fingerprint({"a": "1", "b": "2"}) == fingerprint({"b": "2", "a": "1"})
+
+
+def test_fingerprint_unhashable_values():
+    """Unhashable values fall back to a repr-based fingerprint"""
+    fp = fingerprint({"user": {"name": "Alice"}})
+    hash(fp)
+    assert fp == fingerprint({"user": {"name": "Alice"}})
+
+
+def test_render_cache_hits_on_repeat(simple_template: Path):
+    cache = RenderCache()
+    data = {"name": "Ada", "quote": "Hello"}
+
+    first = build_html_content(simple_template, data, cache=cache)
+    second = build_html_content(simple_template, dict(data), cache=cache)
+
+    assert first == second
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_render_cache_distinguishes_variable_map(simple_template: Path):
+    cache = RenderCache()
+    data = {"name": "Ada", "quote": "Hello", "alt": "Other"}
+
+    plain = build_html_content(simple_template, data, cache=cache)
+    mapped = build_html_content(simple_template, data, {"name": "name", "quote": "alt"}, cache=cache)
+
+    assert plain != mapped
+    assert cache.misses == 2
+
+
+def test_render_cache_invalidates_on_template_change(tmp_path: Path):
+    t = tmp_path / "t.html"
+    t.write_text("<p>{name}</p>", encoding="utf-8")
+    cache = RenderCache()
+    assert build_html_content(t, {"name": "Ada"}, cache=cache) == "<p>Ada</p>"
+
+    t.write_text("<div>{name}</div>", encoding="utf-8")
+    stat = t.stat()
+    os.utime(t, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert build_html_content(t, {"name": "Ada"}, cache=cache) == "<div>Ada</div>"
+
+
+def test_render_cache_evicts_by_entry_count(simple_template: Path):
+    cache = RenderCache(max_entries=2)
+    for name in ["a", "b", "c"]:
+        build_html_content(simple_template, {"name": name, "quote": "q"}, cache=cache)
+
+    assert len(cache) == 2
+    assert cache.evictions == 1
+
+
+def test_render_cache_evicts_by_size():
+    cache = RenderCache(max_bytes=10)
+    cache.get_or_render("one", lambda: "x" * 6)
+    cache.get_or_render("two", lambda: "y" * 6)
+
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == 6
+
+
+def test_render_cache_does_not_cache_failures(bad_template_missing_key: Path):
+    cache = RenderCache()
+    with pytest.raises(KeyError):
+        build_html_content(bad_template_missing_key, {"ok": "value"}, cache=cache)
+    assert len(cache) == 0
@@ -0,0 +1,224 @@
+from datetime import datetime
+from pathlib import Path
+import json
+import time
+
+import pytest
+
+from email_me_anything import scheduler as sched
+from email_me_anything.scheduler import CronExpression, Job, Scheduler, load_jobs
+
+
+def test_cron_every_minute():
+    cron = CronExpression("* * * * *")
+    assert cron.next_after(datetime(2026, 1, 1, 8, 0, 30)) == datetime(2026, 1, 1, 8, 1)
+
+
+def test_cron_daily_at_eight():
+    cron = CronExpression("0 8 * * *")
+    assert cron.next_after(datetime(2026, 1, 1, 8, 0)) == datetime(2026, 1, 2, 8, 0)
+    assert cron.next_after(datetime(2026, 1, 1, 7, 59)) == datetime(2026, 1, 1, 8, 0)
+
+
+def test_cron_steps_ranges_and_lists():
+    cron = CronExpression("*/15 9-17 * * 1-5")
+    # 2026-01-03 is a Saturday, so the next run is Monday 09:00
+    assert cron.next_after(datetime(2026, 1, 2, 17, 50)) == datetime(2026, 1, 5, 9, 0)
+    assert CronExpression("5,35 * * * *").next_after(datetime(2026, 1, 1, 0, 6)) == datetime(2026, 1, 1, 0, 35)
+
+
+def test_cron_month_rollover_and_sunday_alias():
+    assert CronExpression("0 0 1 1 *").next_after(datetime(2026, 6, 1)) == datetime(2027, 1, 1)
+    assert CronExpression("0 0 * * 7").next_after(datetime(2026, 1, 1)) == datetime(2026, 1, 4)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "*/0 * * * *", "0 0 31 2 *"])
+def test_cron_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression).next_after(datetime(2026, 1, 1))
+
+
+def test_job_requires_schedule():
+    with pytest.raises(ValueError):
+        Job({"name": "x", "csv": "a.csv", "template": "t.html"})
+
+
+def _write_jobs(path: Path, jobs):
+    path.write_text(json.dumps({"jobs": jobs}), encoding="utf-8")
+
+
+def test_load_jobs_resolves_relative_paths(tmp_path: Path):
+    jobs_file = tmp_path / "jobs.json"
+    _write_jobs(jobs_file, [{"name": "a", "csv": "q.csv", "template": "t.html", "every": 60}])
+    (job,) = load_jobs(jobs_file)
+    assert job.csv_path == tmp_path / "q.csv"
+    assert job.next_run(100.0) == 160.0
+
+
+@pytest.mark.parametrize("spec", [
+    {"name": "a", "template": "t.html", "every": 60},
+    {"name": "a", "csv": "q.csv", "every": 60},
+    {"name": "a", "csv": "q.csv", "template": "t.html", "every": 0},
+    {"name": "a", "csv": "q.csv", "template": "t.html", "every": -5},
+])
+def test_load_jobs_rejects_incomplete_jobs(tmp_path: Path, spec):
+    jobs_file = tmp_path / "jobs.json"
+    _write_jobs(jobs_file, [spec])
+    with pytest.raises(ValueError):
+        load_jobs(jobs_file)
+
+
+def test_load_jobs_rejects_duplicate_names(tmp_path: Path):
+    jobs_file = tmp_path / "jobs.json"
+    spec = {"name": "a", "csv": "q.csv", "template": "t.html", "every": 60}
+    _write_jobs(jobs_file, [spec, spec])
+    with pytest.raises(ValueError):
+        load_jobs(jobs_file)
+
+
+def test_run_pending_sends_and_reschedules(sample_csv: Path, simple_template: Path, monkeypatch):
+    sent = []
+    monkeypatch.setattr(sched, "send_email", lambda sender, recipients, subject, html: sent.append(html) or {"status": "sent"})
+    job = Job({"name": "a", "csv": str(sample_csv), "template": str(simple_template), "every": 10,
+               "recipients": [{"email": "to@example.com", "name": "To"}]})
+    scheduler = Scheduler([job])
+    due = scheduler.next_due()
+
+    assert scheduler.run_pending(due - 1) == 0
+    assert scheduler.run_pending(due) == 1
+    assert len(sent) == 1 and "Ada" in sent[0]
+    assert scheduler.next_due() == due + 10
+
+    scheduler.run_pending(due + 10)
+    assert scheduler.render_cache.hits == 1
+
+
+def test_failing_job_is_rescheduled(tmp_path: Path, simple_template: Path, monkeypatch):
+    monkeypatch.setattr(sched, "send_email", lambda *a: pytest.fail("should not send"))
+    job = Job({"name": "a", "csv": str(tmp_path / "missing.csv"), "template": str(simple_template), "every": 5})
+    scheduler = Scheduler([job])
+    due = scheduler.next_due()
+
+    assert scheduler.run_pending(due) == 1
+    assert scheduler.next_due() == due + 5
+
+
+def test_reload_keeps_unchanged_jobs_and_adds_new(tmp_path: Path):
+    jobs_file = tmp_path / "jobs.json"
+    first = {"name": "a", "csv": "q.csv", "template": "t.html", "every": 60}
+    _write_jobs(jobs_file, [first])
+    scheduler = Scheduler(config_path=jobs_file)
+    due = scheduler.next_due()
+
+    _write_jobs(jobs_file, [first, {"name": "b", "csv": "q.csv", "template": "t.html", "cron": "0 8 * * *"}])
+    scheduler.reload()
+
+    assert sorted(job.name for job in scheduler.jobs) == ["a", "b"]
+    assert due in [when for when, _, job in scheduler._heap if job.name == "a"]
+
+
+def test_reload_with_broken_file_keeps_jobs(tmp_path: Path):
+    jobs_file = tmp_path / "jobs.json"
+    _write_jobs(jobs_file, [{"name": "a", "csv": "q.csv", "template": "t.html", "every": 60}])
+    scheduler = Scheduler(config_path=jobs_file)
+
+    jobs_file.write_text("{not json", encoding="utf-8")
+    scheduler.reload()
+    assert [job.name for job in scheduler.jobs] == ["a"]
+
+
+def test_cron_that_never_fires_is_rejected_and_keeps_jobs_on_reload(tmp_path: Path):
+    jobs_file = tmp_path / "jobs.json"
+    never = {"name": "b", "csv": "q.csv", "template": "t.html", "cron": "0 0 31 2 *"}
+    _write_jobs(jobs_file, [never])
+    with pytest.raises(ValueError):
+        load_jobs(jobs_file)
+
+    _write_jobs(jobs_file, [{"name": "a", "csv": "q.csv", "template": "t.html", "every": 60}])
+    scheduler = Scheduler(config_path=jobs_file)
+    _write_jobs(jobs_file, [never])
+    scheduler.reload()
+    assert [job.name for job in scheduler.jobs] == ["a"]
+
+
+def test_job_without_next_run_is_dropped_not_fatal(monkeypatch):
+    good = Job({"name": "a", "csv": "q.csv", "template": "t.html", "every": 5})
+    bad = Job({"name": "b", "csv": "q.csv", "template": "t.html", "every": 5})
+    scheduler = Scheduler([good, bad])
+    monkeypatch.setattr(scheduler, "run_job", lambda job, when=None: True)
+    monkeypatch.setattr(bad, "next_run", lambda after: (_ for _ in ()).throw(ValueError("no next run")))
+
+    assert scheduler.run_pending(time.time() + 10) == 2
+    assert [job.name for job in scheduler.jobs] == ["a"]
+
+
+def test_reload_request_waits_for_current_send(sample_csv: Path, simple_template: Path, monkeypatch):
+    """A reload requested mid-send lets that send finish before anything else happens"""
+    scheduler = None
+    sent = []
+
+    def fake_send_email(sender, recipients, subject, html):
+        scheduler.request_reload()
+        sent.append(subject)
+        return {"status": "sent"}
+
+    monkeypatch.setattr(sched, "send_email", fake_send_email)
+    jobs = [Job({"name": n, "csv": str(sample_csv), "template": str(simple_template), "every": 1, "subject": n}) for n in "ab"]
+    scheduler = Scheduler(jobs)
+
+    assert scheduler.run_pending(scheduler.next_due() + 5) == 1
+    assert len(sent) == 1
+
+
+def _prerender_job(csv_path: Path, template_path: Path, lead: float = 5):
+    return Job({"name": "news", "csv": str(csv_path), "template": str(template_path), "every": 10, "prerender": lead,
+                "recipients": [{"email": "to@example.com", "name": "To"}]})
+
+
+def test_prerendered_email_is_sent_without_rendering(sample_csv: Path, simple_template: Path, monkeypatch):
+    sent, renders = [], []
+    monkeypatch.setattr(sched, "send_email", lambda sender, recipients, subject, html: sent.append(html) or {"status": "sent"})
+    real_build = sched.build_html_content
+    monkeypatch.setattr(sched, "build_html_content", lambda *a, **k: renders.append(a) or real_build(*a, **k))
+    scheduler = Scheduler([_prerender_job(sample_csv, simple_template)])
+    due = scheduler.next_due()
+    assert scheduler._next_wakeup() == due - 5
+
+    assert scheduler.prerender_pending(due - 6) == 0
+    assert scheduler.prerender_pending(due - 5) == 1
+    assert scheduler.prerender_pending(due - 1) == 0
+    assert len(renders) == 1
+
+    assert scheduler.run_pending(due) == 1
+    assert len(renders) == 1 and "Ada" in sent[0]
+    assert (scheduler.prerender_hits, scheduler.prerender_misses) == (1, 0)
+    assert scheduler._next_wakeup() == due + 5
+
+
+def test_prerender_is_redone_when_csv_changes(sample_csv: Path, simple_template: Path, monkeypatch):
+    sent = []
+    monkeypatch.setattr(sched, "send_email", lambda sender, recipients, subject, html: sent.append(html) or {"status": "sent"})
+    scheduler = Scheduler([_prerender_job(sample_csv, simple_template)])
+    due = scheduler.next_due()
+    scheduler.prerender_pending(due - 5)
+
+    sample_csv.write_text("name,quote\nGrace,It is easier to ask forgiveness than permission\n", encoding="utf-8")
+    assert scheduler.prerender_pending(due - 2) == 1
+    scheduler.run_pending(due)
+
+    assert "Grace" in sent[0]
+    assert scheduler.prerender_hits == 1
+
+
+def test_stale_prerender_is_never_sent(sample_csv: Path, simple_template: Path, monkeypatch):
+    sent = []
+    monkeypatch.setattr(sched, "send_email", lambda sender, recipients, subject, html: sent.append(html) or {"status": "sent"})
+    scheduler = Scheduler([_prerender_job(sample_csv, simple_template)])
+    due = scheduler.next_due()
+    scheduler.prerender_pending(due - 5)
+
+    simple_template.write_text("<p>New layout: {quote}</p>", encoding="utf-8")
+    scheduler.run_pending(due)  # no pre-render pass in between: rendered at send time
+
+    assert sent[0].startswith("<p>New layout:")
+    assert (scheduler.prerender_hits, scheduler.prerender_misses) == (0, 1)
@@ -0,0 +1,104 @@
+from collections import Counter
+from pathlib import Path
+import gzip
+import json
+import os
+
+from email_me_anything import shards
+from email_me_anything.csvutils import select_random_row
+from email_me_anything.shards import MANIFEST_NAME, ShardManifest, is_sharded, pick_shard_row, shard_paths
+
+
+def _shard(path: Path, names):
+    path.write_text("name\n" + "".join(f"{n}\n" for n in names), encoding="utf-8")
+    return path
+
+
+def test_is_sharded(tmp_path: Path):
+    assert is_sharded(tmp_path)
+    assert is_sharded(tmp_path / "part-*.csv")
+    assert not is_sharded(tmp_path / "data.csv")
+
+
+def test_shard_paths_directory_and_glob(tmp_path: Path):
+    _shard(tmp_path / "b.csv", ["x"])
+    _shard(tmp_path / "a.csv", ["y"])
+    (tmp_path / "c.csv.gz").write_bytes(gzip.compress(b"name\nz\n"))
+    (tmp_path / "notes.txt").write_text("ignored", encoding="utf-8")
+
+    assert [p.name for p in shard_paths(tmp_path)] == ["a.csv", "b.csv", "c.csv.gz"]
+    assert [p.name for p in shard_paths(tmp_path / "*.csv")] == ["a.csv", "b.csv"]
+
+
+def test_pick_is_weighted_by_row_count(monkeypatch):
+    paths = [Path("a.csv"), Path("b.csv"), Path("c.csv")]
+    # Data rows: a=2, b=0 (header only), c=3 -> targets 0-1 in a, 2-4 in c
+    picks = []
+    for target in range(5):
+        monkeypatch.setattr(shards.random, "randrange", lambda total, t=target: t)
+        picks.append(pick_shard_row(paths, [3, 1, 4]))
+    assert picks == [(paths[0], 1), (paths[0], 2), (paths[2], 1), (paths[2], 2), (paths[2], 3)]
+    assert pick_shard_row(paths, [1, 1, 0]) == (None, -1)
+
+
+def test_select_random_row_across_shards_is_uniform(tmp_path: Path):
+    _shard(tmp_path / "small.csv", ["s0"])
+    _shard(tmp_path / "large.csv", [f"l{i}" for i in range(9)])
+
+    counts = Counter(select_random_row(tmp_path)["name"][0] for _ in range(2000))
+    assert 100 < counts["s"] < 320
+    assert (tmp_path / MANIFEST_NAME).exists()
+
+
+def test_manifest_recounts_only_changed_shards(tmp_path: Path, monkeypatch):
+    a = _shard(tmp_path / "a.csv", ["x"])
+    b = _shard(tmp_path / "b.csv", ["y"])
+    manifest = ShardManifest(tmp_path / MANIFEST_NAME)
+    assert manifest.refresh([a, b]) == [2, 2]
+    manifest.save()
+
+    _shard(b, ["y", "z"])
+    stat = b.stat()
+    os.utime(b, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    counted = []
+    real_count = shards.count_rows
+    monkeypatch.setattr(shards, "count_rows", lambda p: counted.append(p.name) or real_count(p))
+
+    assert ShardManifest(tmp_path / MANIFEST_NAME).refresh([a, b]) == [2, 3]
+    assert counted == ["b.csv"]
+
+
+def test_manifest_drops_removed_shards(tmp_path: Path):
+    a = _shard(tmp_path / "a.csv", ["x"])
+    b = _shard(tmp_path / "b.csv", ["y"])
+    select_random_row(tmp_path)
+    b.unlink()
+    select_random_row(tmp_path)
+
+    entries = json.loads((tmp_path / MANIFEST_NAME).read_text(encoding="utf-8"))["shards"]
+    assert list(entries) == [os.path.abspath(a)]
+
+
+def test_empty_and_header_only_datasets(tmp_path: Path):
+    assert select_random_row(tmp_path / "none-*.csv") is False
+    _shard(tmp_path / "a.csv", [])
+    assert select_random_row(tmp_path) is None
+
+
+def test_existing_file_with_glob_characters_is_not_sharded(tmp_path: Path):
+    path = _shard(tmp_path / "quotes [2024].csv", ["Ada"])
+    assert not is_sharded(path)
+    assert select_random_row(path) == {"name": "Ada"}
+
+
+def test_alternating_globs_keep_each_others_counts(tmp_path: Path, monkeypatch):
+    _shard(tmp_path / "a-1.csv", ["x"])
+    _shard(tmp_path / "b-1.csv", ["y"])
+    select_random_row(tmp_path / "a-*.csv")
+    select_random_row(tmp_path / "b-*.csv")
+    counted = []
+    monkeypatch.setattr(shards, "count_rows", lambda p: counted.append(p.name) or 2)
+
+    select_random_row(tmp_path / "a-*.csv")
+    select_random_row(tmp_path / "b-*.csv")
+    assert counted == []
@@ -0,0 +1,85 @@
+from pathlib import Path
+import os
+import sqlite3
+
+from email_me_anything import cli, sqlitesource
+from email_me_anything.csvutils import read_csv, read_table, select_random_row
+from email_me_anything.sqlitesource import import_csv, is_sqlite
+
+
+def _csv(tmp_path: Path, text: str) -> Path:
+    p = tmp_path / "data.csv"
+    p.write_text(text, encoding="utf-8")
+    return p
+
+
+def test_is_sqlite():
+    assert is_sqlite(Path("a.db")) and is_sqlite(Path("a.SQLITE3"))
+    assert not is_sqlite(Path("a.csv"))
+
+
+def test_import_round_trips_rows(tmp_path: Path):
+    p = _csv(tmp_path, 'name,quote,extra\nAda,"Hi, there"\n\nBob,Yo,x,overflow\n')
+    db = import_csv(p)
+
+    assert db == tmp_path / "data.db"
+    assert read_csv(db) == read_csv(p, use_cache=False)
+    assert read_table(db).rows() == read_csv(p, use_cache=False)
+
+
+def test_default_database_name_keeps_dotted_stem(tmp_path: Path):
+    import gzip
+    plain = tmp_path / "quotes.2024.csv"
+    plain.write_text("name\nAda\n", encoding="utf-8")
+    packed = tmp_path / "facts.v2.csv.gz"
+    packed.write_bytes(gzip.compress(b"name\nBob\n"))
+
+    assert import_csv(plain) == tmp_path / "quotes.2024.db"
+    assert import_csv(packed) == tmp_path / "facts.v2.db"
+
+
+def test_random_row_matches_convert_row_to_dict_shape(tmp_path: Path, monkeypatch):
+    db = import_csv(_csv(tmp_path, "name,quote,extra\nAda,Hi\nBob,Yo,x\n"))
+    monkeypatch.setattr(sqlitesource.random, "randint", lambda a, b: 2)
+
+    assert select_random_row(db) == {"name": "Ada", "quote": "Hi", "extra": ""}
+    assert select_random_row(db, skip_header=False) == {"col0": "Ada", "col1": "Hi"}
+
+
+def test_random_row_uses_rowid_lookup(tmp_path: Path):
+    db = import_csv(_csv(tmp_path, "n\n" + "".join(f"{i}\n" for i in range(1000))))
+    picks = {select_random_row(db)["n"] for _ in range(300)}
+    assert len(picks) > 100 and "n" not in picks
+
+    # Deleted rows are skipped rather than returned empty
+    with sqlite3.connect(db) as conn:
+        conn.execute("DELETE FROM rows WHERE id BETWEEN 2 AND 900")
+    assert int(select_random_row(db)["n"]) >= 899
+
+
+def test_header_only_empty_and_missing(tmp_path: Path):
+    header = import_csv(_csv(tmp_path, "name\n"), tmp_path / "header.db")
+    empty = import_csv(_csv(tmp_path, ""), tmp_path / "empty.db")
+
+    assert select_random_row(header) is None
+    assert select_random_row(empty) is False
+    assert select_random_row(tmp_path / "missing.db") is False
+    assert not (tmp_path / "missing.db").exists()
+
+
+def test_import_skips_up_to_date_database(tmp_path: Path):
+    p = _csv(tmp_path, "name\nAda\n")
+    db = import_csv(p)
+    mtime = db.stat().st_mtime_ns
+    assert import_csv(p).stat().st_mtime_ns == mtime
+
+    p.write_text("name\nAda\nBob\n", encoding="utf-8")
+    stat = p.stat()
+    os.utime(p, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert read_csv(import_csv(p)) == [["name"], ["Ada"], ["Bob"]]
+
+
+def test_cli_import(tmp_path: Path, capsys):
+    p = _csv(tmp_path, "name\nAda\n")
+    assert cli.main(["import", str(p), str(tmp_path / "out.sqlite")]) == 0
+    assert read_csv(tmp_path / "out.sqlite") == [["name"], ["Ada"]]
@@ -0,0 +1,96 @@
+from pathlib import Path
+import sys
+
+import pytest
+
+from email_me_anything.table import CsvTable
+from email_me_anything.csvutils import read_csv, read_table, convert_row_to_dict
+from email_me_anything.emailutils import build_context, build_html_content
+
+
+ROWS = [["name", "age", "city"], ["Alice", "25", "NYC"], ["Bob", "30"], [], ["Zoë", "41", "Köln", "extra"]]
+
+
+def test_table_round_trips_rows():
+    table = CsvTable.from_rows(ROWS)
+    assert len(table) == 5
+    assert table.rows() == ROWS
+
+
+def test_record_matches_convert_row_to_dict():
+    table = CsvTable.from_rows(ROWS)
+    for idx in range(1, len(ROWS)):
+        assert dict(table.record(idx)) == convert_row_to_dict(ROWS[idx], ROWS[0])
+
+
+def test_record_without_headers_matches_convert_row_to_dict():
+    table = CsvTable.from_rows(ROWS)
+    for idx in range(len(ROWS)):
+        assert dict(table.record(idx, skip_header=False)) == convert_row_to_dict(ROWS[idx])
+
+
+def test_record_behaves_like_mapping():
+    table = CsvTable.from_rows(ROWS)
+    record = table.record(2)
+    assert record["city"] == ""
+    assert record.get("missing", "default") == "default"
+    assert "age" in record and "extra" not in record
+    assert len(record) == 3
+    with pytest.raises(KeyError):
+        record["col0"]
+
+
+def test_headers_are_interned():
+    header = "".join(["na", "me"])
+    table = CsvTable.from_rows([[header], ["Alice"]])
+    assert table.headers[0] is sys.intern("name")
+
+
+def test_column_slices():
+    table = CsvTable.from_rows(ROWS)
+    assert table.column(0, 1) == ["Alice", "Bob", "", "Zoë"]
+    assert table.column(3) == ["", "", "", "", "extra"]
+
+
+def test_empty_table():
+    table = CsvTable.from_rows([])
+    assert len(table) == 0 and not table
+    assert table.headers == []
+
+
+def test_read_table_matches_read_csv(tmp_path: Path):
+    p = tmp_path / "data.csv"
+    p.write_text('name,description\n"Alice","Line 1\nLine 2"\nBob,"She said, ""Hi"""\n', encoding="utf-8")
+    assert read_table(p).rows() == read_csv(p)
+
+
+def test_read_table_missing_file_returns_none(tmp_path: Path):
+    assert read_table(tmp_path / "missing.csv") is None
+
+
+def test_record_feeds_build_context_and_templates(simple_template: Path):
+    table = CsvTable.from_rows([["name", "quote"], ["Ada", "Hello"]])
+    record = table.record(1)
+    assert build_context(record, {"who": "name"}) == {"who": "Ada"}
+    assert "Ada" in build_html_content(simple_template, record)
+
+
+def test_table_is_smaller_than_rows():
+    rows = [["id", "text"]] + [[str(i), "quote number %d" % i] for i in range(1000)]
+    table = CsvTable.from_rows(rows)
+    assert table.nbytes() < sum(len(v.encode()) for row in rows for v in row) * 2
+
+
+def test_column_blocks_decode_ascii_and_unicode():
+    table = CsvTable.from_rows(ROWS)
+    assert table.column(0, 1, 3) == ["Alice", "Bob"]
+    assert table.column(2, 3) == ["", "Köln"]
+    assert table.column(0, 2, 2) == []
+
+
+def test_column_index_resolves_like_record():
+    table = CsvTable.from_rows(ROWS)
+    assert table.column_index("city") == 2
+    assert table.column_index("col1") is None
+    assert table.column_index("col3", skip_header=False) == 3
+    assert table.column_index("missing") is None
@@ -0,0 +1,110 @@
+from pathlib import Path
+import os
+
+from email_me_anything.csvutils import read_csv, select_random_row
+from email_me_anything.tailcsv import TailReader, prefix_checksum, reader_for
+
+
+def _append(p: Path, text: str):
+    with open(p, "a", encoding="utf-8", newline="") as file:
+        file.write(text)
+    stat = p.stat()
+    # Make sure the mtime moves even on coarse-grained filesystems
+    os.utime(p, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_appends_parse_only_new_rows(tmp_path: Path):
+    p = tmp_path / "log.csv"
+    p.write_text("name,quote\nAda,Hi\n", encoding="utf-8")
+    reader = TailReader(p)
+
+    assert reader.refresh() == [["name", "quote"], ["Ada", "Hi"]]
+    assert reader.refresh() == []
+    _append(p, 'Bob,"Yo, there"\n')
+
+    assert reader.refresh() == [["Bob", "Yo, there"]]
+    assert reader.header == ["name", "quote"]
+    assert reader.offset == p.stat().st_size
+    assert reader.full_parses == 1
+
+
+def test_partial_rows_wait_for_completion(tmp_path: Path):
+    p = tmp_path / "log.csv"
+    p.write_text("name,quote\nAda,Hi\nBob,Y", encoding="utf-8")
+    reader = TailReader(p)
+    assert reader.refresh()[-1] == ["Ada", "Hi"]
+
+    _append(p, 'o\nCy,"multi\nline')
+    assert reader.refresh() == [["Bob", "Yo"]]
+
+    _append(p, '"\n')
+    assert reader.refresh() == [["Cy", "multi\nline"]]
+    assert reader.full_parses == 1
+
+
+def test_incremental_read_matches_full_read_without_trailing_newline(tmp_path: Path):
+    p = tmp_path / "log.csv"
+    p.write_text("name,quote\nAda,Hi\nBob,Yo", encoding="utf-8")
+    assert read_csv(p, incremental=True) == read_csv(p, incremental=False)
+
+    _append(p, '\nCy,"multi\nline')
+    assert read_csv(p, incremental=True) == read_csv(p, incremental=False)
+    assert read_csv(p, incremental=True)[-1] == ["Cy", "multi\nline"]
+
+
+def test_unquoted_double_quote_does_not_hold_back_rows(tmp_path: Path):
+    p = tmp_path / "log.csv"
+    p.write_text('item,size\nmonitor,27" screen\nmouse,small\n', encoding="utf-8")
+    reader = TailReader(p)
+
+    assert reader.refresh() == [["item", "size"], ["monitor", '27" screen'], ["mouse", "small"]]
+    assert reader.offset == p.stat().st_size
+    assert read_csv(p, incremental=True) == read_csv(p, incremental=False)
+
+
+def test_truncate_and_rewrite_trigger_full_parse(tmp_path: Path):
+    p = tmp_path / "log.csv"
+    p.write_text("name\nAda\nBob\n", encoding="utf-8")
+    reader = TailReader(p)
+    reader.refresh()
+
+    p.write_text("name\nCy\n", encoding="utf-8")
+    assert reader.refresh() == [["name"], ["Cy"]]
+    assert reader.full_parses == 2
+
+    # Same length prefix, different content, then grown
+    p.write_text("name\nDi\nEve\n", encoding="utf-8")
+    assert reader.refresh() == [["name"], ["Di"], ["Eve"]]
+    assert reader.full_parses == 3
+
+
+def test_prefix_checksum_covers_both_ends(tmp_path: Path):
+    p = tmp_path / "big.csv"
+    body = b"x" * 200_000
+    p.write_bytes(body)
+    original = prefix_checksum(p, len(body))
+
+    p.write_bytes(b"y" + body[1:])
+    assert prefix_checksum(p, len(body)) != original
+    p.write_bytes(body[:-1] + b"y")
+    assert prefix_checksum(p, len(body)) != original
+
+
+def test_read_csv_incremental_matches_full_parse(tmp_path: Path):
+    p = tmp_path / "log.csv"
+    p.write_text("name,quote\nAda,Hi\n", encoding="utf-8")
+    assert read_csv(p, incremental=True) == read_csv(p, incremental=False)
+
+    _append(p, "Bob,Yo\n\nCy,Hey\n")
+    assert read_csv(p, incremental=True) == read_csv(p, incremental=False)
+    assert reader_for(p).full_parses == 1
+
+
+def test_select_random_row_incremental(tmp_path: Path):
+    p = tmp_path / "log.csv"
+    p.write_text("name\n", encoding="utf-8")
+    assert select_random_row(p, incremental=True) is None
+
+    _append(p, "Ada\n")
+    assert select_random_row(p, incremental=True) == {"name": "Ada"}
+    assert select_random_row(tmp_path / "missing.csv", incremental=True) is False
@@ -0,0 +1,84 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from email_me_anything.emailutils import build_html_content
+from email_me_anything.templating import TemplateSyntaxError, compile_template, render, uses_blocks
+
+
+@pytest.mark.parametrize("source", [
+    "",
+    "plain text",
+    "<p>{quote}</p><span>{name}</span>",
+    "{{literal}} {name}",
+    "{price:.2f} {name:>6}",
+])
+def test_placeholders_match_format_map(source):
+    context = {"quote": "Hi", "name": "Ada", "price": 3.14159}
+    assert render(source, context) == source.format_map(context)
+
+
+def test_missing_placeholder_raises_keyerror():
+    with pytest.raises(KeyError):
+        render("<div>{missing}</div>", {})
+
+
+def test_filters_and_paths():
+    context = {"user": {"name": "ada <x>", "tags": ["a", "b"]}, "obj": SimpleNamespace(title="t")}
+    source = "{user.name|escape} {user.name|upper|escape} {user.tags.1} {user.tags|length} {obj.title|upper}"
+    assert render(source, context) == "ada &lt;x&gt; ADA &lt;X&gt; b 2 T"
+    assert render("{q|urlencode}|{t|nl2br}", {"q": "a b&c", "t": "x\ny"}) == "a+b%26c|x<br>\ny"
+
+
+def test_for_loop_with_loop_variable_and_else():
+    source = "{% for x in xs %}{loop.index}/{loop.length}:{x}{% if not loop.last %}, {% endif %}{% else %}none{% endfor %}"
+    assert render(source, {"xs": ["a", "b", "c"]}) == "1/3:a, 2/3:b, 3/3:c"
+    assert render(source, {"xs": []}) == "none"
+    assert render(source, {}) == "none"
+
+
+def test_nested_loops_and_shadowing():
+    source = "{% for row in rows %}[{% for x in row %}{loop.index0}{x}{% endfor %}|{loop.index}]{% endfor %}"
+    assert render(source, {"rows": [["a", "b"], ["c"]]}) == "[0a1b|1][0c|2]"
+
+
+def test_if_elif_else():
+    source = "{% if n > 10 %}big{% elif n > 1 and label %}{label}{% else %}small{% endif %}"
+    assert render(source, {"n": 20}) == "big"
+    assert render(source, {"n": 5, "label": "mid"}) == "mid"
+    assert render(source, {"n": 5}) == "small"
+    assert render("{% if user.admin %}admin{% endif %}", {"user": {}}) == ""
+    assert render("{% if 'x' in tags %}yes{% endif %}", {"tags": ["x"]}) == "yes"
+
+
+def test_whitespace_control():
+    source = "<ul>\n  {%- for x in xs -%}\n  <li>{x}</li>\n  {%- endfor -%}\n</ul>"
+    assert render(source, {"xs": [1, 2]}) == "<ul><li>1</li><li>2</li></ul>"
+
+
+@pytest.mark.parametrize("source", [
+    "{% while x %}{% endwhile %}",
+    "{% for x in xs %}",
+    "{% endif %}",
+    "{% for x xs %}{% endfor %}",
+    "{name|nope}",
+    "{% if __import__('os') %}{% endif %}",
+    "{% if x. %}{% endif %}",
+])
+def test_syntax_errors(source):
+    with pytest.raises(TemplateSyntaxError):
+        compile_template(source)
+
+
+def test_uses_blocks():
+    assert not uses_blocks("<p>{name}</p> {{x}}")
+    assert uses_blocks("{% if x %}{% endif %}")
+    assert uses_blocks("{name|upper}")
+
+
+def test_build_html_content_renders_blocks(tmp_path: Path):
+    t = tmp_path / "digest.html"
+    t.write_text("<h1>{title|escape}</h1>{% for q in quotes %}<p>{q.text}</p>{% endfor %}", encoding="utf-8")
+    data = {"title": "A & B", "quotes": [{"text": "one"}, {"text": "two"}]}
+    assert build_html_content(t, data) == "<h1>A &amp; B</h1><p>one</p><p>two</p>"
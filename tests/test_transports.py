@@ -0,0 +1,120 @@
+from pathlib import Path
+
+import pytest
+
+from email_me_anything import cli, emailutils, transports
+
+SENDER = {"email": "from@example.com", "name": "From"}
+TO = [{"email": "to@example.com", "name": "To"}]
+
+
+def test_builtin_transports_are_registered():
+    assert {"mailersend", "smtp", "group", "debug", "null", "memory"} <= set(transports.names())
+
+
+def test_register_custom_transport_and_select_it_with_config(monkeypatch):
+    sent = []
+
+    @transports.register("test-outbox")
+    def outbox(sender, recipients, subject, html_content, text_content=None, attachments=()):
+        sent.append((recipients[0]["email"], subject, html_content, text_content))
+        return {"status": "queued"}
+
+    try:
+        with pytest.raises(ValueError):
+            transports.register("test-outbox", outbox)
+        monkeypatch.setattr(emailutils.Config, "PROD_MODE", True)
+        monkeypatch.setattr(emailutils.Config, "MAILER", "test-outbox")
+        assert emailutils.send_email(SENDER, TO, "Hi", "<p>Hi</p>", text_content="Hi") == {"status": "queued"}
+        assert sent == [("to@example.com", "Hi", "<p>Hi</p>", "Hi")]
+    finally:
+        transports.unregister("test-outbox")
+    assert "test-outbox" not in transports.names()
+
+
+def test_unknown_transport_raises(monkeypatch):
+    monkeypatch.setattr(emailutils.Config, "PROD_MODE", True)
+    monkeypatch.setattr(emailutils.Config, "MAILER", "carrier-pigeon")
+    with pytest.raises(KeyError, match="Unknown transport 'carrier-pigeon'"):
+        emailutils.send_email(SENDER, TO, "Hi", "<p>Hi</p>")
+    with pytest.raises(KeyError):
+        emailutils.send_bulk(SENDER, "Hi", [(TO[0], "<p>Hi</p>")])
+
+
+def test_null_and_memory_transports_write_no_debug_file(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(emailutils.Config, "PROD_MODE", False)
+    monkeypatch.setattr(emailutils.Config, "DEBUG_TRANSPORT", "memory")
+    transports.memory.clear()
+
+    assert emailutils.send_email(SENDER, TO, "One", "<p>1</p>")["status"] == "captured"
+    assert emailutils.send_email(SENDER, TO, "Two", "<p>2</p>", transport="null")["status"] == "null"
+
+    assert [m["subject"] for m in transports.memory.messages] == ["One"]
+    assert transports.memory.messages[0]["recipients"] == TO
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_memory_transport_keeps_only_the_latest_messages():
+    outbox = transports.MemoryTransport(limit=3)
+    for n in range(5):
+        outbox(SENDER, TO, f"s{n}", "<p>x</p>")
+    assert [m["subject"] for m in outbox.messages] == ["s2", "s3", "s4"]
+    assert outbox.sent == 5
+
+
+def test_cli_transport_flag(sample_csv: Path, simple_template: Path, tmp_path: Path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    transports.memory.clear()
+    assert cli.main(["lucky", str(sample_csv), str(simple_template), "--count", "5", "--to", "a@example.com",
+                     "--transport", "memory"]) == 0
+    assert transports.memory.sent == 5
+    assert not (tmp_path / "debug-email.html").exists()
+
+    with pytest.raises(SystemExit, match="Unknown transport 'nope'"):
+        cli.main(["lucky", str(sample_csv), str(simple_template), "--transport", "nope"])
+
+
+def test_discarding_transports_are_not_journaled(sample_csv: Path, simple_template: Path, tmp_path: Path, monkeypatch):
+    from email_me_anything import luckyemail
+    from email_me_anything.journal import SendJournal
+
+    assert transports.delivers("smtp") and not transports.delivers("null") and not transports.delivers("nope")
+    monkeypatch.setattr(luckyemail.Config, "PROD_MODE", True)
+    for mailer in ("carrier-pigeon", "null"):
+        monkeypatch.setattr(luckyemail.Config, "MAILER", mailer)
+        with SendJournal(tmp_path / "daily.journal") as journal:
+            try:
+                luckyemail.send_lucky_email(sample_csv, simple_template, journal=journal, idempotency_key="2024-05-01")
+            except KeyError:
+                assert mailer == "carrier-pigeon"
+            assert "2024-05-01" not in journal
+
+    monkeypatch.setattr(cli.Config, "MAILER", "smtp")
+    path = tmp_path / "cli.journal"
+    assert cli.main(["lucky", str(sample_csv), str(simple_template), "--count", "2", "--transport", "null",
+                     "--journal", str(path)]) == 0
+    assert not path.exists() or path.read_text() == ""
+
+
+def test_send_bulk_batches_only_through_bcc_transports(monkeypatch):
+    calls = []
+
+    def outbox(sender, recipients, subject, html_content, text_content=None, attachments=(), personalize=False):
+        calls.append([r["email"] for r in recipients])
+        return {"status": "queued"}
+
+    transports.register("test-bcc", outbox, bcc=True)
+    try:
+        monkeypatch.setattr(emailutils.Config, "PROD_MODE", True)
+        monkeypatch.setattr(emailutils.Config, "MAILER", "test-bcc")
+        a, b = ({"email": f"{n}@example.com", "name": n} for n in "ab")
+        emailutils.send_bulk(SENDER, "News", [(a, "x"), (b, "x")])
+        assert calls == [["a@example.com", "b@example.com"]]
+
+        transports.memory.clear()
+        emailutils.send_bulk(SENDER, "News", [(a, "x"), (b, "x")], transport="memory")
+        assert [m["recipients"] for m in transports.memory.messages] == [[a], [b]]
+    finally:
+        transports.unregister("test-bcc")
+    assert not transports.bcc("test-bcc") and transports.bcc("smtp")
@@ -0,0 +1,109 @@
+from pathlib import Path
+import os
+import time
+
+import pytest
+
+from email_me_anything import watch
+from email_me_anything.csvutils import select_random_row
+from email_me_anything.emailutils import build_html_content
+from email_me_anything.rendercache import RenderCache, template_identity
+from email_me_anything.watch import FileWatcher
+
+
+def _wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def watcher(request):
+    w = FileWatcher(poll_interval=0.02, force_polling=request.param == "polling")
+    if w.backend != request.param:
+        w.close()
+        pytest.skip("inotify is not available")
+    yield w
+    w.close()
+
+
+@pytest.fixture
+def active_watcher():
+    w = watch.start(poll_interval=0.02)
+    yield w
+    watch.stop()
+
+
+def test_cached_value_reloads_only_after_change(tmp_path: Path, watcher):
+    p = tmp_path / "t.html"
+    p.write_text("one", encoding="utf-8")
+    loads = []
+
+    def load(path):
+        loads.append(path)
+        return path.read_text(encoding="utf-8")
+
+    assert watcher.cached(p, load) == "one"
+    assert watcher.cached(p, load) == "one"
+    assert len(loads) == 1
+
+    generation = watcher.generation(p)
+    p.write_text("two", encoding="utf-8")
+    assert _wait_for(lambda: watcher.generation(p) > generation)
+    assert watcher.cached(p, load) == "two"
+    assert len(loads) == 2
+
+
+def test_atomic_replace_is_detected(tmp_path: Path, watcher):
+    p = tmp_path / "data.csv"
+    p.write_text("a", encoding="utf-8")
+    watcher.cached(p, lambda path: path.read_text(encoding="utf-8"))
+    changed = []
+    watcher.add_listener(changed.append)
+
+    tmp = tmp_path / "data.csv.new"
+    tmp.write_text("bb", encoding="utf-8")
+    os.replace(tmp, p)
+    assert _wait_for(lambda: os.path.abspath(p) in changed)
+    assert watcher.cached(p, lambda path: path.read_text(encoding="utf-8")) == "bb"
+
+
+def test_none_is_not_cached(tmp_path: Path, watcher):
+    calls = []
+    assert watcher.cached(tmp_path / "missing", lambda path: calls.append(1)) is None
+    assert watcher.cached(tmp_path / "missing", lambda path: calls.append(1)) is None
+    assert len(calls) == 2
+
+
+def test_hot_path_makes_no_syscalls(tmp_path: Path, simple_template: Path, active_watcher, monkeypatch):
+    cache = RenderCache()
+    data = {"name": "Ada", "quote": "Hi"}
+    first = build_html_content(simple_template, data, cache=cache)
+
+    def forbidden(*args, **kwargs):
+        raise AssertionError("filesystem access on the hot path")
+
+    monkeypatch.setattr(os, "stat", forbidden)
+    monkeypatch.setattr("builtins.open", forbidden)
+    assert build_html_content(simple_template, data, cache=cache) == first
+    assert build_html_content(simple_template, {"name": "Bob", "quote": "Yo"}).startswith("<")
+    assert template_identity(simple_template)[1] == -1
+
+
+def test_select_random_row_keeps_table_until_change(sample_csv: Path, active_watcher, monkeypatch):
+    from email_me_anything import csvutils
+
+    assert select_random_row(sample_csv, use_cache=False)["name"] == "Ada"
+    real_read_table = csvutils.read_table
+    reads = []
+    monkeypatch.setattr(csvutils, "read_table", lambda *a, **k: reads.append(a) or real_read_table(*a, **k))
+
+    select_random_row(sample_csv, use_cache=False)
+    assert reads == []
+
+    sample_csv.write_text("name,quote\nBob,Yo\n", encoding="utf-8")
+    assert _wait_for(lambda: select_random_row(sample_csv, use_cache=False)["name"] == "Bob")
+    assert len(reads) == 1